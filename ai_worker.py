@@ -0,0 +1,166 @@
+# ai_worker.py
+# Runs the AI off the pygame frame. The worker thread searches on a headless
+# copy of the position (chess_core / superchess_core) and hands the chosen move
+# back through a queue; the frame loop only polls. While the human is to move
+# the worker ponders: it predicts the reply and searches the position after
+# it, which leaves the transposition table warm for the real search.
+
+import copy
+import queue
+import sys
+import threading
+import time
+
+from board import POWER, square_of
+from chess_core import ChessCore
+from search import Search
+from superchess_core import SuperChessCore
+from zobrist import TranspositionTable
+
+# engine attributes a headless copy needs to search and to pick SuperChess powers
+ENGINE_STATE = ("board", "turn", "has_moved", "last_move", "zobrist", "material", "position_counts",
+                "winner", "ai_time_limit", "ai_book", "charges", "fortress_zones", "king_recently_checked")
+
+PONDER_LIMIT = 30.0   # seconds per ponder search; a new request stops it earlier
+
+# the search holds the GIL between switches; a short interval hands it back to the
+# frame loop quickly enough to keep ~60 FPS (the default 5 ms costs about 20 FPS)
+SWITCH_INTERVAL = 0.0005
+
+
+def headless_copy(engine):
+    """Copy of the engine's position on its headless core class."""
+    core = SuperChessCore() if isinstance(engine, SuperChessCore) else ChessCore()
+    for name in ENGINE_STATE:
+        if hasattr(engine, name):
+            setattr(core, name, copy.deepcopy(getattr(engine, name)))
+    return core
+
+
+class AIWorker(object):
+    """
+    Background AI for the black side. Game calls update(engine) once per frame;
+    it starts a search when black is to move, ponders while white thinks, and
+    plays the result on the engine once it is ready. cancel() drops pending work
+    (resign, restart, back to menu).
+    """
+
+    def __init__(self, time_limit=None, ponder=True, min_think=0.18, hash_mb=16):
+        self.time_limit = time_limit    # None: use the engine's ai_time_limit
+        self.ponder = ponder
+        self.min_think = min_think      # keep the short pause the inline AI had
+        self.tt = TranspositionTable(hash_mb)
+
+        self.jobs = queue.Queue()
+        self.results = queue.Queue()
+        self._lock = threading.Lock()
+        self._search = None             # search running in the worker thread
+        self._generation = 0            # bumped by cancel(); stale results are dropped
+        self._job = None                # (kind, position hash) last requested
+        self._started = 0.0
+        self._ready = None              # choice for the current think job
+
+        # process-wide: shutdown() puts the previous interval back
+        self._switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(self._switch_interval, SWITCH_INTERVAL))
+        self.thread = threading.Thread(target=self._run, name="ai-worker", daemon=True)
+        self.thread.start()
+
+    # -------------------- Frame side --------------------
+
+    @property
+    def thinking(self):
+        """True while a search for the AI's own move is pending (HUD indicator)."""
+        return self._job is not None and self._job[0] == "think"
+
+    def update(self, engine):
+        """Drive the worker from the frame loop. Returns True when an AI move was played."""
+        if engine is None or engine.winner:
+            if self._job is not None:
+                self.cancel()
+            return False
+
+        key = engine.position_hash()
+        if not engine.turn["black"]:
+            if self.ponder and self._job != ("ponder", key):
+                self._request("ponder", engine, key)
+            return False
+
+        if self._job != ("think", key):
+            self._request("think", engine, key)
+        self._drain(key)
+        if self._ready is None or time.perf_counter() - self._started < self.min_think:
+            return False
+
+        chosen, self._ready, self._job = self._ready, None, None
+        if chosen is None:
+            return False
+        return engine.play_ai_move(chosen)
+
+    def cancel(self):
+        """Stop the running search and forget every pending request."""
+        with self._lock:
+            self._generation += 1
+            if self._search is not None:
+                self._search.stop()
+        self._job = None
+        self._ready = None
+
+    def shutdown(self):
+        """Stop the worker thread and restore the interpreter's switch interval."""
+        self.cancel()
+        self.jobs.put(None)
+        if self._switch_interval is not None:
+            sys.setswitchinterval(self._switch_interval)
+            self._switch_interval = None
+
+    def _request(self, kind, engine, key):
+        self.cancel()
+        self._job = (kind, key)
+        self._started = time.perf_counter()
+        self.jobs.put((self._generation, kind, key, headless_copy(engine)))
+
+    def _drain(self, key):
+        while True:
+            try:
+                generation, result_key, chosen = self.results.get_nowait()
+            except queue.Empty:
+                return
+            if generation == self._generation and result_key == key:
+                self._ready = chosen
+
+    # -------------------- Worker thread --------------------
+
+    def _new_search(self, core, generation, time_limit):
+        search = Search(core, time_limit, tt=self.tt)
+        with self._lock:
+            if generation != self._generation:
+                search.stop()
+            self._search = search
+        return search
+
+    def _run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            generation, kind, key, core = job
+            if generation != self._generation:
+                continue
+            if kind == "think":
+                limit = self.time_limit if self.time_limit is not None else core.ai_time_limit
+                chosen = core.choose_ai_move(search=self._new_search(core, generation, limit))
+                self.results.put((generation, key, chosen))
+            else:
+                self._ponder(core, generation)
+
+    def _ponder(self, core, generation):
+        # guess white's move, then think about black's answer until interrupted
+        guess = self._new_search(core, generation, core.ai_time_limit).best_move("white")
+        if guess is None or generation != self._generation:
+            return
+        (f, r), (x, y) = guess[:2]
+        move = (square_of(f, r), y * 8 + x)
+        # a predicted power is played through the same make_move path as a move
+        core.make_move(move + (POWER,) if len(guess) > 2 else move)
+        self._new_search(core, generation, PONDER_LIMIT).best_move("black")
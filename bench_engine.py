@@ -0,0 +1,116 @@
+# bench_engine.py
+# Micro-benchmarks for the engine core. Run from the project root:
+# python bench_engine.py
+
+import sys, time
+
+from chess_core import ChessCore
+
+# short opening so both sides have developed pieces and castling is available
+OPENING = [(("e", 2), (4, 4)), (("e", 7), (4, 3)), (("g", 1), (5, 5)),
+           (("b", 8), (2, 2)), (("f", 1), (2, 4)), (("g", 8), (5, 2))]
+
+
+def make_engine(cls=ChessCore, opening=None):
+    engine = cls()
+    for src, dst in (OPENING if opening is None else opening):
+        engine.validate_move(dst, source=src)
+    return engine
+
+
+def timed(label, fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    per_call = (time.perf_counter() - start) / repeat
+    print(f"{label:32s} {per_call*1e6:10.1f} us")
+    return per_call
+
+
+def bench_movegen(engine):
+    board = engine.board
+    occupied = [(sq, board[sq]) for sq in range(64) if board[sq]]
+    cells = [(engine.piece_at(sq & 7, sq >> 3), [sq & 7, sq >> 3]) for sq, _ in occupied]
+
+    def possible_moves_all():
+        for name, xy in cells:
+            engine.possible_moves(name, xy)
+
+    def attacked_all():
+        for x in range(8):
+            for y in range(8):
+                engine.is_square_attacked("white", (x, y))
+
+    timed("pseudo moves (both sides)", lambda: (engine._pseudo_moves(0), engine._pseudo_moves(1)), 2000)
+    timed("possible_moves (every piece)", possible_moves_all, 1000)
+    timed("is_square_attacked (64 squares)", attacked_all, 200)
+    timed("get_all_legal_moves('white')", lambda: engine.get_all_legal_moves("white"), 50)
+
+
+def bench_make_unmake(engine):
+    pseudo = engine._pseudo_moves(0)
+
+    def make_unmake_all():
+        for move in pseudo:
+            engine.unmake_move(engine.make_move(move))
+
+    timed(f"make+unmake ({len(pseudo)} moves)", make_unmake_all, 1000)
+    timed("legal_moves_for(white_queen)", lambda: engine.legal_moves_for("white_queen", [3, 7]), 500)
+    timed("_after_move_checks('black')", lambda: engine._after_move_checks("black"), 200)
+
+
+def bench_bitboard(engine):
+    from bitboard import BitboardPosition
+    pos = BitboardPosition.from_chess(engine)
+
+    def attacked_all():
+        for x in range(8):
+            for y in range(8):
+                pos.is_square_attacked("white", (x, y))
+
+    timed("bitboard pseudo moves (both)", lambda: (pos.pseudo_moves(0), pos.pseudo_moves(1)), 2000)
+    timed("bitboard is_square_attacked (64)", attacked_all, 200)
+    timed("bitboard legal_moves(white)", lambda: pos.legal_moves(0), 200)
+
+
+def bench_evaluation(engine):
+    import evaluation
+    children = []
+    for move in engine._pseudo_moves(0):
+        undo = engine.make_move(move)
+        children.append(bytes(engine.board))
+        engine.unmake_move(undo)
+
+    grandchildren = []
+    for move in engine._pseudo_moves(0):
+        undo = engine.make_move(move)
+        for reply in engine._pseudo_moves(1):
+            undo_reply = engine.make_move(reply)
+            grandchildren.append(bytes(engine.board))
+            engine.unmake_move(undo_reply)
+        engine.unmake_move(undo)
+
+    timed("evaluate", lambda: evaluation.evaluate(engine.board, 0), 2000)
+    for boards, repeat in ((children, 200), (grandchildren, 20)):
+        timed(f"evaluate ({len(boards)} boards, one by one)", lambda: [evaluation.evaluate(b, 0) for b in boards], repeat)
+        if evaluation.NUMPY_AVAILABLE:
+            timed(f"evaluate_many ({len(boards)} boards)", lambda: evaluation.evaluate_many(boards, 0), repeat)
+
+
+def bench_search(engine, time_limit=1.0):
+    from search import Search
+    search = Search(engine, time_limit)
+    start = time.perf_counter()
+    move = search.best_move("white")
+    elapsed = time.perf_counter() - start
+    print(f"search {time_limit:.1f}s: depth {search.depth}, {search.nodes} nodes, "
+          f"{search.nodes / elapsed:.0f} nodes/s, best {move}")
+
+
+if __name__ == "__main__":
+    print("Python", sys.version.split()[0])
+    bench_movegen(make_engine())
+    bench_make_unmake(make_engine())
+    bench_bitboard(make_engine())
+    bench_evaluation(make_engine())
+    bench_search(make_engine())
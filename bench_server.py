@@ -0,0 +1,229 @@
+# bench_server.py
+# Load test for server.py: many games played at once by random-move bots, with
+# optional AI games and spectators. Reports accepted moves per second and the
+# move -> delta round-trip latency (p50 / p99 / max). Run from the project root:
+#   python bench_server.py --games 1000 --clients 20 --super
+#   python bench_server.py --games 200 --ai-games 20 --ai-time 0.05 --spectators 2
+#   python bench_server.py --port 8765 --games 2000      # against a running server.py
+#
+# Without --port the server runs in this process over socket pairs; the bots then
+# share its event loop and CPU, so a separate server gives cleaner latencies.
+# Each bot keeps a local engine and replays every delta's move on it, so it always
+# knows the legal moves of the position the server holds.
+
+import argparse, asyncio, random, sys, time
+
+from board import square_of
+from perft import side_to_move
+from selfplay import choose_move
+import server
+
+RANDOM = ("random", 0.0, 0)
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100.0))]
+
+
+class Bot(object):
+    """
+    One connection playing `games` games: both seats of its ordinary games and white
+    against the server AI in its AI games. One move per game is in flight at a time.
+    """
+
+    def __init__(self, reader, writer, args, rng, stats):
+        self.reader, self.writer = reader, writer
+        self.args = args
+        self.rng = rng
+        self.stats = stats
+        self.engines = {}       # game id -> local engine
+        self.ai_games = set()
+        self.sent = {}          # game id -> perf_counter() of the move in flight
+        self.pending = 0        # NEW requests not yet answered
+        self.ai_left = 0        # the first answers are the AI games (requested first)
+        self.done = asyncio.Event()
+
+    async def run(self, games, ai_games):
+        reader_task = asyncio.ensure_future(self._read())
+        self.ai_left = ai_games
+        for i in range(games):
+            self.pending += 1
+            self.writer.write(server.encode(server.NEW, self.args.super, server.WHITE_SEAT, i < ai_games))
+        await self.writer.drain()
+        if games:
+            await self.done.wait()
+        reader_task.cancel()
+        self.writer.close()
+
+    async def _read(self):
+        while True:
+            frame = await server.read_frame(self.reader)
+            if frame is None:
+                self.done.set()
+                return
+            kind, fields = frame
+            self.stats["frames"] += 1
+            if kind == server.JOINED:
+                game, seat = fields[:2]
+                if game not in self.engines:
+                    self.pending -= 1
+                    self.engines[game] = server.new_engine(self.args.super)
+                    if self.ai_left > 0:
+                        self.ai_left -= 1
+                        self.ai_games.add(game)
+                    else:
+                        self.writer.write(server.encode(server.JOIN, game, server.BLACK_SEAT))
+                    self.stats["started"].append(game)
+            elif kind == server.STATE:
+                game = fields[0]
+                if fields[1] == 0 and (game in self.ai_games or self._seated_both(game)):
+                    self._next(game)
+            elif kind == server.DELTA:
+                self._on_delta(fields)
+            elif kind == server.ERROR:
+                self.stats["errors"] += 1
+                if fields[0]:
+                    self._finish(fields[0])
+                else:
+                    self.pending -= 1   # a NEW was refused
+            self._check_done()
+
+    def _seated_both(self, game):
+        # the second JOINED/STATE pair of a bot-vs-bot game: both seats are ours now
+        seen = self.stats["states"]
+        seen[game] = seen.get(game, 0) + 1
+        return seen[game] == 2
+
+    def _on_delta(self, fields):
+        game, ply, src, dst, power = fields[:5]
+        outcome = fields[8]
+        engine = self.engines.get(game)
+        if engine is None:
+            return
+        sent = self.sent.pop(game, None)
+        if sent is not None:
+            self.stats["latency"].append(time.perf_counter() - sent)
+        elif game in self.ai_games:
+            self.stats["ai_moves"] += 1
+        self.stats["moves"] += 1
+        color = side_to_move(engine)
+        server.apply_move(engine, 1 if color == "black" else 0, src, dst, power)
+        if outcome or ply >= self.args.plies:
+            self._finish(game)
+        elif not (game in self.ai_games and engine.turn["black"]):
+            self._next(game)
+
+    def _next(self, game):
+        engine = self.engines[game]
+        color = side_to_move(engine)
+        chosen = choose_move(engine, color, RANDOM, self.args.power_rate, self.rng)
+        if chosen is None:
+            self._finish(game)
+            return
+        if chosen[0] == "power":
+            _, src, target, _ = chosen
+            move = (square_of(*src), target[1] * 8 + target[0], 1)
+        else:
+            _, src, dst = chosen
+            move = (square_of(*src), dst[1] * 8 + dst[0], 0)
+        self.sent[game] = time.perf_counter()
+        self.writer.write(server.encode(server.MOVE, game, *move))
+
+    def _finish(self, game):
+        if self.engines.pop(game, None) is not None:
+            self.stats["finished"] += 1
+            self.sent.pop(game, None)
+            self.writer.write(server.encode(server.LEAVE, game))
+
+    def _check_done(self):
+        if not self.engines and not self.pending:
+            self.done.set()
+
+
+async def watch(reader, writer, games, stats):
+    """A spectator connection joined to `games`; counts the frames it receives."""
+    for game in games:
+        writer.write(server.encode(server.JOIN, game, server.SPECTATOR))
+    await writer.drain()
+    while True:
+        frame = await server.read_frame(reader)
+        if frame is None:
+            return
+        stats["spectator_frames"] += 1
+
+
+async def run(args):
+    local = None
+    if args.port:
+        async def connect():
+            return await asyncio.open_connection(args.host, args.port)
+    else:
+        local = server.GameServer(max_games=args.games + 1, ai_workers=args.ai_workers, ai_time=args.ai_time)
+        connect = local.connect_local
+
+    stats = {"frames": 0, "moves": 0, "ai_moves": 0, "errors": 0, "finished": 0, "latency": [],
+             "started": [], "states": {}, "spectator_frames": 0}
+    rng = random.Random(args.seed)
+    random.seed(args.seed)
+    clients = max(1, min(args.clients, args.games))
+    per_client = [args.games // clients + (1 if i < args.games % clients else 0) for i in range(clients)]
+    ai_share = [args.ai_games // clients + (1 if i < args.ai_games % clients else 0) for i in range(clients)]
+
+    start = time.perf_counter()
+    bots = []
+    for i in range(clients):
+        reader, writer = await connect()
+        bots.append(Bot(reader, writer, args, random.Random(rng.random()), stats))
+    tasks = [asyncio.ensure_future(bot.run(n, a)) for bot, n, a in zip(bots, per_client, ai_share)]
+
+    watchers = []
+    if args.spectators:
+        # spectators join once the games exist
+        while len(stats["started"]) < args.games and not all(t.done() for t in tasks):
+            await asyncio.sleep(0.01)
+        for _ in range(args.spectators):
+            reader, writer = await connect()
+            watchers.append((writer, asyncio.ensure_future(watch(reader, writer, list(stats["started"]), stats))))
+
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    for writer, task in watchers:
+        writer.close()
+        task.cancel()
+    if local is not None:
+        local.close()
+
+    latency = stats["latency"]
+    print(f"games {stats['finished']}/{args.games}  moves {stats['moves']} ({stats['ai_moves']} by the AI)  "
+          f"errors {stats['errors']}  {elapsed:.2f} s")
+    print(f"moves/sec {stats['moves'] / max(elapsed, 1e-9):.0f}  latency ms  "
+          f"p50 {percentile(latency, 50) * 1e3:.2f}  p99 {percentile(latency, 99) * 1e3:.2f}  "
+          f"max {max(latency, default=0.0) * 1e3:.2f}")
+    if args.spectators:
+        print(f"spectator frames {stats['spectator_frames']}")
+    return 0 if not stats["errors"] else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test for server.py.")
+    parser.add_argument("--games", type=int, default=500)
+    parser.add_argument("--clients", type=int, default=10, help="bot connections (games are spread over them)")
+    parser.add_argument("--super", action="store_true", help="SuperChess games")
+    parser.add_argument("--plies", type=int, default=60, help="stop each game after this many half-moves")
+    parser.add_argument("--power-rate", type=float, default=0.35, help="chance a charged bot uses a power")
+    parser.add_argument("--ai-games", type=int, default=0, help="games where the server AI plays black")
+    parser.add_argument("--ai-time", type=float, default=0.05, help="seconds per AI move (in-process server)")
+    parser.add_argument("--ai-workers", type=int, default=1, help="AI processes (in-process server)")
+    parser.add_argument("--spectators", type=int, default=0, help="connections watching every game")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0, help="a running server.py (default: in-process)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
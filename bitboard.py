@@ -0,0 +1,603 @@
+# bitboard.py
+"""
+Optional bitboard move generator.
+
+Square sets are plain Python ints used as 64-bit bitboards; bit i is board
+square i in the board.py layout (index y * 8 + x, a8 = 0, h1 = 63), so a
+bitboard and the Chess board array can be converted square for square.
+
+Knight/king/pawn attack tables and magic-indexed rook/bishop attack tables
+are built at import. The magic multipliers below were found once with
+find_magic() for this square layout; searching for them in pure Python
+takes far too long to do on every start.
+
+BitboardPosition mirrors the Chess generator (same castling, en-passant and
+promotion rules, quirks included) and exposes the same possible_moves /
+is_square_attacked / attack_squares_for contract. pseudo_moves reuses the
+(src, dst) tuples of piece targets it has seen before, and legal_moves filters
+them with pins and checkers (BETWEEN / LINE tables) instead of playing each
+move out. Running this file checks its perft node counts against the Chess
+generator:
+
+    python bitboard.py [depth]
+"""
+import random
+
+from board import (
+    EMPTY, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, WHITE, BLACK, KIND_MASK,
+    COLOR_INDEX, NAME_TO_CODE, KNIGHT_TARGETS, KING_TARGETS, PAWN_ATTACKS,
+    ROOK_RAYS, BISHOP_RAYS, SQ_NAME, make_code,
+)
+
+MASK64 = (1 << 64) - 1
+BIT = tuple(1 << sq for sq in range(64))
+
+
+def squares_of(bb):
+    """Square indices of the set bits of `bb`, lowest first."""
+    res = []
+    while bb:
+        low = bb & -bb
+        res.append(low.bit_length() - 1)
+        bb ^= low
+    return res
+
+
+def _bits(squares):
+    bb = 0
+    for sq in squares:
+        bb |= BIT[sq]
+    return bb
+
+
+# -------------------- Leaper tables --------------------
+
+KNIGHT_ATTACKS = tuple(_bits(KNIGHT_TARGETS[sq]) for sq in range(64))
+KING_ATTACKS = tuple(_bits(KING_TARGETS[sq]) for sq in range(64))
+# squares of each board row y (y = 0 is rank 8)
+RANK_MASKS = tuple(0xFF << (8 * y) for y in range(8))
+PAWN_ATTACKS_BB = tuple(tuple(_bits(PAWN_ATTACKS[c][sq]) for sq in range(64)) for c in (WHITE, BLACK))
+
+
+# -------------------- Magic sliding tables --------------------
+
+# magic multipliers per square (found with find_magic, seeded search)
+ROOK_MAGICS = (
+    0x0080008040002010, 0x0540012000500040, 0x1080082000100082, 0x0100082010000502,
+    0x2500021045004800, 0x0200020004100108, 0x1080408002002900, 0x0200102080440102,
+    0x0200800888204000, 0x1000c00040201000, 0x0402004082002010, 0x0060040041020080,
+    0x1010800400800800, 0x2c00800200040080, 0x0202002881420004, 0x014180010000c280,
+    0x2000248000401880, 0x0420048040008420, 0x0402020010402480, 0x0a82020020084010,
+    0x0a40050010080100, 0x110c008004800200, 0x0910040050084201, 0x8021020004108041,
+    0x0000800080204000, 0x0009d00840006000, 0x0120200080100088, 0x0030001100090420,
+    0x00a0110100080004, 0x0802000200100804, 0x3020080400820110, 0x0428c48200240451,
+    0x0000400088800020, 0x0200200040401000, 0x0100801000802000, 0x0001001001002008,
+    0x2010080080800400, 0x0101000401000208, 0x1411420804005001, 0x0c00204102000084,
+    0x0440004080208014, 0x0000402010004000, 0x10282081420a0010, 0x1078005000818009,
+    0x4080040008008080, 0x1002000410020009, 0x482a000408120021, 0x0020008044020001,
+    0x0040800420411500, 0x00a0004000300040, 0x2002081080204200, 0x0508048008100080,
+    0x0080900801000500, 0xa000020080040080, 0x0800291002180c00, 0x004a4041008c0600,
+    0x0000410028108001, 0x000283400010e101, 0x00a10a5200e08042, 0x2000100020040901,
+    0x0041004210080005, 0x2042009044080102, 0x400030021800810c, 0x0004002900408402,
+)
+BISHOP_MAGICS = (
+    0x1320200410404040, 0x0810104200484008, 0x8044184095000520, 0x0424104a00002400,
+    0x880110400084a108, 0x0000880440000400, 0x8001080104224000, 0x0002008a08110408,
+    0x200a212001010101, 0x820c084808208021, 0x2002610141020008, 0x0080108902081100,
+    0x2020020210050000, 0x0000010108402000, 0x9020440222022000, 0x0008018204900440,
+    0x00300220201a8086, 0x4011020454008400, 0x0010000808802209, 0xac06204802004404,
+    0x2022020422010020, 0x0040808508200200, 0x2010800208010800, 0x0002060101031b00,
+    0xaa22085891200800, 0x0408040008010820, 0x8008040a08002024, 0x400040400c010200,
+    0x0081001001004014, 0x0008604012011000, 0x1600808204042400, 0x2402810204242a0a,
+    0x0011300800102000, 0x2604028810200101, 0x008e002202100480, 0x8000040400880120,
+    0x2088020400c01100, 0x0020340102842080, 0x5001180100108420, 0x8042245142020214,
+    0x0004410848004028, 0x8004010402513081, 0x5882002104002040, 0x0200114010440200,
+    0x850002020a040400, 0x22400088a0800100, 0x0020820882000908, 0x020800ac08400488,
+    0x1126010c12c00401, 0x0106008444023021, 0x1503404404040200, 0x020000b108480000,
+    0x0804000410440028, 0x0824283150008000, 0x8829212802004084, 0x004410420200288c,
+    0x0044410088200221, 0x0010004044500811, 0x0000400201008840, 0x08001a8010840400,
+    0x08004a0090820200, 0x8000000a90100220, 0x2002888810008204, 0x2040048800444084,
+)
+
+
+def _relevant_mask(rays):
+    # the last square of every ray never changes the attack set
+    return _bits(sq for ray in rays for sq in ray[:-1])
+
+
+def _slider_attacks(rays, occupied):
+    attacks = 0
+    for ray in rays:
+        for sq in ray:
+            attacks |= BIT[sq]
+            if occupied & BIT[sq]:
+                break
+    return attacks
+
+
+def _subsets(mask):
+    """Every subset of `mask` (carry-rippler enumeration)."""
+    sub = 0
+    while True:
+        yield sub
+        sub = (sub - mask) & mask
+        if not sub:
+            break
+
+
+def find_magic(rays, rng=None, tries=10 ** 7):
+    """
+    Search a magic multiplier for one square given its rays (ROOK_RAYS[sq]
+    or BISHOP_RAYS[sq]). Used to produce ROOK_MAGICS / BISHOP_MAGICS.
+    """
+    rng = rng or random.Random()
+    mask = _relevant_mask(rays)
+    shift = 64 - bin(mask).count("1")
+    occupancies = list(_subsets(mask))
+    attacks = [_slider_attacks(rays, occ) for occ in occupancies]
+    for _ in range(tries):
+        magic = rng.getrandbits(64) & rng.getrandbits(64) & rng.getrandbits(64)
+        if bin((mask * magic) & 0xFF00000000000000).count("1") < 6:
+            continue
+        table = {}
+        for occ, att in zip(occupancies, attacks):
+            idx = ((occ * magic) & MASK64) >> shift
+            if table.setdefault(idx, att) != att:
+                break
+        else:
+            return magic
+    return None
+
+
+def _magic_tables(all_rays, magics):
+    masks, shifts, tables = [], [], []
+    for sq in range(64):
+        rays = all_rays[sq]
+        mask = _relevant_mask(rays)
+        shift = 64 - bin(mask).count("1")
+        magic = magics[sq]
+        table = [0] * (1 << (64 - shift))
+        for occ in _subsets(mask):
+            table[((occ * magic) & MASK64) >> shift] = _slider_attacks(rays, occ)
+        masks.append(mask)
+        shifts.append(shift)
+        tables.append(table)
+    return tuple(masks), tuple(shifts), tuple(tables)
+
+
+ROOK_MASKS, ROOK_SHIFTS, ROOK_TABLES = _magic_tables(ROOK_RAYS, ROOK_MAGICS)
+BISHOP_MASKS, BISHOP_SHIFTS, BISHOP_TABLES = _magic_tables(BISHOP_RAYS, BISHOP_MAGICS)
+
+
+def rook_attacks(sq, occupied):
+    return ROOK_TABLES[sq][((occupied & ROOK_MASKS[sq]) * ROOK_MAGICS[sq] & MASK64) >> ROOK_SHIFTS[sq]]
+
+
+def bishop_attacks(sq, occupied):
+    return BISHOP_TABLES[sq][((occupied & BISHOP_MASKS[sq]) * BISHOP_MAGICS[sq] & MASK64) >> BISHOP_SHIFTS[sq]]
+
+
+# -------------------- Line tables --------------------
+
+def _line_tables():
+    between = [[0] * 64 for _ in range(64)]
+    line = [[0] * 64 for _ in range(64)]
+    for a in range(64):
+        for attacks in (rook_attacks, bishop_attacks):
+            empty = attacks(a, 0)
+            for b in squares_of(empty):
+                between[a][b] = attacks(a, BIT[b]) & attacks(b, BIT[a])
+                line[a][b] = (empty & attacks(b, 0)) | BIT[a] | BIT[b]
+    return tuple(map(tuple, between)), tuple(map(tuple, line))
+
+
+# BETWEEN[a][b]: squares strictly between two aligned squares; LINE[a][b]: the
+# whole rank, file or diagonal through both (0 when they are not aligned)
+BETWEEN, LINE = _line_tables()
+
+# (src, dst) tuples per (targets bitboard, src) seen by pseudo_moves; positions
+# repeat the same piece targets all the time, so most lookups hit
+_PAIRS = {}
+PAIRS_LIMIT = 1 << 17
+
+
+# -------------------- Position --------------------
+
+class BitboardPosition(object):
+    """
+    Bitboard position with the Chess move rules.
+    pieces[code] holds one bitboard per board.py piece code, occupied[colour]
+    the union per side, mailbox the piece code per square. Castling state
+    is `unmoved` (the squares whose has_moved entry is False) and en passant
+    is the square of a pawn that just made a double step (or -1).
+    """
+
+    def __init__(self):
+        self.pieces = [0] * 16
+        self.occupied = [0, 0]
+        self.mailbox = bytearray(64)
+        self.unmoved = 0
+        self.ep = -1
+        self.side = WHITE
+
+    @classmethod
+    def from_chess(cls, engine):
+        """Build a position from a Chess engine's board, has_moved, last_move and turn."""
+        pos = cls()
+        for sq, code in enumerate(engine.board):
+            if code:
+                pos.pieces[code] |= BIT[sq]
+                pos.occupied[code >> 3] |= BIT[sq]
+        pos.mailbox[:] = engine.board
+        for sq in range(64):
+            if engine.has_moved.get(SQ_NAME[sq], True) is False:
+                pos.unmoved |= BIT[sq]
+        if engine.last_move:
+            (sx, sy), (dx, dy), piece = engine.last_move
+            if piece.endswith("pawn") and abs(sy - dy) == 2:
+                pos.ep = dy * 8 + dx
+        pos.side = BLACK if engine.turn["black"] else WHITE
+        return pos
+
+    # ---------------- Attacks ----------------
+
+    def attacked_by(self, sq, attacker, occ=None):
+        """
+        True if any piece of colour index `attacker` attacks square `sq`; sliders
+        see through to `occ` (default: the current occupancy).
+        """
+        pieces = self.pieces
+        base = 8 if attacker == BLACK else 0
+        if PAWN_ATTACKS_BB[attacker ^ 1][sq] & pieces[base | PAWN]:
+            return True
+        if KNIGHT_ATTACKS[sq] & pieces[base | KNIGHT]:
+            return True
+        if KING_ATTACKS[sq] & pieces[base | KING]:
+            return True
+        if occ is None:
+            occ = self.occupied[0] | self.occupied[1]
+        queens = pieces[base | QUEEN]
+        if rook_attacks(sq, occ) & (pieces[base | ROOK] | queens):
+            return True
+        return bool(bishop_attacks(sq, occ) & (pieces[base | BISHOP] | queens))
+
+    def attackers(self, sq, attacker):
+        """Bitboard of the pieces of colour index `attacker` that attack square `sq`."""
+        pieces = self.pieces
+        base = 8 if attacker == BLACK else 0
+        occ = self.occupied[0] | self.occupied[1]
+        queens = pieces[base | QUEEN]
+        return ((PAWN_ATTACKS_BB[attacker ^ 1][sq] & pieces[base | PAWN])
+                | (KNIGHT_ATTACKS[sq] & pieces[base | KNIGHT])
+                | (KING_ATTACKS[sq] & pieces[base | KING])
+                | (rook_attacks(sq, occ) & (pieces[base | ROOK] | queens))
+                | (bishop_attacks(sq, occ) & (pieces[base | BISHOP] | queens)))
+
+    def pinned(self, color, king):
+        """Bitboard of `color`'s pieces pinned to its king on square `king`."""
+        pieces = self.pieces
+        base = 8 if color == WHITE else 0       # the enemy's pieces
+        queens = pieces[base | QUEEN]
+        snipers = ((rook_attacks(king, 0) & (pieces[base | ROOK] | queens))
+                   | (bishop_attacks(king, 0) & (pieces[base | BISHOP] | queens)))
+        occ = self.occupied[0] | self.occupied[1]
+        own = self.occupied[color]
+        res = 0
+        while snipers:
+            low = snipers & -snipers
+            snipers ^= low
+            blockers = BETWEEN[king][low.bit_length() - 1] & occ
+            if blockers and not blockers & (blockers - 1) and blockers & own:
+                res |= blockers
+        return res
+
+    def in_check(self, color):
+        king = self.pieces[make_code(color, KING)]
+        return bool(king) and self.attacked_by(king.bit_length() - 1, color ^ 1)
+
+    def is_square_attacked(self, color, square_xy):
+        """Same contract as Chess.is_square_attacked: attacked by the enemies of `color`."""
+        if not square_xy:
+            return False
+        x, y = square_xy
+        return self.attacked_by(y * 8 + x, COLOR_INDEX[color] ^ 1)
+
+    def attacks_from(self, sq, code):
+        """Bitboard of the squares a piece `code` on `sq` attacks."""
+        kind = code & KIND_MASK
+        if kind == PAWN:
+            return PAWN_ATTACKS_BB[code >> 3][sq]
+        if kind == KNIGHT:
+            return KNIGHT_ATTACKS[sq]
+        if kind == KING:
+            return KING_ATTACKS[sq]
+        occ = self.occupied[0] | self.occupied[1]
+        if kind == ROOK:
+            return rook_attacks(sq, occ)
+        if kind == BISHOP:
+            return bishop_attacks(sq, occ)
+        return rook_attacks(sq, occ) | bishop_attacks(sq, occ)
+
+    def attack_squares_for(self, piece_name, piece_coord):
+        x, y = piece_coord
+        return [[t & 7, t >> 3] for t in squares_of(self.attacks_from(y * 8 + x, NAME_TO_CODE[piece_name]))]
+
+    # ---------------- Move generation ----------------
+
+    def _castle_targets(self, color, sq):
+        # mirrors Chess.castling_moves
+        back_y = 0 if color == BLACK else 7
+        base = back_y * 8
+        unmoved = self.unmoved
+        if not unmoved & BIT[base + (sq & 7)]:
+            return []
+        if self.attacked_by(sq, color ^ 1):
+            return []
+        occ = self.occupied[0] | self.occupied[1]
+        rook = make_code(color, ROOK)
+        res = []
+        if unmoved & BIT[base + 7] and self.mailbox[base + 7] == rook:
+            if not occ & (BIT[base + 5] | BIT[base + 6]):
+                if not self.attacked_by(base + 5, color ^ 1) and not self.attacked_by(base + 6, color ^ 1):
+                    res.append(base + 6)
+        if unmoved & BIT[base] and self.mailbox[base] == rook:
+            if not occ & (BIT[base + 1] | BIT[base + 2] | BIT[base + 3]):
+                if not self.attacked_by(base + 3, color ^ 1) and not self.attacked_by(base + 2, color ^ 1):
+                    res.append(base + 2)
+        return res
+
+    def _targets(self, sq, code):
+        """Pseudo-legal destination squares (list) of piece `code` standing on `sq`."""
+        color = code >> 3
+        kind = code & KIND_MASK
+        own = self.occupied[color]
+        if kind == PAWN:
+            occ = self.occupied[0] | self.occupied[1]
+            step = 8 if color == BLACK else -8
+            res = []
+            t = sq + step
+            if 0 <= t < 64 and not occ & BIT[t]:
+                res.append(t)
+                if sq >> 3 == (1 if color == BLACK else 6) and not occ & BIT[t + step]:
+                    res.append(t + step)
+            res += squares_of(PAWN_ATTACKS_BB[color][sq] & self.occupied[color ^ 1])
+            ep = self.ep
+            if ep >= 0 and ep >> 3 == sq >> 3 and abs((ep & 7) - (sq & 7)) == 1:
+                t = sq + step - (sq & 7) + (ep & 7)
+                if not own & BIT[t]:
+                    res.append(t)
+            return res
+        res = squares_of(self.attacks_from(sq, code) & ~own)
+        if kind == KING:
+            res += [t for t in self._castle_targets(color, sq) if not own & BIT[t]]
+        return res
+
+    def possible_moves(self, piece_name, piece_coord):
+        """Same contract as Chess.possible_moves: pseudo-legal [x, y] targets."""
+        if not piece_name:
+            return []
+        x, y = piece_coord
+        return [[t & 7, t >> 3] for t in self._targets(y * 8 + x, NAME_TO_CODE[piece_name])]
+
+    def pseudo_moves(self, color=None):
+        """All pseudo-legal (src, dst) pairs for `color` (default: side to move)."""
+        color = self.side if color is None else color
+        pieces = self.pieces
+        own = self.occupied[color]
+        enemy = self.occupied[color ^ 1]
+        occ = own | enemy
+        not_own = ~own & MASK64
+        base = 8 if color == BLACK else 0
+        moves = []
+        add = moves.append
+
+        # pawn pushes set-wise, captures and en passant per pawn
+        pawns = pieces[base | PAWN]
+        if color == WHITE:
+            step = -8
+            single = (pawns >> 8) & ~occ
+            double = ((single & RANK_MASKS[5]) >> 8) & ~occ
+        else:
+            step = 8
+            single = (pawns << 8) & ~occ & MASK64
+            double = ((single & RANK_MASKS[2]) << 8) & ~occ & MASK64
+        for t in squares_of(single):
+            add((t - step, t))
+        for t in squares_of(double):
+            add((t - 2 * step, t))
+        pawn_attacks = PAWN_ATTACKS_BB[color]
+        ep = self.ep
+        while pawns:
+            low = pawns & -pawns
+            pawns ^= low
+            sq = low.bit_length() - 1
+            targets = pawn_attacks[sq] & enemy
+            while targets:
+                bit = targets & -targets
+                targets ^= bit
+                add((sq, bit.bit_length() - 1))
+            if ep >= 0 and ep >> 3 == sq >> 3 and abs((ep & 7) - (sq & 7)) == 1:
+                t = sq + step - (sq & 7) + (ep & 7)
+                if not own & BIT[t]:
+                    add((sq, t))
+
+        # leapers and sliders; a queen is generated as a rook and as a bishop
+        pairs = _PAIRS
+        if len(pairs) > PAIRS_LIMIT:
+            pairs.clear()
+        extend = moves.extend
+        queens = pieces[base | QUEEN]
+        for kind, bb in ((KNIGHT, pieces[base | KNIGHT]), (ROOK, pieces[base | ROOK] | queens),
+                         (BISHOP, pieces[base | BISHOP] | queens), (KING, pieces[base | KING])):
+            while bb:
+                low = bb & -bb
+                bb ^= low
+                sq = low.bit_length() - 1
+                if kind == KNIGHT:
+                    targets = KNIGHT_ATTACKS[sq] & not_own
+                elif kind == ROOK:
+                    targets = ROOK_TABLES[sq][((occ & ROOK_MASKS[sq]) * ROOK_MAGICS[sq] & MASK64) >> ROOK_SHIFTS[sq]] & not_own
+                elif kind == BISHOP:
+                    targets = BISHOP_TABLES[sq][((occ & BISHOP_MASKS[sq]) * BISHOP_MAGICS[sq] & MASK64) >> BISHOP_SHIFTS[sq]] & not_own
+                else:
+                    targets = KING_ATTACKS[sq] & not_own
+                key = targets << 6 | sq
+                found = pairs.get(key)
+                if found is None:
+                    found = pairs[key] = tuple((sq, t) for t in squares_of(targets))
+                extend(found)
+                if kind == KING:
+                    for t in self._castle_targets(color, sq):
+                        if not own & BIT[t]:
+                            add((sq, t))
+        return moves
+
+    def legal_moves(self, color=None):
+        """
+        Pseudo-legal moves that do not leave the mover's king attacked. Pins and
+        checkers decide most moves from the tables; king moves test the target with
+        the king lifted, and en passant (which can uncover a rank) is played out.
+        """
+        color = self.side if color is None else color
+        moves = self.pseudo_moves(color)
+        kings = self.pieces[make_code(color, KING)]
+        if not kings:
+            return moves
+        king = kings.bit_length() - 1
+        enemy = color ^ 1
+        checkers = self.attackers(king, enemy)
+        if checkers & (checkers - 1):
+            evasions = 0                # double check: only the king may move
+        elif checkers:
+            evasions = checkers | BETWEEN[king][checkers.bit_length() - 1]
+        else:
+            evasions = MASK64
+        pinned = self.pinned(color, king)
+        line = LINE[king]
+        mailbox = self.mailbox
+        lifted = self.occupied[0] | self.occupied[1]
+        lifted ^= BIT[king]
+        legal = []
+        for move in moves:
+            src, dst = move
+            if src == king:
+                if not self.attacked_by(dst, enemy, lifted):
+                    legal.append(move)
+            elif mailbox[src] & KIND_MASK == PAWN and (dst & 7) != (src & 7) and not mailbox[dst]:
+                undo = self.make_move(move)
+                if not self.in_check(color):
+                    legal.append(move)
+                self.unmake_move(undo)
+            elif evasions & BIT[dst] and (not pinned & BIT[src] or line[src] & BIT[dst]):
+                legal.append(move)
+        return legal
+
+    # ---------------- Make / unmake ----------------
+
+    def _put(self, sq, code):
+        self.pieces[code] |= BIT[sq]
+        self.occupied[code >> 3] |= BIT[sq]
+        self.mailbox[sq] = code
+
+    def _lift(self, sq):
+        code = self.mailbox[sq]
+        if code:
+            self.pieces[code] &= ~BIT[sq]
+            self.occupied[code >> 3] &= ~BIT[sq]
+            self.mailbox[sq] = EMPTY
+        return code
+
+    def make_move(self, move):
+        """Same semantics as Chess.make_move; returns an undo token."""
+        src, dst = move[0], move[1]
+        mailbox = self.mailbox
+        code = self._lift(src)
+        c = code >> 3
+        kind = code & KIND_MASK
+        captured_sq = dst
+        rook_move = None
+        unmoved_prev = self.unmoved
+        ep_prev = self.ep
+
+        captured = self._lift(dst)
+        if kind == PAWN and not captured and (dst & 7) != (src & 7) and ep_prev == (src & ~7) | (dst & 7):
+            if mailbox[ep_prev] and mailbox[ep_prev] >> 3 != c:
+                captured_sq = ep_prev
+                captured = self._lift(ep_prev)
+        elif kind == KING and src >> 3 == dst >> 3 and abs(dst - src) == 2:
+            rook_src = (src & ~7) | (7 if dst > src else 0)
+            if mailbox[rook_src] == make_code(c, ROOK):
+                rook_dst = (src & ~7) | (5 if dst > src else 3)
+                self._put(rook_dst, self._lift(rook_src))
+                rook_move = (rook_src, rook_dst)
+                self.unmoved &= ~BIT[rook_src]
+
+        if kind == PAWN and dst >> 3 == (0 if c == WHITE else 7):
+            self._put(dst, make_code(c, move[2] if len(move) > 2 else QUEEN))
+        else:
+            self._put(dst, code)
+        self.unmoved &= ~BIT[src]
+        self.ep = dst if kind == PAWN and abs((dst >> 3) - (src >> 3)) == 2 else -1
+        self.side ^= 1
+        return (src, dst, code, captured, captured_sq, rook_move, unmoved_prev, ep_prev)
+
+    def unmake_move(self, undo):
+        src, dst, code, captured, captured_sq, rook_move, unmoved_prev, ep_prev = undo
+        self._lift(dst)
+        if captured:
+            self._put(captured_sq, captured)
+        self._put(src, code)
+        if rook_move:
+            rook_src, rook_dst = rook_move
+            self._put(rook_src, self._lift(rook_dst))
+        self.unmoved = unmoved_prev
+        self.ep = ep_prev
+        self.side ^= 1
+
+    # ---------------- Perft ----------------
+
+    def perft(self, depth):
+        """Number of legal move sequences of length `depth` (promotions count once, as in Chess)."""
+        moves = self.legal_moves()
+        if depth <= 1:
+            return len(moves) if depth == 1 else 1
+        nodes = 0
+        for move in moves:
+            undo = self.make_move(move)
+            nodes += self.perft(depth - 1)
+            self.unmake_move(undo)
+        return nodes
+
+
+def chess_perft(engine, depth):
+    """Reference perft over Chess.get_all_legal_moves using make_move/unmake_move."""
+    color = "black" if engine.turn["black"] else "white"
+    moves = engine.get_all_legal_moves(color)
+    if depth <= 1:
+        return len(moves) if depth == 1 else 1
+    nodes = 0
+    for (f, r), (dx, dy) in moves:
+        undo = engine.make_move(((8 - r) * 8 + ord(f) - 97, dy * 8 + dx))
+        nodes += chess_perft(engine, depth - 1)
+        engine.unmake_move(undo)
+    return nodes
+
+
+if __name__ == "__main__":
+    import sys, time
+    from bench_engine import make_engine
+
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    for label, opening in (("start position", ()), ("open game", None)):
+        engine = make_engine(opening=opening)
+        for d in range(1, depth + 1):
+            t = time.perf_counter()
+            expected = chess_perft(engine, d)
+            t_chess = time.perf_counter() - t
+            t = time.perf_counter()
+            got = BitboardPosition.from_chess(engine).perft(d)
+            t_bb = time.perf_counter() - t
+            status = "ok" if got == expected else "MISMATCH"
+            print(f"{label:15s} depth {d}: chess {expected:9d} ({t_chess:7.2f}s)  bitboard {got:9d} ({t_bb:7.2f}s)  {status}")
+            if got != expected:
+                sys.exit(1)
@@ -0,0 +1,183 @@
+# board.py
+"""
+Compact array-backed board core shared by the chess engines.
+
+The board is a flat 64-slot ``bytearray`` indexed ``y * 8 + x`` using the same
+board coordinates as the rest of the code (x = 0..7 for files a..h, y = 0..7
+from the top, so y = 0 is rank 8). Each slot holds a small piece code: the low
+three bits are the piece kind, bit 3 is the colour (0 = white, 1 = black).
+
+Precomputed target tables (knight, king, pawn attacks and sliding rays) let
+move generation and attack detection run without any coordinate conversion.
+"""
+from collections.abc import Mapping
+
+EMPTY = 0
+PAWN = 1
+KNIGHT = 2
+BISHOP = 3
+ROOK = 4
+QUEEN = 5
+KING = 6
+
+WHITE = 0
+BLACK = 1
+COLOR_BIT = 8
+KIND_MASK = 7
+
+# third element of a make_move tuple (src, dst, POWER): a SuperChess power activation
+POWER = 8
+
+COLORS = ("white", "black")
+COLOR_INDEX = {"white": WHITE, "black": BLACK}
+KINDS = ("", "pawn", "knight", "bishop", "rook", "queen", "king")
+KIND_INDEX = {name: i for i, name in enumerate(KINDS) if name}
+
+FILES = "abcdefgh"
+FILE_INDEX = {f: i for i, f in enumerate(FILES)}
+
+
+def make_code(color, kind):
+    """Piece code for colour index `color` (WHITE/BLACK) and `kind` (PAWN..KING)."""
+    return kind | (COLOR_BIT if color == BLACK else 0)
+
+
+# piece code <-> "white_queen" style names
+CODE_TO_NAME = [""] * 16
+NAME_TO_CODE = {"": EMPTY}
+for _color, _cname in enumerate(COLORS):
+    for _kind in range(PAWN, KING + 1):
+        _code = make_code(_color, _kind)
+        CODE_TO_NAME[_code] = f"{_cname}_{KINDS[_kind]}"
+        NAME_TO_CODE[CODE_TO_NAME[_code]] = _code
+CODE_TO_NAME = tuple(CODE_TO_NAME)
+
+
+# -------------------- Square helpers --------------------
+
+def sq_of(x, y):
+    """Board coords (x, y) -> square index."""
+    return y * 8 + x
+
+
+def square_of(file_char, row_no):
+    """('a'..'h', 1..8) -> square index."""
+    return (8 - row_no) * 8 + ord(file_char) - 97
+
+
+SQ_XY = tuple((i & 7, i >> 3) for i in range(64))
+SQ_FILE_ROW = tuple((FILES[i & 7], 8 - (i >> 3)) for i in range(64))
+SQ_NAME = tuple(f"{f}{r}" for f, r in SQ_FILE_ROW)
+# a1..a8, b1..b8, ... : the scan order of the legacy piece_location loops
+FILE_MAJOR_SQUARES = tuple(square_of(f, r) for f in FILES for r in range(1, 9))
+
+
+# -------------------- Precomputed tables --------------------
+
+ROOK_DIRECTIONS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+BISHOP_DIRECTIONS = ((-1, -1), (1, 1), (-1, 1), (1, -1))
+KNIGHT_OFFSETS = ((2, 1), (2, -1), (-2, 1), (-2, -1),
+                  (1, 2), (1, -2), (-1, 2), (-1, -2))
+KING_OFFSETS = tuple((dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx or dy)
+
+
+def _jump_table(offsets):
+    table = []
+    for sq in range(64):
+        x, y = SQ_XY[sq]
+        table.append(tuple(sq_of(x + dx, y + dy) for dx, dy in offsets
+                           if 0 <= x + dx < 8 and 0 <= y + dy < 8))
+    return tuple(table)
+
+
+def _ray_table(directions):
+    table = []
+    for sq in range(64):
+        x, y = SQ_XY[sq]
+        rays = []
+        for dx, dy in directions:
+            ray = []
+            cx, cy = x + dx, y + dy
+            while 0 <= cx < 8 and 0 <= cy < 8:
+                ray.append(sq_of(cx, cy))
+                cx += dx
+                cy += dy
+            rays.append(tuple(ray))
+        table.append(tuple(rays))
+    return tuple(table)
+
+
+KNIGHT_TARGETS = _jump_table(KNIGHT_OFFSETS)
+KING_TARGETS = _jump_table(KING_OFFSETS)
+# squares attacked by a pawn of each colour (white pawns attack upwards, y - 1)
+PAWN_ATTACKS = (_jump_table(((-1, -1), (1, -1))), _jump_table(((-1, 1), (1, 1))))
+ROOK_RAYS = _ray_table(ROOK_DIRECTIONS)
+BISHOP_RAYS = _ray_table(BISHOP_DIRECTIONS)
+QUEEN_RAYS = tuple(ROOK_RAYS[sq] + BISHOP_RAYS[sq] for sq in range(64))
+# ray table per sliding piece kind
+SLIDER_RAYS = {BISHOP: BISHOP_RAYS, ROOK: ROOK_RAYS, QUEEN: QUEEN_RAYS}
+
+
+# -------------------- piece_location compatibility view --------------------
+
+class PieceLocationView(Mapping):
+    """
+    Read-only view presenting an engine board in the legacy layout
+    ``piece_location[file][row] -> (piece_name, selected, (x, y))``.
+    Files iterate a..h and rows 8..1, matching the old nested dict.
+    Deep-copying the view produces a plain nested dict snapshot.
+    """
+    __slots__ = ("_engine",)
+
+    def __init__(self, engine):
+        self._engine = engine
+
+    def __getitem__(self, file_char):
+        if file_char not in FILE_INDEX:
+            raise KeyError(file_char)
+        return _FileView(self._engine, file_char)
+
+    def __iter__(self):
+        return iter(FILES)
+
+    def __len__(self):
+        return 8
+
+    def to_dict(self):
+        """Materialise the view as the legacy nested dict of lists."""
+        board = self._engine.board
+        selected = self._engine.selected_sq
+        out = {}
+        for f in FILES:
+            col = {}
+            for r in range(8, 0, -1):
+                sq = square_of(f, r)
+                col[r] = [CODE_TO_NAME[board[sq]], sq == selected, list(SQ_XY[sq])]
+            out[f] = col
+        return out
+
+    def __deepcopy__(self, memo):
+        return self.to_dict()
+
+    def __repr__(self):
+        return f"PieceLocationView({self.to_dict()!r})"
+
+
+class _FileView(Mapping):
+    __slots__ = ("_engine", "_file")
+
+    def __init__(self, engine, file_char):
+        self._engine = engine
+        self._file = file_char
+
+    def __getitem__(self, row_no):
+        if not isinstance(row_no, int) or not 1 <= row_no <= 8:
+            raise KeyError(row_no)
+        sq = square_of(self._file, row_no)
+        return (CODE_TO_NAME[self._engine.board[sq]], sq == self._engine.selected_sq, SQ_XY[sq])
+
+    def __iter__(self):
+        return iter(range(8, 0, -1))
+
+    def __len__(self):
+        return 8
@@ -0,0 +1,1035 @@
+# chess_core.py
+# Rules engine without any display: board state, move generation, make/unmake,
+# FEN and the AI entry point. Chess (chess.py) draws it and handles mouse input;
+# perft, benchmarks and self-play use ChessCore directly.
+from board import (
+    EMPTY, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, WHITE, BLACK, KIND_MASK,
+    COLORS, COLOR_INDEX, CODE_TO_NAME, NAME_TO_CODE, SQ_XY, SQ_FILE_ROW, SQ_NAME, FILE_MAJOR_SQUARES,
+    KNIGHT_TARGETS, KING_TARGETS, PAWN_ATTACKS, ROOK_RAYS, BISHOP_RAYS, QUEEN_RAYS, SLIDER_RAYS,
+    PieceLocationView, make_code, sq_of, square_of,
+)
+from evaluation import SQUARE_SCORE, material
+import opening_book
+from search import Search
+from zobrist import (
+    PIECE_KEYS, SIDE_KEY, CASTLE_KEYS, EP_KEYS, CORNER_SQUARES, TranspositionTable,
+    castle_rights, ep_file, position_hash,
+)
+
+
+class ChessCore(object):
+    def __init__(self):
+        self.promotion_pending = None
+
+        # turn tracking: 1 indicates that side to move
+        self.turn = {"black": 0, "white": 1}
+
+        # move list / selection
+        self.moves = []
+        self.selected_sq = None       # board index of the selected piece, or None
+
+        # board core: 64 piece codes indexed y*8+x (see board.py)
+        self.board = bytearray(64)
+
+        # tracked state
+        self.captured = []            # list of piece_name strings e.g. "white_queen"
+        self.winner = ""
+        self.has_moved = {}           # map like "e1": bool
+        self.last_move = None         # ((sx,sy),(dx,dy), piece_name)
+        self.position_counts = {}     # for threefold repetition: position_hash() -> count
+        self.zobrist = 0              # incremental hash of board/side/castling/en passant
+        self.material = 0             # incremental material + piece-square score, white positive (evaluation.material)
+        self.king_squares = [60, 4]   # board index of each king by colour index, kept by make/unmake
+        self._attack_maps = None      # (board bytes, (white counts, black counts)), see attack_maps()
+        self._legal_cache = None      # (position key, {color: legal move table, ...}), see _position_tables()
+
+        # AI support
+        self.ai_auto_promote = False
+        self.ai_time_limit = 0.3      # seconds of search per AI move
+        self.ai_hash_mb = 16          # transposition table size for the AI search
+        self.ai_tt = None             # created on the first AI move
+        self.ai_book = opening_book.book_path("classic")   # opening book file; None to always search
+
+        # initialize board
+        self.reset()
+
+    # -------------------- Helpers --------------------
+
+    @staticmethod
+    def xy_to_square(x, y):
+        """x,y board coords (0..7, 0..7 top=0) -> ('a'..'h', 1..8)"""
+        return chr(97 + x), 8 - y
+
+    @staticmethod
+    def square_to_xy(file_char, row_no):
+        """('a'..'h', 1..8) -> x,y board coords"""
+        return ord(file_char) - 97, 8 - row_no
+
+    @property
+    def piece_location(self):
+        """Read-only legacy view: piece_location[file][row] -> (piece_name, selected, (x, y))."""
+        return PieceLocationView(self)
+
+    @piece_location.setter
+    def piece_location(self, value):
+        # snapshots restore the board by assigning a legacy nested dict
+        self.load_piece_location(value)
+
+    def load_piece_location(self, mapping):
+        """Replace the board contents from a piece_location-style mapping."""
+        board = bytearray(64)
+        selected = None
+        for f, col in mapping.items():
+            for r, cell in col.items():
+                sq = square_of(f, r)
+                board[sq] = NAME_TO_CODE.get(cell[0] or "", EMPTY)
+                if len(cell) > 1 and cell[1]:
+                    selected = sq
+        self.board = board
+        self.selected_sq = selected
+        self.refresh_hash()
+
+    def piece_at(self, x, y):
+        """Piece name on board coords (x, y), or "" if empty."""
+        return CODE_TO_NAME[self.board[y * 8 + x]]
+
+    def set_piece(self, file_char, row_no, piece_name):
+        """Place `piece_name` (or "" to clear) on ('a'..'h', 1..8)."""
+        self.board[square_of(file_char, row_no)] = NAME_TO_CODE[piece_name or ""]
+        self.refresh_hash()
+
+    def selected_source(self):
+        """(file_char, row_no) of the selected piece, or None."""
+        if self.selected_sq is None:
+            return None
+        return SQ_FILE_ROW[self.selected_sq]
+
+    def clear_selection(self):
+        self.selected_sq = None
+
+    # -------------------- Initialization / reset --------------------
+
+    def reset(self):
+        """Reset board to starting position and clear state counters."""
+        self.moves = []
+        self.turn = {"black": 0, "white": 1}  # white starts
+        self.winner = ""
+        self.captured = []
+        self.has_moved = {}
+        self.last_move = None
+        self.position_counts = {}
+        self.selected_sq = None
+
+        # set pieces
+        self.board = bytearray(64)
+        order = (ROOK, KNIGHT, BISHOP, QUEEN, KING, BISHOP, KNIGHT, ROOK)
+        for x, kind in enumerate(order):
+            self.board[sq_of(x, 0)] = make_code(BLACK, kind)
+            self.board[sq_of(x, 1)] = make_code(BLACK, PAWN)
+            self.board[sq_of(x, 7)] = make_code(WHITE, kind)
+            self.board[sq_of(x, 6)] = make_code(WHITE, PAWN)
+
+        # mark rooks/kings as not moved if present on starting squares
+        for file in "abcdefgh":
+            for r in (1, 8):
+                if self.board[square_of(file, r)]:
+                    self.has_moved[file + str(r)] = False
+
+        # initial position count
+        self.refresh_hash()
+        key = self.position_hash()
+        self.position_counts[key] = self.position_counts.get(key, 0) + 1
+
+    # -------------------- End of game checks --------------------
+
+    def _after_move_checks(self, turn):
+        """Common checks after a successful move executed by `turn`."""
+        opponent = "white" if turn == "black" else "black"
+        # Checkmate
+        if self.is_in_check(opponent) and not self.has_legal_moves(opponent):
+            self.winner = turn.capitalize()
+            return
+        # Stalemate
+        if (not self.is_in_check(opponent)) and (not self.has_legal_moves(opponent)):
+            self.winner = "Stalemate"
+            return
+        # threefold repetition
+        key = self.position_hash()
+        cnt = self.position_counts.get(key, 0)
+        if cnt >= 3:
+            self.winner = "Threefold"
+        # otherwise continue
+
+    # -------------------- Move generation --------------------
+
+    def legal_moves_for(self, piece_name, piece_coord):
+        """Pseudo-legal moves filtered by leaving king in check."""
+        x, y = piece_coord
+        sq = y * 8 + x
+        code = self.board[sq]
+        if not code:
+            return []
+        if CODE_TO_NAME[code] != piece_name:
+            # asking about a piece that is not on that square: nothing to share
+            return self._legal_moves(piece_name, piece_coord)
+        return [dest[:] for dest in self.legal_move_table(COLORS[code >> 3]).get(sq, ())]
+
+    def _legal_moves(self, piece_name, piece_coord):
+        """
+        legal_moves_for without the cache; variants add their own filters here.
+        Strictly legal without playing anything: the king steps only to unattacked
+        squares, other pieces keep to their pin ray and, in check, to the evasion
+        squares of _king_safety; en passant gets its own test.
+        """
+        x, y = piece_coord
+        src = y * 8 + x
+        board = self.board
+        if not board[src]:
+            return []
+        code = NAME_TO_CODE[piece_name]
+        c = code >> 3
+        targets = self._pseudo_targets(src, code)
+        king, block, pins = self._king_safety(c)
+        if king < 0:
+            # no king on the board (a SuperChess power took it): nothing to keep safe
+            return [[t & 7, t >> 3] for t in targets]
+
+        if src == king:
+            # test the squares with the king lifted, so a slider also covers the squares behind it
+            # (put back the byte from the board: piece_name may name another piece)
+            lifted = board[king]
+            board[king] = EMPTY
+            try:
+                legal = [t for t in targets if not self._square_attacked_by(t, c ^ 1)]
+            finally:
+                board[king] = lifted
+            return [[t & 7, t >> 3] for t in legal]
+
+        allowed = pins.get(src)
+        if block is not None:
+            allowed = block if allowed is None else allowed & block
+        legal = []
+        for t in targets:
+            if code & KIND_MASK == PAWN and (t ^ src) & 7 and not board[t]:
+                if self._en_passant_safe(king, src, t, c):
+                    legal.append(t)
+            elif allowed is None or t in allowed:
+                legal.append(t)
+        return [[t & 7, t >> 3] for t in legal]
+
+    def _king_safety(self, c):
+        """
+        (king square, block, pins) for colour index `c`, found once per position.
+        block is None when the king is not in check, else the squares a non-king move
+        must land on: the checker and, for a slider, the squares in between (none in
+        double check). pins maps a pinned piece's square to its pin ray, pinner included.
+        The king square is -1 when there is no king.
+        """
+        tables = self._position_tables()
+        info = tables.get(("pins", c))
+        if info is not None:
+            return info
+        board = self.board
+        king = self._king_square(c)
+        block, pins = None, {}
+        if king >= 0:
+            enemy = c ^ 1
+            checks = []
+            for i, ray in enumerate(QUEEN_RAYS[king]):
+                slider = ROOK if i < 4 else BISHOP      # the first four rays are straight
+                own = -1
+                for n, s in enumerate(ray):
+                    p = board[s]
+                    if not p:
+                        continue
+                    if p >> 3 == c:
+                        if own >= 0:
+                            break
+                        own = s
+                        continue
+                    if p & KIND_MASK == slider or p & KIND_MASK == QUEEN:
+                        if own >= 0:
+                            pins[own] = frozenset(ray[:n + 1])
+                        else:
+                            checks.append(frozenset(ray[:n + 1]))
+                    break
+            knight, pawn = make_code(enemy, KNIGHT), make_code(enemy, PAWN)
+            checks += [frozenset((s,)) for s in KNIGHT_TARGETS[king] if board[s] == knight]
+            checks += [frozenset((s,)) for s in PAWN_ATTACKS[c][king] if board[s] == pawn]
+            if checks:
+                block = checks[0] if len(checks) == 1 else frozenset()
+        info = tables[("pins", c)] = (king, block, pins)
+        return info
+
+    def _en_passant_safe(self, king, src, dst, c):
+        """
+        True if the en passant capture src -> dst leaves colour index `c`'s king safe.
+        Two pawns leave the same rank at once, which pins cannot describe, so the
+        king's lines are scanned again with src and the captured square empty and dst taken.
+        """
+        board = self.board
+        enemy = c ^ 1
+        cap = (src & ~7) | (dst & 7)
+        knight, pawn = make_code(enemy, KNIGHT), make_code(enemy, PAWN)
+        if any(board[s] == knight for s in KNIGHT_TARGETS[king]):
+            return False
+        if any(board[s] == pawn and s != cap for s in PAWN_ATTACKS[c][king]):
+            return False
+        for i, ray in enumerate(QUEEN_RAYS[king]):
+            slider = ROOK if i < 4 else BISHOP
+            for s in ray:
+                if s == dst:
+                    break
+                p = board[s]
+                if p and s != src and s != cap:
+                    if p >> 3 == enemy and (p & KIND_MASK == slider or p & KIND_MASK == QUEEN):
+                        return False
+                    break
+        return True
+
+    def legal_move_table(self, color):
+        """
+        {square index: [[x, y], ...]} with the legal moves of every piece of `color`.
+        Filled once per position and shared by selection, end-of-game checks and the
+        AI root; a real move, power or fortress change gives a new position key.
+        """
+        tables = self._position_tables()
+        table = tables.get(color)
+        if table is None:
+            table = {}
+            c = COLOR_INDEX[color]
+            for sq, code in enumerate(self.board):
+                if code and code >> 3 == c:
+                    moves = self._legal_moves(CODE_TO_NAME[code], list(SQ_XY[sq]))
+                    if moves:
+                        table[sq] = moves
+            tables[color] = table
+        return table
+
+    def _position_tables(self):
+        """The dict of per-position tables (legal_move_table and variant ones), emptied when the position changes."""
+        key = (self.position_hash(), bytes(self.board))
+        cache = self._legal_cache
+        if cache is None or cache[0] != key:
+            cache = self._legal_cache = (key, {})
+        return cache[1]
+
+    def has_legal_moves(self, color):
+        return bool(self.legal_move_table(color))
+
+    def possible_moves(self, piece_name, piece_coord):
+        """Generate pseudo-legal moves (may include moves that leave king in check)."""
+        if not piece_name:
+            return []
+        x, y = piece_coord
+        return [[t & 7, t >> 3] for t in self._pseudo_targets(y * 8 + x, NAME_TO_CODE[piece_name])]
+
+    def _pseudo_targets(self, sq, code):
+        """Pseudo-legal destination squares for piece `code` standing on `sq`."""
+        board = self.board
+        color = code >> 3
+        kind = code & KIND_MASK
+
+        if kind == PAWN:
+            targets = self._pawn_targets(sq, color)
+        elif kind == KNIGHT:
+            targets = KNIGHT_TARGETS[sq]
+        elif kind == KING:
+            targets = list(KING_TARGETS[sq])
+            # castling squares (no self-check filtering inside)
+            x, y = SQ_XY[sq]
+            targets += [t[1] * 8 + t[0] for t in self.castling_moves(COLORS[color], (x, y))]
+        else:
+            targets = []
+            if kind != BISHOP:
+                for ray in ROOK_RAYS[sq]:
+                    for t in ray:
+                        targets.append(t)
+                        if board[t]:
+                            break
+            if kind != ROOK:
+                for ray in BISHOP_RAYS[sq]:
+                    for t in ray:
+                        targets.append(t)
+                        if board[t]:
+                            break
+
+        # remove friendly-occupied squares
+        return [t for t in targets if not board[t] or board[t] >> 3 != color]
+
+    def pawn_moves(self, color, pos):
+        x, y = pos
+        return [[t & 7, t >> 3] for t in self._pawn_targets(y * 8 + x, COLOR_INDEX[color])]
+
+    def _pawn_targets(self, sq, color):
+        board = self.board
+        x, y = SQ_XY[sq]
+        moves = []
+        step = 8 if color == BLACK else -8
+        start_y = 1 if color == BLACK else 6
+
+        # forward one
+        t = sq + step
+        if 0 <= t < 64 and not board[t]:
+            moves.append(t)
+            # forward two from start
+            if y == start_y and not board[t + step]:
+                moves.append(t + step)
+
+        # diagonal captures
+        for t in PAWN_ATTACKS[color][sq]:
+            if board[t] and board[t] >> 3 != color:
+                moves.append(t)
+
+        # en passant (capture the pawn that just advanced two)
+        if self.last_move:
+            (lsx, lsy), (ldx, ldy), last_piece = self.last_move
+            if last_piece.endswith("pawn") and abs(lsy - ldy) == 2 and ldy == y:
+                if abs(ldx - x) == 1:  # adjacent file
+                    moves.append((y + step // 8) * 8 + ldx)
+
+        return moves
+
+    def _pseudo_moves(self, color):
+        """
+        All pseudo-legal (src, dst) square pairs for colour index `color` in a single
+        pass over the board (same targets as _pseudo_targets for every piece).
+        """
+        board = self.board
+        moves = []
+        add = moves.append
+        step = 8 if color == BLACK else -8
+        start_y = 1 if color == BLACK else 6
+        pawn_attacks = PAWN_ATTACKS[color]
+
+        ep_file = -1
+        if self.last_move:
+            (lsx, lsy), (ldx, ldy), last_piece = self.last_move
+            if last_piece.endswith("pawn") and abs(lsy - ldy) == 2:
+                ep_file, ep_y = ldx, ldy
+
+        for sq, code in enumerate(board):
+            if not code or code >> 3 != color:
+                continue
+            kind = code & KIND_MASK
+
+            if kind == PAWN:
+                t = sq + step
+                if 0 <= t < 64 and not board[t]:
+                    add((sq, t))
+                    if sq >> 3 == start_y and not board[t + step]:
+                        add((sq, t + step))
+                for t in pawn_attacks[sq]:
+                    p = board[t]
+                    if p and p >> 3 != color:
+                        add((sq, t))
+                if ep_file >= 0 and ep_y == sq >> 3 and abs(ep_file - (sq & 7)) == 1:
+                    t = sq + step - (sq & 7) + ep_file
+                    if not board[t] or board[t] >> 3 != color:
+                        add((sq, t))
+
+            elif kind == KNIGHT or kind == KING:
+                for t in (KNIGHT_TARGETS if kind == KNIGHT else KING_TARGETS)[sq]:
+                    p = board[t]
+                    if not p or p >> 3 != color:
+                        add((sq, t))
+                if kind == KING:
+                    for tx, ty in self.castling_moves(COLORS[color], SQ_XY[sq]):
+                        add((sq, ty * 8 + tx))
+
+            else:
+                for ray in SLIDER_RAYS[kind][sq]:
+                    for t in ray:
+                        p = board[t]
+                        if p:
+                            if p >> 3 != color:
+                                add((sq, t))
+                            break
+                        add((sq, t))
+        return moves
+
+    def _pseudo_powers(self, color):
+        """Power activations as (src, dst, POWER) moves; plain chess has none (see SuperChessCore)."""
+        return []
+
+    def castling_moves(self, color, pos):
+        x, y = pos
+        board = self.board
+        c = COLOR_INDEX[color]
+        back_y = 0 if color == "black" else 7
+        row_no = 8 if color == "black" else 1
+        king_sq = chr(97 + x) + str(row_no)
+        base = back_y * 8
+        rook = make_code(c, ROOK)
+
+        # must be on original square and not moved
+        if self.has_moved.get(king_sq, True):
+            return []
+        # cannot castle out of check
+        if self._square_attacked_by(y * 8 + x, c ^ 1):
+            return []
+
+        res = []
+        # king-side
+        if not self.has_moved.get("h" + str(row_no), True) and board[base + 7] == rook:
+            path_clear = not board[base + 5] and not board[base + 6]
+            if path_clear and not self._square_attacked_by(base + 5, c ^ 1) and not self._square_attacked_by(base + 6, c ^ 1):
+                res.append([6, back_y])
+
+        # queen-side
+        if not self.has_moved.get("a" + str(row_no), True) and board[base] == rook:
+            path_clear = not board[base + 1] and not board[base + 2] and not board[base + 3]
+            if path_clear and not self._square_attacked_by(base + 3, c ^ 1) and not self._square_attacked_by(base + 2, c ^ 1):
+                res.append([2, back_y])
+
+        return res
+
+    # -------------------- Attacks / check detection --------------------
+
+    def is_in_check(self, color):
+        return self._in_check(COLOR_INDEX[color])
+
+    def _in_check(self, c):
+        """is_in_check for colour index `c`."""
+        sq = self._king_square(c)
+        return sq >= 0 and self._square_attacked_by(sq, c ^ 1)
+
+    def _king_square(self, c):
+        """Board index of colour index `c`'s king, or -1 if it has none."""
+        sq = self.king_squares[c]
+        king = make_code(c, KING)
+        if self.board[sq] != king:
+            # the board was written directly (set_fen, powers, simulations): look it up again
+            sq = self.board.find(king)
+            if sq >= 0:
+                self.king_squares[c] = sq
+        return sq
+
+    def is_stalemate(self, color):
+        if self.is_in_check(color):
+            return False
+        return not self.has_legal_moves(color)
+
+    def is_square_attacked(self, color, square_xy):
+        if not square_xy:
+            return False
+        x, y = square_xy
+        return self._square_attacked_by(y * 8 + x, COLOR_INDEX[color] ^ 1)
+
+    def _square_attacked_by(self, sq, attacker):
+        """True if any piece of colour index `attacker` attacks square `sq`."""
+        board = self.board
+        # look outward from the target square for each kind of attacker
+        pawn = make_code(attacker, PAWN)
+        for s in PAWN_ATTACKS[attacker ^ 1][sq]:
+            if board[s] == pawn:
+                return True
+        knight = make_code(attacker, KNIGHT)
+        for s in KNIGHT_TARGETS[sq]:
+            if board[s] == knight:
+                return True
+        king = make_code(attacker, KING)
+        for s in KING_TARGETS[sq]:
+            if board[s] == king:
+                return True
+        queen = make_code(attacker, QUEEN)
+        rook = make_code(attacker, ROOK)
+        for ray in ROOK_RAYS[sq]:
+            for s in ray:
+                p = board[s]
+                if p:
+                    if p == rook or p == queen:
+                        return True
+                    break
+        bishop = make_code(attacker, BISHOP)
+        for ray in BISHOP_RAYS[sq]:
+            for s in ray:
+                p = board[s]
+                if p:
+                    if p == bishop or p == queen:
+                        return True
+                    break
+        return False
+
+    def attack_maps(self):
+        """
+        Attack counts for the current board: attack_maps()[c][sq] is the number of
+        pieces of colour index c attacking sq. Built once per board and kept until
+        the board changes, for the draw path (checked_kings), which asks every frame;
+        move generation keeps using _square_attacked_by's direct scan.
+        """
+        board = self.board
+        maps = self._attack_maps
+        if maps is not None and maps[0] == board:
+            return maps[1]
+        counts = (bytearray(64), bytearray(64))
+        for sq, code in enumerate(board):
+            if code:
+                attacked = counts[code >> 3]
+                for t in self._attack_targets(sq, code):
+                    attacked[t] += 1
+        self._attack_maps = (bytes(board), counts)
+        return counts
+
+    def checked_kings(self):
+        """(x, y) of every king in check, read from attack_maps()."""
+        maps = self.attack_maps()
+        res = []
+        for c in (WHITE, BLACK):
+            sq = self._king_square(c)
+            if sq >= 0 and maps[c ^ 1][sq]:
+                res.append(SQ_XY[sq])
+        return res
+
+    def attack_squares_for(self, piece_name, piece_coord):
+        """Squares a piece attacks (used for check). Castling excluded."""
+        x, y = piece_coord
+        return [[t & 7, t >> 3] for t in self._attack_targets(y * 8 + x, NAME_TO_CODE[piece_name])]
+
+    def _attack_targets(self, sq, code):
+        kind = code & KIND_MASK
+        if kind == PAWN:
+            return list(PAWN_ATTACKS[code >> 3][sq])
+        if kind == KNIGHT:
+            return list(KNIGHT_TARGETS[sq])
+        if kind == KING:
+            return list(KING_TARGETS[sq])
+
+        # sliding
+        board = self.board
+        res = []
+        if kind != BISHOP:
+            for ray in ROOK_RAYS[sq]:
+                for t in ray:
+                    res.append(t)
+                    if board[t]:
+                        break
+        if kind != ROOK:
+            for ray in BISHOP_RAYS[sq]:
+                for t in ray:
+                    res.append(t)
+                    if board[t]:
+                        break
+        return res
+
+    def find_king(self, color):
+        sq = self._king_square(COLOR_INDEX[color])
+        return list(SQ_XY[sq]) if sq >= 0 else None
+
+    # -------------------- Move execution --------------------
+
+    def validate_move(self, destination, simulate=False, source=None):
+        """
+        Execute a move to `destination` (x,y).
+        If simulate=True, do not toggle turns or update selection/UI, but do modify board.
+        `source` must be (file_char, row_no) when simulating.
+        Returns True if move executed (or simulated) successfully, False otherwise.
+        """
+        board = self.board
+        dx, dy = destination
+        dst = dy * 8 + dx
+
+        # find source
+        if source is None:
+            if self.selected_sq is None:
+                return False
+            src_file, src_row = SQ_FILE_ROW[self.selected_sq]
+        else:
+            src_file, src_row = source
+        src = square_of(src_file, src_row)
+
+        code = board[src]
+        if not code:
+            return False
+
+        piece_name = CODE_TO_NAME[code]
+        c = code >> 3
+        color = COLORS[c]
+
+        # PROMOTION: pick the piece before the move is applied
+        promoted_piece = None
+        if code & KIND_MASK == PAWN and dy == (0 if c == WHITE else 7):
+            if simulate or getattr(self, "ai_auto_promote", False):
+                # in simulation (and for the AI), auto-queen
+                promoted_piece = f"{color}_queen"
+            else:
+                choice = self.choose_promotion(color)
+                promoted_piece = f"{color}_{choice}"
+        promo = NAME_TO_CODE[promoted_piece] & KIND_MASK if promoted_piece else QUEEN
+
+        last_before = self.last_move
+        undo = self.make_move((src, dst, promo))
+
+        if simulate:
+            # a simulated move keeps the side to move and last_move untouched
+            self.turn["white"], self.turn["black"] = self.turn["black"], self.turn["white"]
+            self.last_move = last_before
+            self.refresh_hash()
+            return True
+
+        # capture bookkeeping (en passant included)
+        captured = undo[3]
+        newly_captured = []
+        if captured:
+            newly_captured.append(CODE_TO_NAME[captured])
+            self.captured.append(CODE_TO_NAME[captured])
+
+        if self.selected_sq == src:
+            self.selected_sq = None
+
+        # build a conservative last_move_meta (so Game.record_last_move uses it consistently)
+        self.last_move_meta = {
+            'type': 'move',
+            'src': (src_file, src_row),
+            'dst': (dx, dy),
+            'piece': piece_name,
+            'captured': newly_captured,
+            'promotion': promoted_piece,  # None if no promotion, otherwise e.g. "white_queen"
+            'consumed_charge': False
+        }
+
+        # update threefold position count
+        key = self.position_hash()
+        self.position_counts[key] = self.position_counts.get(key, 0) + 1
+
+        return True
+
+    def choose_promotion(self, color):
+        """Promotion piece for a human move ('queen', 'rook', 'bishop' or 'knight')."""
+        return "queen"
+
+    # -------------------- Make / unmake --------------------
+
+    def make_move(self, move):
+        """
+        Apply `move` to the board and return an undo token for unmake_move.
+        `move` is (src, dst) or (src, dst, promotion_kind) with board square indices;
+        pawns reaching the last rank promote to promotion_kind (QUEEN by default).
+        Handles captures, en passant and castling, updates has_moved and last_move
+        and toggles the side to move; the Zobrist hash and the material score are
+        updated incrementally. No legality checks are made. The token is
+        (src, dst, piece, captured, captured_sq, rook_move, has_moved_prev, last_move_prev,
+        hash_prev, material_prev).
+        """
+        board = self.board
+        has_moved = self.has_moved
+        src, dst = move[0], move[1]
+        code = board[src]
+        c = code >> 3
+        kind = code & KIND_MASK
+        sx, sy = SQ_XY[src]
+        dx, dy = SQ_XY[dst]
+        captured = board[dst]
+        captured_sq = dst
+        rook_move = None
+        src_key = SQ_NAME[src]
+        moved_prev = [(src_key, has_moved.get(src_key))]
+
+        hash_prev = h = self.zobrist
+        material_prev = self.material
+        # castling rights can only change when a corner square is involved
+        corner = src in CORNER_SQUARES or dst in CORNER_SQUARES or (kind == KING and abs(dx - sx) == 2)
+        if corner:
+            h ^= CASTLE_KEYS[castle_rights(board, has_moved)]
+        ep_prev = ep_file(self.last_move)
+        if ep_prev >= 0:
+            h ^= EP_KEYS[ep_prev]
+
+        # EN PASSANT capture (pawn moving diagonally to an empty square)
+        if kind == PAWN and not captured and dx != sx and self.last_move:
+            (lsx, lsy), (ldx, ldy), lpiece = self.last_move
+            if lpiece.endswith("pawn") and abs(lsy - ldy) == 2 and ldx == dx and ldy == sy:
+                ep = sy * 8 + dx
+                if board[ep] and board[ep] >> 3 != c:
+                    captured = board[ep]
+                    captured_sq = ep
+                    board[ep] = EMPTY
+
+        # CASTLING: move rook too ('h' -> 'f' king-side, 'a' -> 'd' queen-side)
+        elif kind == KING and sy == dy and abs(dx - sx) == 2:
+            rook_src = sy * 8 + (7 if dx > sx else 0)
+            if board[rook_src] == make_code(c, ROOK):
+                rook_dst = sy * 8 + (5 if dx > sx else 3)
+                board[rook_dst] = board[rook_src]
+                board[rook_src] = EMPTY
+                rook_move = (rook_src, rook_dst)
+                h ^= PIECE_KEYS[board[rook_dst]][rook_src] ^ PIECE_KEYS[board[rook_dst]][rook_dst]
+                self.material += SQUARE_SCORE[board[rook_dst]][rook_dst] - SQUARE_SCORE[board[rook_dst]][rook_src]
+                rook_key = SQ_NAME[rook_src]
+                moved_prev.append((rook_key, has_moved.get(rook_key)))
+                has_moved[rook_key] = True
+
+        # move piece (promoting on the last rank)
+        board[src] = EMPTY
+        if kind == PAWN and dy == (0 if c == WHITE else 7):
+            board[dst] = make_code(c, move[2] if len(move) > 2 else QUEEN)
+        else:
+            board[dst] = code
+        has_moved[src_key] = True
+        if kind == KING:
+            self.king_squares[c] = dst
+
+        h ^= PIECE_KEYS[code][src] ^ PIECE_KEYS[board[dst]][dst] ^ PIECE_KEYS[captured][captured_sq] ^ SIDE_KEY
+        self.material += SQUARE_SCORE[board[dst]][dst] - SQUARE_SCORE[code][src] - SQUARE_SCORE[captured][captured_sq]
+        if corner:
+            h ^= CASTLE_KEYS[castle_rights(board, has_moved)]
+        if kind == PAWN and abs(dy - sy) == 2:
+            h ^= EP_KEYS[dx]
+        self.zobrist = h
+
+        last_prev = self.last_move
+        self.last_move = ((sx, sy), (dx, dy), CODE_TO_NAME[code])
+        turn = self.turn
+        turn["white"], turn["black"] = turn["black"], turn["white"]
+
+        return (src, dst, code, captured, captured_sq, rook_move, moved_prev, last_prev, hash_prev, material_prev)
+
+    def unmake_move(self, undo):
+        """Take back a move applied by make_move, given its undo token."""
+        src, dst, code, captured, captured_sq, rook_move, moved_prev, last_prev, hash_prev, material_prev = undo
+        board = self.board
+        board[dst] = EMPTY
+        board[captured_sq] = captured
+        board[src] = code
+        if code & KIND_MASK == KING:
+            self.king_squares[code >> 3] = src
+        if rook_move:
+            rook_src, rook_dst = rook_move
+            board[rook_src] = board[rook_dst]
+            board[rook_dst] = EMPTY
+
+        has_moved = self.has_moved
+        for key, prev in reversed(moved_prev):
+            if prev is None:
+                del has_moved[key]
+            else:
+                has_moved[key] = prev
+
+        self.last_move = last_prev
+        self.zobrist = hash_prev
+        self.material = material_prev
+        turn = self.turn
+        turn["white"], turn["black"] = turn["black"], turn["white"]
+
+    # -------------------- Sliding move helpers --------------------
+
+    def diagonal_moves(self, positions, piece_name, piece_coord):
+        x, y = piece_coord
+        board = self.board
+        for ray in BISHOP_RAYS[y * 8 + x]:
+            for t in ray:
+                positions.append([t & 7, t >> 3])
+                if board[t]:
+                    break
+        return positions
+
+    def linear_moves(self, positions, piece_name, piece_coord):
+        x, y = piece_coord
+        board = self.board
+        for ray in ROOK_RAYS[y * 8 + x]:
+            for t in ray:
+                positions.append([t & 7, t >> 3])
+                if board[t]:
+                    break
+        return positions
+
+    # -------------------- FEN --------------------
+
+    def set_fen(self, fen):
+        """
+        Load a position from a FEN string (placement, side to move, castling, en passant).
+        Castling rights become has_moved entries and the en-passant square becomes
+        the matching pawn double step in last_move; the move counters are ignored.
+        """
+        fields = fen.split()
+        rows = fields[0].split("/")
+        if len(rows) != 8:
+            raise ValueError(f"bad FEN placement: {fields[0]!r}")
+        letters = {"p": PAWN, "n": KNIGHT, "b": BISHOP, "r": ROOK, "q": QUEEN, "k": KING}
+
+        board = bytearray(64)
+        for y, row in enumerate(rows):
+            x = 0
+            for ch in row:
+                if ch.isdigit():
+                    x += int(ch)
+                    continue
+                if ch.lower() not in letters or x > 7:
+                    raise ValueError(f"bad FEN row: {row!r}")
+                board[y * 8 + x] = make_code(BLACK if ch.islower() else WHITE, letters[ch.lower()])
+                x += 1
+            if x != 8:
+                raise ValueError(f"bad FEN row: {row!r}")
+
+        side = fields[1] if len(fields) > 1 else "w"
+        rights = fields[2] if len(fields) > 2 else "-"
+        ep = fields[3] if len(fields) > 3 else "-"
+
+        self.moves = []
+        self.winner = ""
+        self.captured = []
+        self.selected_sq = None
+        self.board = board
+        self.turn = {"black": int(side == "b"), "white": int(side != "b")}
+
+        self.has_moved = {}
+        for flag, king, rook in (("K", "e1", "h1"), ("Q", "e1", "a1"), ("k", "e8", "h8"), ("q", "e8", "a8")):
+            if flag in rights:
+                self.has_moved[king] = False
+                self.has_moved[rook] = False
+
+        self.last_move = None
+        if ep != "-":
+            x, y = self.square_to_xy(ep[0], int(ep[1]))
+            # the pawn that just moved passed over (x, y): white from row 2, black from row 7
+            if y == 5:
+                self.last_move = ((x, 6), (x, 4), "white_pawn")
+            else:
+                self.last_move = ((x, 1), (x, 3), "black_pawn")
+
+        self.position_counts = {}
+        self.refresh_hash()
+        self.position_counts[self.position_hash()] = 1
+
+    def get_fen(self):
+        """FEN string of the current position (move counters are not tracked: '0 1')."""
+        letters = " pnbrqk"
+        rows = []
+        for y in range(8):
+            row, empty = "", 0
+            for x in range(8):
+                code = self.board[y * 8 + x]
+                if not code:
+                    empty += 1
+                    continue
+                if empty:
+                    row += str(empty)
+                    empty = 0
+                ch = letters[code & KIND_MASK]
+                row += ch if code >> 3 == BLACK else ch.upper()
+            rows.append(row + (str(empty) if empty else ""))
+
+        key = self.get_position_key()
+        _, side, rights, ep = key.rsplit("_", 3)
+        if rights != "-":
+            # the repetition key only checks the rooks; castling also needs the unmoved king
+            white_king = self.board[60] == make_code(WHITE, KING) and not self.has_moved.get("e1", True)
+            black_king = self.board[4] == make_code(BLACK, KING) and not self.has_moved.get("e8", True)
+            rights = "".join(f for f in rights if (white_king if f.isupper() else black_king)) or "-"
+        return "{} {} {} {} 0 1".format("/".join(rows), side, rights, ep)
+
+    # -------------------- Position hash --------------------
+
+    def refresh_hash(self):
+        """Recompute the Zobrist hash and the material score after the board or flags were written directly."""
+        self.zobrist = position_hash(self.board, self.turn["black"], self.has_moved, self.last_move)
+        self.material = material(self.board, WHITE)
+        self._legal_cache = None
+
+    def position_hash(self):
+        """64-bit key of the current position; position_counts is keyed by it."""
+        return self.zobrist
+
+    # -------------------- Utility for repetition detection --------------------
+
+    def get_position_key(self):
+        """
+        Compose a canonical position key that includes:
+          - piece placement (the raw board bytes)
+          - side to move (w/b)
+          - castling rights (KQkq subset)
+          - en-passant target (e.g. 'e3' or '-')
+        Readable counterpart of position_hash(); get_fen builds on it.
+        """
+        board = self.board
+        turn = "w" if self.turn["white"] else "b"
+
+        # castling rights: check if rooks on starting squares and haven't moved
+        rights = []
+        if board[63] == make_code(WHITE, ROOK) and not self.has_moved.get("h1", True):
+            rights.append("K")
+        if board[56] == make_code(WHITE, ROOK) and not self.has_moved.get("a1", True):
+            rights.append("Q")
+        if board[7] == make_code(BLACK, ROOK) and not self.has_moved.get("h8", True):
+            rights.append("k")
+        if board[0] == make_code(BLACK, ROOK) and not self.has_moved.get("a8", True):
+            rights.append("q")
+        rights_str = "".join(sorted(rights)) if rights else "-"
+
+        # en-passant target square: if last move was pawn double-step
+        ep = "-"
+        if self.last_move:
+            (sx, sy), (dx, dy), piece = self.last_move
+            if piece.endswith("pawn") and abs(sy - dy) == 2:
+                mid_y = (sy + dy) // 2
+                ep_file, ep_rank = self.xy_to_square(dx, mid_y)
+                ep = f"{ep_file}{ep_rank}"
+
+        return "{}_{}_{}_{}".format(board.hex(), turn, rights_str, ep)
+
+    # -------------------- Helpers for engine / debugging --------------------
+
+    def get_all_legal_moves(self, color):
+        """Return list of ((f,r), (dx,dy)) legal moves for `color`."""
+        moves = []
+        c = COLOR_INDEX[color]
+        board = self.board
+        table = self.legal_move_table(color)
+        for sq in FILE_MAJOR_SQUARES:
+            code = board[sq]
+            if code and code >> 3 == c:
+                src = SQ_FILE_ROW[sq]
+                for dest in table.get(sq, ()):
+                    moves.append((src, (dest[0], dest[1])))
+        return moves
+
+    def ai_move(self):
+        """
+        AI for the black side: choose_ai_move() then play_ai_move().
+        Returns True if a move was executed.
+        """
+        if self.winner:
+            return False
+        if not self.turn["black"]:
+            return False
+
+        chosen = self.choose_ai_move()
+        if chosen is None:
+            return False
+        return self.play_ai_move(chosen)
+
+    def choose_ai_move(self, search=None):
+        """
+        Black's move without playing it: ("move", (f, r), (x, y)), or None if there is none.
+        A move from the opening book (ai_book) is played without searching; otherwise
+        runs an alpha-beta search (search.py) for ai_time_limit seconds, or the prepared
+        `search` passed in (the background AI worker brings its own).
+        """
+        book = opening_book.open_book(self.ai_book)
+        if book is not None:
+            chosen = book.choose(self, "black")
+            if chosen is not None:
+                return ("move",) + chosen
+        if search is None:
+            if self.ai_tt is None:
+                self.ai_tt = TranspositionTable(self.ai_hash_mb)
+            search = Search(self, self.ai_time_limit, tt=self.ai_tt)
+        chosen = search.best_move("black")
+        if chosen is None:
+            return None
+        return ("move",) + chosen
+
+    def play_ai_move(self, chosen):
+        """Play a choose_ai_move() result for black. Returns True if a move was executed."""
+        _, src, dest = chosen
+
+        # auto promote for AI to avoid blocking UI
+        self.ai_auto_promote = True
+        moved = self.validate_move(dest, simulate=False, source=src)
+        self.ai_auto_promote = False
+
+        # after move checks (rep/stalemate/checkmate)
+        if moved:
+            # determine which side moved -> black moved
+            self._after_move_checks("black")
+        return moved
@@ -0,0 +1,78 @@
+# events.py
+# State-change feed from the game thread to observers running on other threads
+# (the Tk HUD). The game publishes an immutable Event whenever something the
+# observers show changes: a move, a capture, charges, the clocks, the power
+# preview, a toast, a new game. Each subscriber gets its own thread-safe queue
+# plus an optional wake-up callback, so observers never poll and never read
+# engine state while the game thread is changing it.
+
+import queue
+import threading
+from collections import namedtuple
+from types import MappingProxyType
+
+MOVE = "move"           # index, san, power, last_move, piece, board, captured, fortress_count, turn
+CAPTURE = "capture"     # pieces (newly captured names), captured (all of them)
+CHARGES = "charges"     # white, black
+TIMER = "timer"         # white, black (seconds left or None), turn
+PREVIEW = "preview"     # active
+TOAST = "toast"         # text
+RESET = "reset"         # variant
+
+# state kinds: a new subscriber first receives the latest event of each
+STICKY = (RESET, CHARGES, TIMER, PREVIEW)
+
+# data is a read-only mapping of immutable values (str, int, tuple, bytes)
+Event = namedtuple("Event", "kind data")
+
+
+class StateFeed(object):
+    """
+    publish(kind, **data) fans an Event out to every subscriber.
+    subscribe(notify) returns the subscriber's queue, primed with the latest
+    STICKY events; notify() (if given) is called from the publishing thread
+    after each put, e.g. to schedule a drain.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = []      # (queue, notify)
+        self._latest = {}           # STICKY kind -> last Event
+
+    def subscribe(self, notify=None):
+        q = queue.SimpleQueue()
+        with self._lock:
+            for kind in STICKY:
+                if kind in self._latest:
+                    q.put(self._latest[kind])
+            self._subscribers.append((q, notify))
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers = [s for s in self._subscribers if s[0] is not q]
+
+    def publish(self, kind, **data):
+        event = Event(kind, MappingProxyType(data))
+        with self._lock:
+            if kind in STICKY:
+                self._latest[kind] = event
+            subscribers = list(self._subscribers)
+        for q, notify in subscribers:
+            q.put(event)
+            if notify is not None:
+                try:
+                    notify()
+                except Exception:
+                    # a subscriber whose UI has gone away must not break the game loop
+                    self.unsubscribe(q)
+
+
+def drain(q):
+    """Every event currently queued on `q`, oldest first."""
+    events = []
+    try:
+        while True:
+            events.append(q.get_nowait())
+    except queue.Empty:
+        return events
@@ -0,0 +1,170 @@
+# fortress.py
+"""
+SuperChess fortress zones as square masks.
+
+A zone is a 3x3 block of squares (clipped at the edges) around a rook's fortress
+field that the other side may not move into while the zone lives. Zones are kept
+in a FortressZones value: per colour a 64-bit mask of the squares its zones
+cover (bit i = board square i, as in bitboard.py), so filtering a move is one
+AND, and a queue of zones bucketed by the half-move they expire on, so a
+half-move tick only touches the zones that run out.
+
+FortressZones is immutable: adding a zone or ticking returns a new value, which
+lets make_move keep the previous one in its undo token. For the UI, snapshots
+and older code it still reads as the legacy list of zone dicts
+``{'owner': color, 'squares': [(x, y), ...], 'ttl': int}``.
+"""
+from collections.abc import Sequence
+
+from board import COLORS, COLOR_INDEX, WHITE, BLACK, SQ_XY, sq_of
+
+ZONE_TTL = 2    # a fortress blocks the opponent's next move: ticked by the activation itself and that move
+
+
+def zone_mask(squares):
+    """Mask of an iterable of (x, y) squares."""
+    mask = 0
+    for x, y in squares:
+        mask |= 1 << sq_of(x, y)
+    return mask
+
+
+def mask_squares(mask):
+    """(x, y) squares of a mask, in board index order."""
+    res = []
+    while mask:
+        low = mask & -mask
+        res.append(SQ_XY[low.bit_length() - 1])
+        mask ^= low
+    return res
+
+
+# FIELD_MASK[sq]: the 3x3 fortress block centred on sq
+FIELD_MASK = tuple(
+    zone_mask((x + ox, y + oy) for ox in (-1, 0, 1) for oy in (-1, 0, 1)
+              if 0 <= x + ox < 8 and 0 <= y + oy < 8)
+    for x, y in SQ_XY
+)
+
+
+class FortressZones(Sequence):
+    """
+    Live fortress zones. Each zone is (owner colour index, mask, expiry, extra), where
+    expiry is the clock value the zone is dropped at (its ttl is expiry - clock) and
+    extra holds any other keys of a legacy zone dict. owned[c] is the union of the
+    masks of colour index c's zones; blocked(c) the squares colour c may not enter.
+    """
+    __slots__ = ("clock", "zones", "owned", "queue", "_key")
+
+    def __init__(self, zones=(), clock=0, owned=None, queue=None):
+        self.clock = clock
+        self.zones = tuple(zones)
+        if owned is None:
+            owned = [0, 0]
+            queue = {}
+            for zone in self.zones:
+                owned[zone[0]] |= zone[1]
+                queue[zone[2]] = queue.get(zone[2], ()) + (zone,)
+            owned = tuple(owned)
+        self.owned = owned
+        self.queue = queue
+        self._key = None
+
+    @classmethod
+    def from_dicts(cls, zones):
+        """FortressZones from legacy zone dicts (zones with no ttl left are dropped)."""
+        if isinstance(zones, cls):
+            return zones
+        entries = []
+        for zone in zones or ():
+            ttl = zone.get('ttl', 0)
+            if ttl > 0:
+                extra = tuple((k, v) for k, v in zone.items() if k not in ('owner', 'squares', 'ttl'))
+                entries.append((COLOR_INDEX.get(zone.get('owner'), WHITE), zone_mask(zone.get('squares', ())), ttl, extra))
+        return cls(entries)
+
+    # -------------------- Updates --------------------
+
+    def add(self, owner, mask, ttl=ZONE_TTL):
+        """A new value with one more zone of colour index `owner` covering `mask`."""
+        zone = (owner, mask, self.clock + ttl, ())
+        owned = list(self.owned)
+        owned[owner] |= mask
+        queue = dict(self.queue)
+        queue[zone[2]] = queue.get(zone[2], ()) + (zone,)
+        return FortressZones(self.zones + (zone,), self.clock, tuple(owned), queue)
+
+    def tick(self):
+        """The zones one half-move older; only the bucket expiring now is looked at."""
+        clock = self.clock + 1
+        expired = self.queue.get(clock)
+        if expired is None:
+            return FortressZones(self.zones, clock, self.owned, self.queue)
+        queue = dict(self.queue)
+        del queue[clock]
+        zones = tuple(zone for zone in self.zones if zone[2] != clock)
+        owned = list(self.owned)
+        for c in (WHITE, BLACK):
+            gone = 0
+            for zone in expired:
+                if zone[0] == c:
+                    gone |= zone[1]
+            if gone:
+                # zones of the same side may overlap: keep the squares another one still covers
+                keep = 0
+                for zone in zones:
+                    if zone[0] == c and zone[1] & gone:
+                        keep |= zone[1]
+                owned[c] &= ~gone | keep
+        return FortressZones(zones, clock, tuple(owned), queue)
+
+    # -------------------- Queries --------------------
+
+    def blocked(self, color):
+        """Mask of the squares colour index `color` may not move into."""
+        return self.owned[color ^ 1]
+
+    def zone_count(self, color):
+        """Number of live zones owned by colour index `color`."""
+        return sum(1 for zone in self.zones if zone[0] == color)
+
+    def hash_key(self, square_keys, ttl_keys):
+        """Zobrist part of the zones: ttl_keys[c][ttl & 7] ^ square_keys[c][sq] of every covered square, per zone."""
+        key = self._key
+        if key is None:
+            key = 0
+            for owner, mask, expiry, _ in self.zones:
+                key ^= ttl_keys[owner][(expiry - self.clock) & 7]
+                keys = square_keys[owner]
+                while mask:
+                    low = mask & -mask
+                    key ^= keys[low.bit_length() - 1]
+                    mask ^= low
+            self._key = key
+        return key
+
+    # -------------------- Legacy list view --------------------
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self.zones)))]
+        owner, mask, expiry, extra = self.zones[index]
+        zone = {'owner': COLORS[owner], 'squares': mask_squares(mask), 'ttl': expiry - self.clock}
+        zone.update(extra)
+        return zone
+
+    def __len__(self):
+        return len(self.zones)
+
+    def __eq__(self, other):
+        if isinstance(other, (FortressZones, list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __deepcopy__(self, memo):
+        return self     # immutable
+
+    def __repr__(self):
+        return repr(list(self))
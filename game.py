@@ -42,10 +42,17 @@ except Exception:
     HAS_SUPER = False
 
 from utils import Utils
+from ai_worker import AIWorker
+import events
+from journal import MoveJournal
+import render
+from snapshot import Snapshot
 
 
 # --- Visual HUD: top bar, move history, replay controls, overlays (visual-only) ---
 import pygame, time, math, traceback, os, copy
+from collections.abc import Mapping
+from board import KIND_MASK, KING
 
 HUD_WIDTH = 360
 TOP_BAR = 96
@@ -164,7 +171,7 @@ class HUD:
         y = r.y + pad
 
         title = "SuperChess" if (getattr(self.controller, "variant", "") == "super") else "Classic"
-        surf.blit(self.font_title.render(title, True, TEXT_LIGHT), (x, y))
+        surf.blit(render.text(self.font_title, title, TEXT_LIGHT), (x, y))
         y += 34
 
         # player blocks
@@ -183,6 +190,11 @@ class HUD:
         self._draw_player_block(surf, x, y, r.width - pad*2, getattr(self.controller, "name_white", "White"), wc, white_charges)
         y += block_h + 8
         self._draw_player_block(surf, x, y, r.width - pad*2, getattr(self.controller, "name_black", "Black"), bc, black_charges)
+        worker = getattr(self.controller, "ai_worker", None)
+        if worker is not None and worker.thinking:
+            # animated "thinking" note under the AI's block while the worker searches
+            dots = "." * (1 + int(time.time() * 3) % 3)
+            surf.blit(render.text(self.font_small, "thinking" + dots, (170,170,170)), (x + 12, y + block_h + 2))
         y += block_h + 12
 
         # small replay step controls
@@ -202,7 +214,7 @@ class HUD:
         # divider and "Move History" label
         pygame.draw.line(surf, (60,60,60), (x, y), (r.right - pad, y), 1)
         y += 12
-        surf.blit(self.font_small.render("Move History", True, (170,170,170)), (x, y))
+        surf.blit(render.text(self.font_small, "Move History", (170,170,170)), (x, y))
         y += 22
 
         # history list
@@ -228,13 +240,11 @@ class HUD:
             power = e.get("power")
             text = f"{num} {san}" + (f" [{power}]" if power else "")
             if i == self.selected_idx:
-                bg = pygame.Surface((list_rect.w - 4, 20))
-                bg.fill((50, 50, 50))
-                surf.blit(bg, (list_rect.x + 2, ly))
+                surf.fill((50, 50, 50), (list_rect.x + 2, ly, list_rect.w - 4, 20))
                 color = (255, 230, 170)
             else:
                 color = (180,180,180)
-            surf.blit(self.font_mono.render(text, True, color), (list_rect.x + 8, ly))
+            surf.blit(render.text(self.font_mono, text, color), (list_rect.x + 8, ly))
             ly += 22
 
         # scrollbar
@@ -249,38 +259,20 @@ class HUD:
         pygame.draw.rect(surf, (30,30,30), (x, y, w, block_h), border_radius=8)
         if is_turn:
             t = time.time(); pulse = (math.sin(t*3)+1)/2; alpha = int(40 + 70*pulse)
-            gl = pygame.Surface((w, block_h), pygame.SRCALPHA)
-            gl.fill((RIGHT_PANEL_BG[0], RIGHT_PANEL_BG[1], RIGHT_PANEL_BG[2], alpha))
+            gl = render.overlay((w, block_h), (RIGHT_PANEL_BG[0], RIGHT_PANEL_BG[1], RIGHT_PANEL_BG[2], alpha))
             surf.blit(gl, (x, y))
 
         # name (left)
-        name_surf = self.font_small.render(name, True, TEXT_LIGHT)
+        name_surf = render.text(self.font_small, name, TEXT_LIGHT)
         surf.blit(name_surf, (x + 12, y + (block_h - name_surf.get_height())//2))
 
         # compute timer for this player (visual only)
         color = "white" if name.lower().startswith("w") else "black"
-        timer_val = None
-        try:
-            timer_val = getattr(self.controller, "remaining", {}).get(color)
-            # if this player is the live side, account for active elapsed time
-            if timer_val is not None and getattr(self.controller, "current_turn_color", "") == color and getattr(self.controller, "turn_start_ticks", None):
-                now = pygame.time.get_ticks()
-                elapsed = (now - self.controller.turn_start_ticks) / 1000.0
-                timer_val = max(0, timer_val - elapsed)
-        except Exception:
-            timer_val = None
-
-        # format mm:ss or ∞
-        if timer_val is None:
-            timer_text = "∞"
-        else:
-            m = int(timer_val) // 60
-            s = int(timer_val) % 60
-            timer_text = f"{m}:{s:02d}"
-        timer_surf = self.font_small.render(timer_text, True, TEXT_LIGHT)
+        timer_text = self._timer_text(color)
+        timer_surf = render.text(self.font_small, timer_text, TEXT_LIGHT)
 
         # draw timer, thunder icon, and charge count on the right — timer is placed left of thunder
-        cnt_surf = self.font_small.render(str(charges), True, TEXT_LIGHT)
+        cnt_surf = render.text(self.font_small, str(charges), TEXT_LIGHT)
         thunder_w = self.thunder_img.get_width()
         # right align the charge count at the right edge with some padding
         cnt_x = x + w - 8 - cnt_surf.get_width()
@@ -296,10 +288,57 @@ class HUD:
         surf.blit(cnt_surf, (cnt_x, cnt_y))
 
 
+    def _timer_text(self, color):
+        """Clock of `color` as m:ss (∞ without a time control), live side included."""
+        timer_val = None
+        try:
+            timer_val = getattr(self.controller, "remaining", {}).get(color)
+            # if this player is the live side, account for active elapsed time
+            if timer_val is not None and getattr(self.controller, "current_turn_color", "") == color and getattr(self.controller, "turn_start_ticks", None):
+                now = pygame.time.get_ticks()
+                elapsed = (now - self.controller.turn_start_ticks) / 1000.0
+                timer_val = max(0, timer_val - elapsed)
+        except Exception:
+            timer_val = None
+
+        # format mm:ss or ∞
+        if timer_val is None:
+            return "∞"
+        m = int(timer_val) // 60
+        s = int(timer_val) % 60
+        return f"{m}:{s:02d}"
+
+    def frame_regions(self):
+        """
+        Regions for the dirty-rect renderer: the player blocks (turn pulse, clocks,
+        charges, thinking note) and the whole panel (history list, replay controls).
+        """
+        c = self.controller
+        r = self.rect(c.width, c.height)
+        engine = getattr(c, "chess", None)
+        charges = getattr(engine, "charges", None)
+        worker = getattr(c, "ai_worker", None)
+        thinking = worker is not None and worker.thinking
+        blocks = (
+            getattr(c, "name_white", "White"), getattr(c, "name_black", "Black"),
+            getattr(c, "current_turn_color", ""), self._timer_text("white"), self._timer_text("black"),
+            tuple(sorted(charges.items())) if charges else None,
+            # the live block pulses; ~12 steps a second is smooth enough
+            int(time.time() * 12), int(time.time() * 3) % 3 if thinking else None,
+        )
+        panel = (
+            getattr(c, "variant", ""), len(getattr(c, "history", []) or []), self.selected_idx,
+            self.scroll_offset, self.replay_playing, self._can_replay(),
+        )
+        return [
+            (("hud", "panel"), r, panel),
+            (("hud", "blocks"), pygame.Rect(r.x, r.y + 48, r.width, 44 * 2 + 8 + 28), blocks),
+        ]
+
     def _draw_button(self, surf, rect, text, icon=None, disabled=False):
         color = (60,60,60) if not disabled else (40,40,40)
         pygame.draw.rect(surf, color, rect, border_radius=8)
-        lab = self.font_small.render(text, True, (220,220,220) if not disabled else (160,160,160))
+        lab = render.text(self.font_small, text, (220,220,220) if not disabled else (160,160,160))
         # Center icon and text horizontally
         if icon and not text:
             # Center icon horizontally and vertically
@@ -361,7 +400,7 @@ class HUD:
         return False
 
     def _can_replay(self):
-        return self.selected_idx is not None and len(getattr(self.controller, "snapshots", []) or []) > 0
+        return self.selected_idx is not None and len(getattr(self.controller, "journal", ())) > 0
 
     def _on_preview(self):
         if not self._can_replay(): return
@@ -445,6 +484,7 @@ class Game:
         self.screen = pygame.display.set_mode((self.width, self.height))
         pygame.display.set_caption("SuperChess")
         self.clock = pygame.time.Clock()
+        self.renderer = render.DirtyRenderer(self.screen)   # playing screen: redraw only what changed
 
         self.resources = "res"
         icon_src = os.path.join(self.resources, "chess_icon.png")
@@ -504,7 +544,9 @@ class Game:
         # HUD / visual bookkeeping
         self.hud = HUD(self, res_dir=RES_DIR)
         self.history = []
-        self.snapshots = []
+        self.journal = MoveJournal()    # per-move history for replay, shared with the HUDs
+        self.events = events.StateFeed()    # state changes for observers on other threads (Tk HUD)
+        self._published = {}                # last value sent per event kind (see _publish_state_changes)
         self.preview_piece_location = None
         self.preview_highlight_move = None
         self._last_seen_move_id = None
@@ -513,6 +555,9 @@ class Game:
 
         self.show_resign_modal = False
 
+        # background AI (engine mode); created by start_variant
+        self.ai_worker = None
+
     def start_game(self):
         while True:
             if self.state == "menu":
@@ -739,6 +784,8 @@ class Game:
         panel_w = self.width - panel_x - BOARD_MARGIN
         panel_h = board_size
         self.right_panel_rect = pygame.Rect(panel_x, by, panel_w, panel_h)
+        self.renderer.invalidate()
+        render.clear_cache()    # cached overlays and icons are sized to the old squares
 
         # pre-scale board image
         if self.board_img:
@@ -759,6 +806,15 @@ class Game:
                 row.append([px, py])
             board_locations.append(row)
 
+        # drop any search still running for the previous game
+        if self.ai_worker is not None:
+            self.ai_worker.cancel()
+            if self.game_mode != "engine":
+                self.ai_worker.shutdown()
+                self.ai_worker = None
+        if self.game_mode == "engine" and self.ai_worker is None:
+            self.ai_worker = AIWorker()
+
         pieces_src = os.path.join(self.resources, "pieces.png")
         if self.variant == "super" and HAS_SUPER:
             self.chess = SuperChess(self.screen, pieces_src, board_locations, self.square_length)
@@ -781,7 +837,9 @@ class Game:
         # HUD / visual bookkeeping
         self.hud = HUD(self, res_dir=RES_DIR)
         self.history = []
-        self.snapshots = []
+        self.journal = MoveJournal()
+        self._published = {}
+        self.events.publish(events.RESET, variant=self.variant)
         self.preview_piece_location = None
         self.preview_highlight_move = None
         self._last_seen_move_id = None
@@ -812,6 +870,8 @@ class Game:
         for ev in pygame.event.get():
             if ev.type == pygame.QUIT:
                 pygame.quit(); sys.exit()
+            if ev.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                self.renderer.invalidate()
 
             # --- promotion overlay handling (highest priority) ---
             if getattr(self.chess, "promotion_pending", None) or getattr(self, "promotion_overlay", None):
@@ -830,10 +890,10 @@ class Game:
                                 pd = getattr(self.chess, "promotion_pending", None)
                                 if pd:
                                     cf = pd["file"]; rr = pd["row"]; col = pd["color"]
-                                    self.chess.piece_location[cf][rr][0] = f"{col}_{choice}"
+                                    self.chess.set_piece(cf, rr, f"{col}_{choice}")
                             except Exception:
                                 try:
-                                    self.chess.piece_location[cf][rr][0] = f"{col}_queen"
+                                    self.chess.set_piece(cf, rr, f"{col}_queen")
                                 except Exception:
                                     pass
                             self._clear_promotion_overlay()
@@ -855,10 +915,10 @@ class Game:
                             pd = getattr(self.chess, "promotion_pending", None)
                             if pd:
                                 cf = pd["file"]; rr = pd["row"]; col = pd["color"]
-                                self.chess.piece_location[cf][rr][0] = f"{col}_{choice}"
+                                self.chess.set_piece(cf, rr, f"{col}_{choice}")
                         except Exception:
                             try:
-                                self.chess.piece_location[cf][rr][0] = f"{col}_queen"
+                                self.chess.set_piece(cf, rr, f"{col}_queen")
                             except Exception:
                                 pass
                         self._clear_promotion_overlay()
@@ -870,7 +930,7 @@ class Game:
                     if pd:
                         try:
                             cf = pd["file"]; rr = pd["row"]; col = pd["color"]
-                            self.chess.piece_location[cf][rr][0] = f"{col}_queen"
+                            self.chess.set_piece(cf, rr, f"{col}_queen")
                         except Exception:
                             pass
                         self._clear_promotion_overlay()
@@ -944,40 +1004,7 @@ class Game:
 
         # timers handling (per-frame)
         self.update_timers_and_timeout()
-
-        # draw background
-        self.screen.fill((28,28,28))
-
-        # draw top HUD
-        self.draw_top_hud()
-
-        # --- Draw Resign Button ---
-        # (recompute/draw so the button matches the rect used above)
-        pygame.draw.rect(self.screen, (200, 24, 24), self.resign_btn_rect, border_radius=8)
-        font = pygame.font.SysFont("comicsansms", 20)
-        # Load resign icon if present
-        try:
-            resign_icon = None
-            icon_path = os.path.join(self.resources, "resign.png")
-            if os.path.exists(icon_path):
-                resign_icon = pygame.image.load(icon_path).convert_alpha()
-        except Exception:
-            resign_icon = None
-        label = font.render("Resign", True, (200, 200, 200))
-        if resign_icon:
-            icon_size = 24
-            resign_icon = pygame.transform.smoothscale(resign_icon, (icon_size, icon_size))
-            icon_x = self.resign_btn_rect.x + 10
-            icon_y = self.resign_btn_rect.centery - icon_size // 2
-            self.screen.blit(resign_icon, (icon_x, icon_y))
-            text_x = icon_x + icon_size + 8
-        else:
-            text_x = self.resign_btn_rect.x + 10
-        text_y = self.resign_btn_rect.centery - label.get_height() // 2
-        self.screen.blit(label, (text_x, text_y))
-
-        # draw captured side (under resign button)
-        self.draw_captured_side(self.resign_btn_rect)
+        self._publish_state_changes()
 
         # --- Auto-play preview if HUD play is active ---
         try:
@@ -1008,6 +1035,224 @@ class Game:
             traceback.print_exc()
             
 
+        # --- Auto-advance replay when Play is active ---
+        try:
+            if getattr(self, "hud", None) and getattr(self.hud, "replay_playing", False):
+                now = pygame.time.get_ticks()
+                interval = getattr(self.hud, "replay_interval_ms", 800)
+                if now - getattr(self.hud, "replay_last_tick", 0) >= interval:
+                    # advance one step
+                    try:
+                        self.hud._on_replay_step(1)
+                    except Exception:
+                        # fallback: directly ask controller to apply next index
+                        try:
+                            next_idx = (self.hud.replay_index or 0) + 1
+                            self._apply_replay_index_to_preview(next_idx)
+                            self.hud.replay_index = next_idx
+                            self.hud.selected_idx = next_idx
+                        except Exception:
+                            pass
+                    # update last tick
+                    try:
+                        self.hud.replay_last_tick = now
+                    except Exception:
+                        pass
+
+                    # if we reached the final history index, return to live and stop playing
+                    try:
+                        if self.hud.replay_index is not None and self.hud.replay_index >= len(getattr(self, "history", [])) - 1:
+                            self.hud._on_return_live()
+                    except Exception:
+                        pass
+        except Exception:
+            # don't let replay errors crash the main loop
+            pass
+
+        # winner handling
+        if getattr(self, "state", "") == "playing":
+            w = getattr(self.chess, "winner", None)
+            if w not in (None, False, ""):
+                if w == "Stalemate":
+                    self.end_message = "Tie by Stalemate!"
+                elif w == "Threefold":
+                    self.end_message = "Draw by Threefold Repetition!"
+                elif w == "InsufficientMaterial":
+                    self.end_message = "Draw by insufficient material!"
+                elif w == "Timeout":
+                    if not getattr(self, "end_message", None):
+                        loser = getattr(self, "current_turn_color", None)
+                        if loser in ("white", "black"):
+                            winner_side = "white" if loser == "black" else "black"
+                            winner_name = self.name_white if winner_side == "white" else self.name_black
+                            self.end_message = f"{winner_name} wins on time!"
+                        else:
+                            self.end_message = "Win by timeout!"
+                else:
+                    try:
+                        if str(w).lower() in ("white", "black"):
+                            winner_name = self.name_white if str(w).lower() == "white" else self.name_black
+                            self.end_message = f"{winner_name} wins!"
+                        else:
+                            self.end_message = f"{w} wins!"
+                    except Exception:
+                        self.end_message = f"{w} wins!"
+                self.state = "end"
+        
+        # draw only the screen regions that changed since the last frame
+        if getattr(self.chess, "needs_full_redraw", False):
+            # a modal (promotion picker) drew straight to the display
+            self.chess.needs_full_redraw = False
+            self.renderer.invalidate()
+        self.renderer.frame(self._frame_layers())
+
+        # let chess handle input & moves (it reads mouse events via Utils)
+        side = "black" if self.chess.turn["black"] else "white"
+        self.chess.move_piece(side)
+
+        # If vs AI: the worker searches in the background and plays black's move when ready
+        if self.game_mode == "engine" and self.ai_worker is not None:
+            self.ai_worker.update(self.chess)
+
+        self.record_last_move()
+
+        # check insufficient-material draw (only kings)
+        try:
+            if self.state == "playing" and self._only_kings_left():
+                try:
+                    self.chess.winner = "InsufficientMaterial"
+                except Exception:
+                    pass
+                self.end_message = "Draw by insufficient material!"
+                self.state = "end"
+                self.renderer.present()
+                self.clock.tick(60)
+                return
+        except Exception:
+            pass
+
+        # detect turn change and adjust timers
+        new_turn = "black" if self.chess.turn["black"] else "white"
+        if new_turn != self.current_turn_color:
+            # commit elapsed to the player who just moved
+            self.commit_elapsed_to_remaining(self.current_turn_color)
+
+            moved_side = self.current_turn_color
+            self.current_turn_color = new_turn
+
+            # only start timers once White has moved
+            if not self.timers_started:
+                if moved_side == "white":
+                    self.timers_started = True
+                    self.turn_start_ticks = pygame.time.get_ticks()
+                else:
+                    self.turn_start_ticks = None
+            else:
+                # only reset the tick reference when switching to the new player
+                self.turn_start_ticks = pygame.time.get_ticks()
+
+        # --- Soft yellow underlay for history preview only ---
+            try:
+                if getattr(self.hud, "preview_active", False):
+                    ph = getattr(self, "preview_highlight_move", None)
+                    if ph:
+                        try:
+                            src, dst = ph
+                            for sq in (src, dst):
+                                sx, sy = sq
+                                rx = self.board_top_left[0] + sx * self.square_length
+                                ry = self.board_top_left[1] + sy * self.square_length
+                                # Cover the whole square with a soft yellow overlay
+                                s = render.overlay((self.square_length, self.square_length), PREVIEW_YELLOW)
+                                self.screen.blit(s, (rx, ry))
+                        except Exception:
+                            # don't let drawing errors crash the loop
+                            traceback.print_exc()
+            except Exception:
+                pass
+
+        self.renderer.present()
+        self.clock.tick(60)
+
+    # ---------------- Frame layers (dirty-rect renderer) ----------------
+    def _frame_layers(self):
+        """Bottom-to-top layers for DirtyRenderer: (draw, [(key, rect, state), ...])."""
+        top = [("top", pygame.Rect(0, 0, self.width, self.TOP_BAR - 8), (self.current_turn_color,))]
+        panel = self.right_panel_rect
+        side = [("side", pygame.Rect(panel.x, panel.y, panel.w, self.height - panel.y),
+                 (tuple(getattr(self.chess, "captured", []) or []),))]
+        return [
+            (self._draw_top_layer, top),
+            (self._draw_side_layer, side),
+            (self._draw_board_layer, self._board_regions()),
+            (self._draw_hud_layer, self.hud.frame_regions()),
+        ]
+
+    def _board_regions(self):
+        """One region per square (piece, selection, move dots, check) plus the whole board for overlays."""
+        chess = self.chess
+        sl = self.square_length
+        bx, by = self.board_top_left
+        marks = bytearray(64)
+        sel = chess.selected_sq
+        if sel is not None:
+            marks[sel] |= 1
+        for mx, my in chess.moves:
+            if 0 <= mx < 8 and 0 <= my < 8:
+                marks[my * 8 + mx] |= 2
+        for kx, ky in chess.checked_kings():
+            marks[ky * 8 + kx] |= 4
+        board = chess.board
+        regions = [(("sq", sq), pygame.Rect(bx + (sq & 7) * sl, by + (sq >> 3) * sl, sl, sl), (board[sq], marks[sq]))
+                   for sq in range(64)]
+
+        # overlays that span several squares repaint the whole board when they change
+        overlay = self.promotion_overlay
+        hovered = None
+        if overlay:
+            mx, my = pygame.mouse.get_pos()
+            hovered = next((i for i, r in enumerate(overlay["rects"]) if r["rect"].collidepoint(mx, my)), None)
+        banner = getattr(self, "superpower_banner", None)
+        state = (
+            getattr(self.hud, "preview_active", False), repr(getattr(self, "preview_highlight_move", None)),
+            getattr(self.hud, "preview_index", None), self.promotion_active, bool(overlay), hovered,
+            repr(getattr(chess, "fortress_zones", None)), getattr(chess, "power_preview_active", False),
+            repr(getattr(chess, "preview_moves", None)), getattr(chess, "preview_source", None),
+            (banner['name'], int((time.time() - banner['start_time']) * 60)) if banner else None,
+        )
+        label_h = max(14, sl // 4) + 12
+        regions.append(("board", pygame.Rect(bx - 20, by, 8 * sl + 20, 8 * sl + label_h), state))
+        if overlay:
+            regions.append(("promotion", pygame.Rect(overlay["ox"], overlay["oy"], overlay["width"], overlay["height"]), hovered))
+        return regions
+
+    def _draw_top_layer(self):
+        # draw top HUD
+        self.draw_top_hud()
+
+    def _draw_side_layer(self):
+        # --- Draw Resign Button ---
+        # (recompute/draw so the button matches the rect used above)
+        pygame.draw.rect(self.screen, (200, 24, 24), self.resign_btn_rect, border_radius=8)
+        font = render.font("comicsansms", 20)
+        # Load resign icon if present
+        icon_size = 24
+        resign_icon = render.image(os.path.join(self.resources, "resign.png"), (icon_size, icon_size))
+        label = render.text(font, "Resign", (200, 200, 200))
+        if resign_icon:
+            icon_x = self.resign_btn_rect.x + 10
+            icon_y = self.resign_btn_rect.centery - icon_size // 2
+            self.screen.blit(resign_icon, (icon_x, icon_y))
+            text_x = icon_x + icon_size + 8
+        else:
+            text_x = self.resign_btn_rect.x + 10
+        text_y = self.resign_btn_rect.centery - label.get_height() // 2
+        self.screen.blit(label, (text_x, text_y))
+
+        # draw captured side (under resign button)
+        self.draw_captured_side(self.resign_btn_rect)
+
+    def _draw_board_layer(self):
         # draw board (squares + static board)
         if not getattr(self, "promotion_active", False):
             self.draw_board()   # whatever draws board & pieces in your loop
@@ -1020,12 +1265,10 @@ class Game:
         if getattr(self, "promotion_overlay", None):
             data = self.promotion_overlay
             try:
-                panel = pygame.Surface((data["width"], data["height"]), pygame.SRCALPHA)
-                panel.fill((8, 80, 30, 220))
-                font = pygame.font.SysFont(None, 18, bold=True)
-                label = font.render("Promote to:", True, (240, 240, 240))
-                panel.blit(label, ((data["width"] - label.get_width()) // 2, data.get("padding", 8)))
+                panel = render.overlay((data["width"], data["height"]), (8, 80, 30, 220))
+                label = render.text(render.font(None, 18, bold=True), "Promote to:", (240, 240, 240))
                 self.screen.blit(panel, (data["ox"], data["oy"]))
+                self.screen.blit(label, (data["ox"] + (data["width"] - label.get_width()) // 2, data["oy"] + data.get("padding", 8)))
             except Exception:
                 pass
 
@@ -1034,11 +1277,9 @@ class Game:
                 opt = r["opt"]; rect = r["rect"]
                 drew = False
                 try:
-                    tmp = pygame.Surface((self.square_length, self.square_length), pygame.SRCALPHA)
                     # IMPORTANT: use self.chess.chess_pieces (same renderer as board)
                     try:
-                        self.chess.chess_pieces.draw(tmp, f"{data['color']}_{opt}", (0, 0))
-                        icon = pygame.transform.smoothscale(tmp, (rect.w, rect.h))
+                        icon = self._piece_icon(f"{data['color']}_{opt}", rect.w)
                         self.screen.blit(icon, rect.topleft)
                         drew = True
                     except Exception:
@@ -1048,9 +1289,8 @@ class Game:
 
                 if not drew:
                     pygame.draw.rect(self.screen, (60,60,60), rect, border_radius=4)
-                    f2 = pygame.font.SysFont(None, 16)
                     short = "N" if opt == "knight" else opt[0].upper()
-                    t = f2.render(short, True, (240,240,240))
+                    t = render.text(render.font(None, 16), short, (240,240,240))
                     self.screen.blit(t, (rect.x + (rect.w - t.get_width())//2, rect.y + (rect.h - t.get_height())//2))
 
             # hover highlight
@@ -1064,8 +1304,7 @@ class Game:
 
         # Draw fortress zones (red)
         if isinstance(self.chess, SuperChess) and getattr(self.chess, "fortress_zones", None):
-            red_surf = pygame.Surface((self.square_length, self.square_length), pygame.SRCALPHA)
-            red_surf.fill((200, 24, 24, 120))
+            red_surf = render.overlay((self.square_length, self.square_length), (200, 24, 24, 120))
             for zone in self.chess.fortress_zones:
                 for (zx, zy) in zone['squares']:
                     rx = self.board_top_left[0] + zx * self.square_length
@@ -1085,10 +1324,8 @@ class Game:
 
         # draw preview highlights if active
         if isinstance(self.chess, SuperChess) and self.chess.power_preview_active:
-            yellow_surf = pygame.Surface((self.square_length, self.square_length), pygame.SRCALPHA)
-            yellow_surf.fill((255, 200, 20, 120))
-            red_surf = pygame.Surface((self.square_length, self.square_length), pygame.SRCALPHA)
-            red_surf.fill((200, 24, 24, 140))
+            yellow_surf = render.overlay((self.square_length, self.square_length), (255, 200, 20, 120))
+            red_surf = render.overlay((self.square_length, self.square_length), (200, 24, 24, 140))
 
             pname = self.chess.power_preview_name
             if pname == "sacrifice" and self.chess.preview_source:
@@ -1111,76 +1348,6 @@ class Game:
                     ry = self.board_top_left[1] + py * self.square_length
                     self.screen.blit(yellow_surf, (rx, ry))
 
-        # HUD (right panel, move history, replay controls)
-        try:
-            self.hud.draw(self.screen)
-        except Exception:
-            traceback.print_exc()
-
-        # --- Auto-advance replay when Play is active ---
-        try:
-            if getattr(self, "hud", None) and getattr(self.hud, "replay_playing", False):
-                now = pygame.time.get_ticks()
-                interval = getattr(self.hud, "replay_interval_ms", 800)
-                if now - getattr(self.hud, "replay_last_tick", 0) >= interval:
-                    # advance one step
-                    try:
-                        self.hud._on_replay_step(1)
-                    except Exception:
-                        # fallback: directly ask controller to apply next index
-                        try:
-                            next_idx = (self.hud.replay_index or 0) + 1
-                            self._apply_replay_index_to_preview(next_idx)
-                            self.hud.replay_index = next_idx
-                            self.hud.selected_idx = next_idx
-                        except Exception:
-                            pass
-                    # update last tick
-                    try:
-                        self.hud.replay_last_tick = now
-                    except Exception:
-                        pass
-
-                    # if we reached the final history index, return to live and stop playing
-                    try:
-                        if self.hud.replay_index is not None and self.hud.replay_index >= len(getattr(self, "history", [])) - 1:
-                            self.hud._on_return_live()
-                    except Exception:
-                        pass
-        except Exception:
-            # don't let replay errors crash the main loop
-            pass
-
-        # winner handling
-        if getattr(self, "state", "") == "playing":
-            w = getattr(self.chess, "winner", None)
-            if w not in (None, False, ""):
-                if w == "Stalemate":
-                    self.end_message = "Tie by Stalemate!"
-                elif w == "Threefold":
-                    self.end_message = "Draw by Threefold Repetition!"
-                elif w == "InsufficientMaterial":
-                    self.end_message = "Draw by insufficient material!"
-                elif w == "Timeout":
-                    if not getattr(self, "end_message", None):
-                        loser = getattr(self, "current_turn_color", None)
-                        if loser in ("white", "black"):
-                            winner_side = "white" if loser == "black" else "black"
-                            winner_name = self.name_white if winner_side == "white" else self.name_black
-                            self.end_message = f"{winner_name} wins on time!"
-                        else:
-                            self.end_message = "Win by timeout!"
-                else:
-                    try:
-                        if str(w).lower() in ("white", "black"):
-                            winner_name = self.name_white if str(w).lower() == "white" else self.name_black
-                            self.end_message = f"{winner_name} wins!"
-                        else:
-                            self.end_message = f"{w} wins!"
-                    except Exception:
-                        self.end_message = f"{w} wins!"
-                self.state = "end"
-        
         # --- Superpower Banner Overlay (modal, always on top) ---
         if hasattr(self, 'superpower_banner') and self.superpower_banner:
             elapsed = time.time() - self.superpower_banner['start_time']
@@ -1200,9 +1367,8 @@ class Game:
                 img_path = os.path.join(self.resources, fname)
                 if os.path.exists(img_path):
                     try:
-                        banner_img = pygame.image.load(img_path).convert_alpha()
                         w, h = self.board_rect.width, self.board_rect.height
-                        banner_img = pygame.transform.smoothscale(banner_img, (w, h))
+                        banner_img = render.image(img_path, (w, h))
                         # Fade out effect
                         if elapsed < duration:
                             alpha = 255
@@ -1224,77 +1390,11 @@ class Game:
             else:
                 self.superpower_banner = None
 
-        # let chess handle input & moves (it reads mouse events via Utils)
-        side = "black" if self.chess.turn["black"] else "white"
-        self.chess.move_piece(side)
-
-        # If vs AI and black to move then call ai_move()
-        if self.game_mode == "engine" and (not self.chess.winner) and (not self.chess.turn["white"]):
-            pygame.time.delay(180)
-            self.chess.ai_move()
-
-        self.record_last_move()
-
-        # check insufficient-material draw (only kings)
+    def _draw_hud_layer(self):
         try:
-            if self.state == "playing" and self._only_kings_left():
-                try:
-                    self.chess.winner = "InsufficientMaterial"
-                except Exception:
-                    pass
-                self.end_message = "Draw by insufficient material!"
-                self.state = "end"
-                pygame.display.flip()
-                self.clock.tick(60)
-                return
+            self.hud.draw(self.screen)
         except Exception:
-            pass
-
-        # detect turn change and adjust timers
-        new_turn = "black" if self.chess.turn["black"] else "white"
-        if new_turn != self.current_turn_color:
-            # commit elapsed to the player who just moved
-            self.commit_elapsed_to_remaining(self.current_turn_color)
-
-            moved_side = self.current_turn_color
-            self.current_turn_color = new_turn
-
-            # only start timers once White has moved
-            if not self.timers_started:
-                if moved_side == "white":
-                    self.timers_started = True
-                    self.turn_start_ticks = pygame.time.get_ticks()
-                else:
-                    self.turn_start_ticks = None
-            else:
-                # only reset the tick reference when switching to the new player
-                self.turn_start_ticks = pygame.time.get_ticks()
-
-        # --- Soft yellow underlay for history preview only ---
-            try:
-                if getattr(self.hud, "preview_active", False):
-                    ph = getattr(self, "preview_highlight_move", None)
-                    if ph:
-                        yellow_surf = pygame.Surface((self.square_length, self.square_length), pygame.SRCALPHA)
-                        yellow_surf.fill((255, 230, 140, 140))  # soft semi-transparent yellow
-                        try:
-                            src, dst = ph
-                            for sq in (src, dst):
-                                sx, sy = sq
-                                rx = self.board_top_left[0] + sx * self.square_length
-                                ry = self.board_top_left[1] + sy * self.square_length
-                                # Cover the whole square with a soft yellow overlay
-                                s = pygame.Surface((self.square_length, self.square_length), pygame.SRCALPHA)
-                                s.fill(PREVIEW_YELLOW)
-                                self.screen.blit(s, (rx, ry))
-                        except Exception:
-                            # don't let drawing errors crash the loop
-                            traceback.print_exc()
-            except Exception:
-                pass
-
-        pygame.display.flip()
-        self.clock.tick(60)
+            traceback.print_exc()
 
     # ---------------- timers ----------------
     def commit_elapsed_to_remaining(self, color):
@@ -1411,16 +1511,23 @@ class Game:
         Draws a semi-transparent 'glass' panel at rect.
         alpha: 0..255 (0 transparent, 255 fully opaque)
         """
-        surf = pygame.Surface((rect.w, rect.h), pygame.SRCALPHA)
-        surf.fill((color[0], color[1], color[2], alpha))
-        if border:
-            # subtle border
-            pygame.draw.rect(surf, (255,255,255,30), surf.get_rect(), width=1, border_radius=border_radius)
+        def build():
+            surf = pygame.Surface((rect.w, rect.h), pygame.SRCALPHA)
+            surf.fill((color[0], color[1], color[2], alpha))
+            if border:
+                # subtle border
+                pygame.draw.rect(surf, (255,255,255,30), surf.get_rect(), width=1, border_radius=border_radius)
+            return surf
+        surf = render.cached(("glass", rect.w, rect.h, tuple(color), alpha, border, border_radius), build)
         self.screen.blit(surf, (rect.x, rect.y))
 
 
 
     # ---------------- drawing helpers ----------------
+    def _piece_icon(self, name, size):
+        """Piece `name` pre-scaled to size x size by the shared sprite atlas."""
+        return self.chess.chess_pieces.atlas.sprite(name, size)
+
     def draw_board(self):
         yellow = (255, 230, 80, 200)  # more visible yellow
         # board background
@@ -1436,16 +1543,16 @@ class Game:
                     pygame.draw.rect(self.screen, light if (x+y)%2==0 else dark, r)
 
         # file labels a..h bottom, rank labels left
-        fnt = pygame.font.SysFont("consolas", max(14, self.square_length//4))
+        fnt = render.font("consolas", max(14, self.square_length//4))
         files = "abcdefgh"
         for i,ch in enumerate(files):
-            tx = fnt.render(ch, True, (200,200,200))
+            tx = render.text(fnt, ch, (200,200,200))
             x = self.board_top_left[0] + i*self.square_length + self.square_length//2 - tx.get_width()//2
             y = self.board_top_left[1] + 8*self.square_length + 6
             self.screen.blit(tx,(x,y))
         for j in range(8):
             num = 8 - j
-            tx = fnt.render(str(num), True, (200,200,200))
+            tx = render.text(fnt, str(num), (200,200,200))
             x = self.board_top_left[0] - 18
             y = self.board_top_left[1] + j*self.square_length + self.square_length//2 - tx.get_height()//2
             self.screen.blit(tx,(x,y))
@@ -1501,8 +1608,7 @@ class Game:
                         sx, sy = sq
                         rx = self.board_top_left[0] + sx * self.square_length
                         ry = self.board_top_left[1] + sy * self.square_length
-                        s = pygame.Surface((self.square_length, self.square_length), pygame.SRCALPHA)
-                        s.fill(yellow)
+                        s = render.overlay((self.square_length, self.square_length), yellow)
                         self.screen.blit(s, (rx, ry))
                     highlight_drawn = True
         except Exception as e:
@@ -1513,9 +1619,8 @@ class Game:
         bar_h = self.TOP_BAR - 8
         pygame.draw.rect(self.screen, (16,16,16), (0,0,self.width, bar_h))
         # center turn indicator
-        big = pygame.font.SysFont("comicsansms", 26)
         turn_text = f"Turn: {'Black' if self.current_turn_color == 'black' else 'White'}"
-        txt = big.render(turn_text, True, (220,220,220))
+        txt = render.text(render.font("comicsansms", 26), turn_text, (220,220,220))
         self.screen.blit(txt, (self.width//2 - txt.get_width()//2, 8))
 
         # (no names or timers shown here — moved to right HUD)
@@ -1557,8 +1662,7 @@ class Game:
             # background card (draw after calculating cap_h)
             pygame.draw.rect(self.screen, (34,34,34), (cap_x, cap_y, cap_w, cap_h), border_radius=8)
             # header
-            hdr_font = pygame.font.SysFont(None, 16)
-            hdr = hdr_font.render("Captured Pieces", True, (200,200,200))
+            hdr = render.text(render.font(None, 16), "Captured Pieces", (200,200,200))
             self.screen.blit(hdr, (cap_x + 8, cap_y + 8))
 
             start_x = cap_x + 8
@@ -1572,10 +1676,7 @@ class Game:
                         if x + icon_size > cap_x + cap_w:
                             break
                         try:
-                            surf = pygame.Surface((self.square_length, self.square_length), pygame.SRCALPHA)
-                            self.chess.chess_pieces.draw(surf, p, (0, 0))
-                            icon = pygame.transform.smoothscale(surf, (icon_size, icon_size))
-                            self.screen.blit(icon, (x, y))
+                            self.screen.blit(self._piece_icon(p, icon_size), (x, y))
                         except Exception:
                             pygame.draw.rect(self.screen, (120,120,120), (x, y, icon_size, icon_size), border_radius=6)
                         x += icon_size + 6
@@ -1593,56 +1694,10 @@ class Game:
     
     def snapshot_game_state(self):
         """
-        Create a deep snapshot of the engine state used for history/preview.
-        We include common castling/move flags so restores don't lose castling rights.
+        Compact snapshot of the engine state used for history/preview
+        (board, side to move, castling flags, captures, last move).
         """
-        snap = {}
-        # deep-copy main board/piece map (adjust key if your engine uses different name)
-        try:
-            snap['piece_location'] = copy.deepcopy(getattr(self.chess, 'piece_location', {}))
-        except Exception:
-            snap['piece_location'] = {}
-
-        # include move history, turn, FEN-like fields if present
-        for attr in ('turn', 'move_history', 'halfmove_clock', 'fullmove_number'):
-            if hasattr(self.chess, attr):
-                try:
-                    snap[attr] = copy.deepcopy(getattr(self.chess, attr))
-                except Exception:
-                    snap[attr] = getattr(self.chess, attr)
-
-        # Defensive: capture common castling/move flags so restores preserve castling rights
-        castling_attrs = [
-            'castling_rights', 'castle_rights', 'can_castle', 'can_castle_kingside',
-            'can_castle_queenside', 'can_castle_white', 'can_castle_black',
-            'has_moved', 'king_moved', 'rook_moved', 'castles',
-            'white_can_castle_kingside','white_can_castle_queenside',
-            'black_can_castle_kingside','black_can_castle_queenside'
-        ]
-        for a in castling_attrs:
-            if hasattr(self.chess, a):
-                try:
-                    snap[a] = copy.deepcopy(getattr(self.chess, a))
-                except Exception:
-                    snap[a] = getattr(self.chess, a)
-
-        # include captured pieces and last-move metadata so previews can highlight correctly
-        try:
-            snap['captured'] = copy.deepcopy(getattr(self.chess, 'captured', []) or [])
-        except Exception:
-            snap['captured'] = []
-        try:
-            snap['last_move_meta'] = copy.deepcopy(getattr(self.chess, 'last_move_meta', None))
-        except Exception:
-            snap['last_move_meta'] = None
-        try:
-            snap['last_move'] = copy.deepcopy(getattr(self.chess, 'last_move', None))
-        except Exception:
-            snap['last_move'] = None
-
-        # other metadata useful for UI preview
-        snap['_timestamp'] = time.time()
-        return snap
+        return Snapshot(self.chess)
 
 
     def restore_game_state(self, snap):
@@ -1653,49 +1708,7 @@ class Game:
         if not snap:
             return
 
-        # restore main piece map if present
-        try:
-            if 'piece_location' in snap:
-                # replace engine's piece_location with the snapshot's copy
-                setattr(self.chess, 'piece_location', copy.deepcopy(snap['piece_location']))
-        except Exception:
-            pass
-
-        # restore simple attributes if present
-        for attr in ('turn', 'move_history', 'halfmove_clock', 'fullmove_number'):
-            if attr in snap:
-                try:
-                    setattr(self.chess, attr, copy.deepcopy(snap[attr]))
-                except Exception:
-                    try:
-                        setattr(self.chess, attr, snap[attr])
-                    except Exception:
-                        pass
-
-        # restore castling/move flags
-        castling_attrs = [
-            'castling_rights', 'castle_rights', 'can_castle', 'can_castle_kingside',
-            'can_castle_queenside', 'can_castle_white', 'can_castle_black',
-            'has_moved', 'king_moved', 'rook_moved', 'castles',
-            'white_can_castle_kingside','white_can_castle_queenside',
-            'black_can_castle_kingside','black_can_castle_queenside'
-        ]
-        for a in castling_attrs:
-            if a in snap:
-                try:
-                    setattr(self.chess, a, copy.deepcopy(snap[a]))
-                except Exception:
-                    try:
-                        setattr(self.chess, a, snap[a])
-                    except Exception:
-                        pass
-
-        # optional: if engine uses a fen string representation, restore if present
-        if 'fen' in snap and hasattr(self.chess, 'set_fen'):
-            try:
-                self.chess.set_fen(snap['fen'])
-            except Exception:
-                pass
+        snap.restore(self.chess)
 
         # After restoring, request a board redraw in the UI (non-invasive)
         try:
@@ -1727,21 +1740,18 @@ class Game:
                 ok = False
 
             # If replay_to_index applied the snapshot, play the appropriate sound for that index.
-            # Determine if the step involved a capture by comparing `captured` lengths between snapshots.
+            # Determine if the step involved a capture by comparing `captured` lengths between journal entries.
             try:
-                snap_idx = idx + 1 if idx + 1 < len(self.snapshots) else idx
-                if 0 <= snap_idx < len(self.snapshots):
-                    snap = self.snapshots[snap_idx]
-                    eng = snap.get('engine', snap)
+                snap_idx = idx + 1 if idx + 1 < len(self.journal) else idx
+                if 0 <= snap_idx < len(self.journal):
+                    snap = self.journal[snap_idx]
                     # find previous snapshot's captured count (if exists)
                     prev_captured_len = 0
                     prev_idx = snap_idx - 1
-                    if prev_idx >= 0 and prev_idx < len(self.snapshots):
-                        prev_snap = self.snapshots[prev_idx]
-                        prev_eng = prev_snap.get('engine', prev_snap)
-                        prev_captured_len = len(prev_eng.get('captured', []) or [])
+                    if prev_idx >= 0 and prev_idx < len(self.journal):
+                        prev_captured_len = len(self.journal[prev_idx].captured)
 
-                    cur_captured_len = len(eng.get('captured', []) or [])
+                    cur_captured_len = len(snap.captured)
                     captures = cur_captured_len > prev_captured_len
 
                     # Play capture/move sound so stepping has audio feedback.
@@ -1763,9 +1773,8 @@ class Game:
 
                     # If replay_to_index didn't run above, also set minimal preview state for backward compatibility
                     if not ok:
-                        pl = eng.get('piece_location')
-                        self.preview_piece_location = safe_deepcopy(pl)
-                        lm = eng.get('last_move_meta') or eng.get('last_move')
+                        self.preview_piece_location = snap.piece_location
+                        lm = snap.last_move_meta or snap.last_move
                         self.preview_highlight_move = None
                         if lm:
                             try:
@@ -1811,10 +1820,10 @@ class Game:
         Jump to history index `idx` for preview. This now restores the engine snapshot so
         board and castling flags are accurate for the preview.
         """
-        if not (0 <= idx < len(self.snapshots)):
+        if not (0 <= idx < len(self.journal)):
             return
 
-        snap = self.snapshots[idx]
+        snap = self.journal[idx]
 
         # restore engine state for preview (visual-only, we keep a saved live copy elsewhere)
         try:
@@ -1973,8 +1982,8 @@ class Game:
 
                 entry = {'idx': len(self.history), 'san': san, 'meta': safe_deepcopy(meta), 'power': power}
                 self.history.append(entry)
-                snap = self.snapshot_game_state()
-                self.snapshots.append(snap)
+                self.journal.record(self.chess)
+                self._publish_move(entry)
 
                 # set seen id and HUD index
                 self._last_seen_move_id = fingerprint
@@ -2045,8 +2054,8 @@ class Game:
             san = self._build_san_fallback(piece, src, dst, captures)
             entry = {'idx': len(self.history), 'san': san, 'meta': None, 'power': None}
             self.history.append(entry)
-            snap = self.snapshot_game_state()
-            self.snapshots.append(snap)
+            self.journal.record(self.chess)
+            self._publish_move(entry)
 
             # insufficient material detection
             try:
@@ -2074,6 +2083,58 @@ class Game:
 
 
 
+    # ---------------- state feed ----------------
+    def _publish_move(self, entry):
+        """Publish the move just recorded (and any new captures) to the state feed."""
+        e = self.chess
+        captured = tuple(getattr(e, "captured", []) or [])
+        before = self._published.get(events.CAPTURE, ())
+        last = getattr(e, "last_move", None)
+        self.events.publish(
+            events.MOVE, index=entry['idx'], san=entry['san'], power=entry['power'],
+            last_move=tuple(tuple(v) if isinstance(v, list) else v for v in last) if last else None,
+            piece=last[2] if last and len(last) > 2 else None,
+            board=bytes(e.board), captured=captured,
+            fortress_count=len(getattr(e, "fortress_zones", []) or []),
+            turn="black" if e.turn["black"] else "white")
+        if captured != before:
+            new = captured[len(before):] if captured[:len(before)] == before else captured
+            self.events.publish(events.CAPTURE, pieces=new, captured=captured)
+            self._published[events.CAPTURE] = captured
+
+    def _publish_state_changes(self):
+        """Once per frame: publish charges, clocks, preview and toast when they changed."""
+        e = self.chess
+        published = self._published
+        charges = getattr(e, "charges", None)
+        if charges is not None:
+            value = (charges.get("white", 0), charges.get("black", 0))
+            if published.get(events.CHARGES) != value:
+                published[events.CHARGES] = value
+                self.events.publish(events.CHARGES, white=value[0], black=value[1])
+
+        clocks = []
+        for color in ("white", "black"):
+            left = self.remaining.get(color)
+            if left is not None and color == self.current_turn_color and self.turn_start_ticks:
+                left = max(0, left - (pygame.time.get_ticks() - self.turn_start_ticks) / 1000.0)
+            clocks.append(None if left is None else int(left))
+        value = (clocks[0], clocks[1], self.current_turn_color)
+        if published.get(events.TIMER) != value:
+            published[events.TIMER] = value
+            self.events.publish(events.TIMER, white=value[0], black=value[1], turn=value[2])
+
+        active = bool(getattr(e, "power_preview_active", False))
+        if published.get(events.PREVIEW) != active:
+            published[events.PREVIEW] = active
+            self.events.publish(events.PREVIEW, active=active)
+
+        toast = getattr(e, "toast_message", None)
+        if toast != published.get(events.TOAST):
+            published[events.TOAST] = toast
+            if toast:
+                self.events.publish(events.TOAST, text=str(toast))
+
     def _meta_to_san(self, meta):
         try:
             piece = meta.get('piece', '')
@@ -2166,6 +2227,9 @@ class Game:
                 if ev.type == pygame.MOUSEBUTTONDOWN and ev.button == 1:
                     if btn_menu.collidepoint(ev.pos):
                         self.state = "menu"
+                        if self.ai_worker is not None:
+                            self.ai_worker.shutdown()
+                            self.ai_worker = None
                         self.chess = None
                         return
                     if btn_restart.collidepoint(ev.pos):
@@ -2192,6 +2256,8 @@ class Game:
         self.end_message = f"{winner_name} wins by resignation!"
         self.chess.winner = winner_name
         self.state = "end"
+        if self.ai_worker is not None:
+            self.ai_worker.cancel()
 
         #condition to check if only kings left
 
@@ -2204,7 +2270,7 @@ class Game:
         try:
             pieces = []
             pl = getattr(self.chess, "piece_location", None)
-            if isinstance(pl, dict):
+            if isinstance(pl, Mapping):
                 for v in pl.values():
                     if v is None:
                         continue
@@ -2263,13 +2329,18 @@ class Game:
             if not e:
                 return False
 
+            # engine cores keep the position as a board array of piece codes
+            board = getattr(e, "board", None)
+            if isinstance(board, (bytes, bytearray)):
+                return all(not p or p & KIND_MASK == KING for p in board)
+
             pieces = []
 
             # Common layout: piece_location = { file: { rank: (name, selected, (x,y)) } }
             pl = getattr(e, "piece_location", None)
-            if isinstance(pl, dict):
+            if isinstance(pl, Mapping):
                 for f in pl.values():
-                    if not isinstance(f, dict):
+                    if not isinstance(f, Mapping):
                         continue
                     for cell in f.values():
                         if not cell:
@@ -4,9 +4,10 @@ Modern Tkinter HUD for SuperChess / Classic Chess (hybrid UI) with:
  - captured-piece thumbnails (PIL optional)
  - modern side-panel styling (ttk)
  - move history with SAN formatting
- - non-destructive tracing via snapshot preview window
+ - non-destructive tracing via a preview window over the move journal
  - heuristics to detect superpower activations (best-effort)
  - keyboard shortcuts for trace/back/forward
+ - event-driven updates from the controller's state feed (events.StateFeed)
 Usage:
     from hud_tk import launch_hud
     launch_hud(game_controller)  # call after controller.chess exists (e.g. in Game.start_variant)
@@ -18,9 +19,13 @@ from tkinter import ttk, messagebox
 import time
 import os
 import traceback
-import copy
 import math
 
+from board import CODE_TO_NAME
+import events
+from journal import MoveJournal
+import sprites
+
 # optional pillow for images
 try:
     from PIL import Image, ImageTk
@@ -39,7 +44,7 @@ _GOOD = "#2ecc71"
 _WARN = "#f39c12"
 _DANGER = "#e74c3c"
 
-REFRESH_MS = 250  # HUD refresh interval in ms
+REFRESH_MS = 250  # polling interval for controllers without a state feed (ms)
 
 # SAN piece letters mapping
 _PIECE_LETTER = {
@@ -54,34 +59,34 @@ _PIECE_LETTER = {
 
 # ---------- PieceAtlas to slice pieces.png (optional) ----------
 class PieceAtlas:
-    DEFAULT_ORDER = ["king", "queen", "rook", "bishop", "knight", "pawn"]
+    """Tk thumbnails of the 12 pieces, cut 1:1 from the shared sprite atlas's pre-scaled sheet."""
 
-    def __init__(self, pieces_path, thumb_size=32, order=None):
+    def __init__(self, pieces_path, thumb_size=32):
         self.pieces_path = pieces_path
         self.thumb_size = int(thumb_size)
-        self.order = order or self.DEFAULT_ORDER
         self.images = {}
         self.available = False
         if not PIL_AVAILABLE or not pieces_path or not os.path.exists(pieces_path):
             self.available = False
             return
         try:
-            img = Image.open(pieces_path).convert("RGBA")
-            w, h = img.size
-            cols = len(self.order)
-            rows = 2
-            tile_w = w // cols
-            tile_h = h // rows
             ts = self.thumb_size
-            for row_idx, color in enumerate(("white", "black")):
-                for col_idx, name in enumerate(self.order):
-                    left = col_idx * tile_w
-                    upper = row_idx * tile_h
-                    crop = img.crop((left, upper, left + tile_w, upper + tile_h))
+            atlas = sprites.atlas(pieces_path)
+            sheet_path = atlas.sheet_file(ts)
+            if sheet_path:
+                img = Image.open(sheet_path).convert("RGBA")
+                tile_w = tile_h = ts
+            else:
+                # no on-disk sheet (read-only resources): resample the source here
+                img = Image.open(pieces_path).convert("RGBA")
+                tile_w, tile_h = atlas.cell_width, atlas.cell_height
+            for key, idx in sprites.PIECE_INDEX.items():
+                left = (idx % atlas.cols) * tile_w
+                upper = (idx // atlas.cols) * tile_h
+                crop = img.crop((left, upper, left + tile_w, upper + tile_h))
+                if (tile_w, tile_h) != (ts, ts):
                     crop = crop.resize((ts, ts), Image.LANCZOS)
-                    tkimg = ImageTk.PhotoImage(crop)
-                    key = f"{color}_{name}"
-                    self.images[key] = tkimg
+                self.images[key] = ImageTk.PhotoImage(crop)
             self.available = True
         except Exception:
             traceback.print_exc()
@@ -94,15 +99,13 @@ class PieceAtlas:
 # ---------- Preview board window (non-destructive) ----------
 class PreviewWindow:
     """
-    A simple Tkinter Toplevel that renders board snapshots stored by the HUD.
-    Accepts a list of snapshots (each snapshot = piece_location dict) and captured lists.
+    A simple Tkinter Toplevel that renders positions from a MoveJournal.
     Provides navigation controls and keyboard shortcuts.
     """
 
-    def __init__(self, parent, snapshots, captured_snapshots, atlas=None, square_size=64):
+    def __init__(self, parent, journal, atlas=None, square_size=64):
         """
-        snapshots: list of piece_location snapshots (deepcopied dicts). Index i corresponds to position after half-move i.
-        captured_snapshots: list of captured lists corresponding to snapshots.
+        journal: MoveJournal. Index i corresponds to position after half-move i.
         atlas: PieceAtlas or None
         square_size: pixels for rendering squares
         """
@@ -110,8 +113,7 @@ class PreviewWindow:
         self.root.title("Trace Preview")
         self.root.protocol("WM_DELETE_WINDOW", self._on_close)
         self.root.geometry(f"{square_size*8+200}x{square_size*8+20}")
-        self.snapshots = snapshots
-        self.captured_snapshots = captured_snapshots
+        self.journal = journal
         self.atlas = atlas
         self.square = square_size
         self.index = 0
@@ -125,7 +127,7 @@ class PreviewWindow:
         right = tk.Frame(self.root, width=200, bg=_PANEL)
         right.pack(side="right", fill="y")
 
-        self.lbl = tk.Label(right, text="Move 1 / {}".format(len(self.snapshots)), bg=_PANEL, fg=_TEXT, font=("Segoe UI", 10, "bold"))
+        self.lbl = tk.Label(right, text="Move 1 / {}".format(len(self.journal)), bg=_PANEL, fg=_TEXT, font=("Segoe UI", 10, "bold"))
         self.lbl.pack(pady=8)
 
         # navigation buttons
@@ -157,9 +159,9 @@ class PreviewWindow:
 
     def render_index(self, idx):
         if idx < 0: idx = 0
-        if idx >= len(self.snapshots): idx = len(self.snapshots)-1
+        if idx >= len(self.journal): idx = len(self.journal)-1
         self.index = idx
-        snap = self.snapshots[self.index]
+        snap = self.journal[self.index].piece_location
         # draw board squares
         self.canvas.delete("all")
         for x in range(8):
@@ -198,19 +200,19 @@ class PreviewWindow:
 
         # update captured box
         self.cap_box.delete(0, tk.END)
-        caps = self.captured_snapshots[self.index] if self.captured_snapshots and len(self.captured_snapshots)>self.index else []
+        caps = self.journal[self.index].captured_names
         for c in caps:
             self.cap_box.insert(tk.END, c)
 
         # update label
-        self.lbl.config(text=f"Move {self.index+1} / {len(self.snapshots)}")
+        self.lbl.config(text=f"Move {self.index+1} / {len(self.journal)}")
 
     def prev(self):
         if self.index > 0:
             self.render_index(self.index-1)
 
     def next(self):
-        if self.index < len(self.snapshots)-1:
+        if self.index < len(self.journal)-1:
             self.render_index(self.index+1)
 
     def go_live(self):
@@ -265,12 +267,12 @@ class ModernHUD:
         self._image_refs = []
 
         # history store: a list of entries; each entry includes:
-        #  'idx', 'san', 'src'(file,row)|None, 'dst_x','dst_y', 'piece', 'power' (heuristic), 'snapshot' (piece_location deepcopy), 'captured_snapshot' (list)
+        #  'idx', 'san', 'src'(file,row)|None, 'dst_x','dst_y', 'piece', 'power' (heuristic), 'captured_count', 'fortress_count'
         self._history = []
         self._last_seen_move = None
-        # also store snapshots separately for quick previewing
-        self._snapshots = []
-        self._capt_snapshots = []
+        # positions come from the controller's move journal; one of our own when it has none
+        self._journal = MoveJournal()
+        self._prev_board = None       # board bytes before the last recorded move (power heuristics)
 
         # Build UI
         root.title("SuperChess — HUD")
@@ -338,9 +340,20 @@ class ModernHUD:
         root.bind_all("<Control-Right>", lambda e: self._keyboard_trace_next())
         root.bind_all("<Control-Home>", lambda e: self._keyboard_trace_live())
 
-        # start update loop
+        # follow the controller's state feed; poll only controllers that have none
         self._running = True
-        self.update_loop()
+        self._shown_captured = ()     # captured pieces currently in the strips
+        self._wake_pending = False
+        self._wake_lock = threading.Lock()
+        feed = getattr(controller, "events", None)
+        self._feed = feed
+        if feed is not None:
+            self._set_names()
+            self._queue = feed.subscribe(self._wake)
+            self._wake()
+        else:
+            self._queue = None
+            self.update_loop()
 
     # ---------- UI parts ----------
     def _make_player_card(self, parent, color_name):
@@ -485,10 +498,7 @@ class ModernHUD:
             elif hasattr(self.controller, "reset"):
                 self.controller.reset()
             # clear recorded history
-            self._history.clear()
-            self._snapshots.clear()
-            self._capt_snapshots.clear()
-            self.history_list.delete(0, tk.END)
+            self._clear_game()
             self._set_toast("New game started.")
         except Exception:
             self._set_toast("New game failed.")
@@ -513,6 +523,8 @@ class ModernHUD:
                 except Exception:
                     pass
             self._running = False
+            if self._feed is not None:
+                self._feed.unsubscribe(self._queue)
             self.root.quit()
         except Exception:
             self.root.quit()
@@ -587,13 +599,19 @@ class ModernHUD:
             self.history_list.selection_set(idx)
             self.history_list.see(idx)
 
+    @property
+    def journal(self):
+        """The controller's move journal when it keeps one, else the HUD's own."""
+        shared = getattr(self.controller, "journal", None)
+        return shared if shared is not None else self._journal
+
     def open_preview_at(self, idx):
-        # open non-destructive preview window with snapshots
-        if idx < 0 or idx >= len(self._snapshots):
+        # open non-destructive preview window over the move journal
+        if idx < 0 or idx >= len(self.journal):
             self._set_toast("Index out of range.")
             return
         try:
-            PreviewWindow(self.root, self._snapshots, self._capt_snapshots, atlas=self.atlas, square_size=64)
+            PreviewWindow(self.root, self.journal, atlas=self.atlas, square_size=64)
         except Exception:
             traceback.print_exc()
             self._set_toast("Failed to open preview.")
@@ -645,8 +663,8 @@ class ModernHUD:
     # ---------- Recording logic ----------
     def _maybe_record_last_move(self):
         """
-        Detect engine.last_move changes and append to history. Also capture snapshot (deepcopy)
-        of piece_location and captured list AFTER the move for non-destructive tracing.
+        Detect engine.last_move changes and append to history. Positions for
+        non-destructive tracing live in the move journal (see journal property).
         Uses heuristics to detect special power activations (best-effort).
         """
         engine = getattr(self.controller, "chess", None) or self.engine
@@ -676,24 +694,13 @@ class ModernHUD:
 
         # capture counts before/after by peeking at last history entry's captured snapshot if available;
         # otherwise read engine.captured as after.
-        prev_captured = []
-        if self._capt_snapshots:
-            prev_captured = list(self._capt_snapshots[-1])
-        curr_captured = []
+        prev_count = self._history[-1]['captured_count'] if self._history else 0
         try:
-            curr_captured = list(getattr(engine, "captured", []) or [])
+            curr_count = len(getattr(engine, "captured", []) or [])
         except Exception:
-            curr_captured = []
+            curr_count = 0
 
-        captures_happened = len(curr_captured) - len(prev_captured) > 0
-
-        # snapshot of board (deepcopy piece_location)
-        snap = None
-        try:
-            if hasattr(engine, "piece_location"):
-                snap = copy.deepcopy(engine.piece_location)
-        except Exception:
-            snap = None
+        captures_happened = curr_count - prev_count > 0
 
         # determine source file,row if engine provides xy_to_square
         src_file_row = None
@@ -719,26 +726,18 @@ class ModernHUD:
             # rook fortress: if dx==sx and dy==sy and engine has fortress_zones increased
             elif kind == "rook":
                 # detect fortress: if last action caused fortress zone added (compare prev snapshot of fortress)
-                prev_zones = []
-                curr_zones = []
-                try:
-                    prev_zones = self._history[-1].get('fortress_zones', []) if self._history else []
-                except Exception:
-                    prev_zones = []
-                try:
-                    curr_zones = copy.deepcopy(getattr(engine, "fortress_zones", []) or [])
-                except Exception:
-                    curr_zones = []
-                if curr_zones and (len(curr_zones) > len(prev_zones)):
+                prev_zones = self._history[-1].get('fortress_count', 0) if self._history else 0
+                curr_zones = len(getattr(engine, "fortress_zones", []) or [])
+                if curr_zones > prev_zones:
                     power = "fortress_field"
             # pawn sacrifice: pawn removed itself and captured nearby pieces (heuristic)
             elif kind == "pawn":
                 # if pawn no longer exists at src and captures increased -> sacrifice
                 pawn_present = False
                 try:
-                    if snap and src_file_row:
+                    if src_file_row:
                         sf, sr = src_file_row
-                        occupant = snap.get(sf, {}).get(sr, [None])[0]
+                        occupant = engine.piece_location[sf][sr][0]
                         pawn_present = occupant and occupant.startswith(piece.split("_",1)[0])
                 except Exception:
                     pawn_present = False
@@ -747,16 +746,10 @@ class ModernHUD:
             # bishop phase shift: bishop moved diagonally, maybe jumped over blockers or special king+shield redirect
             elif kind == "bishop":
                 # If destination previously had opponent king (we'd have captured king normally), label phase_shift
-                prev_board = None
+                prev_board = self._prev_board
                 try:
-                    if len(self._snapshots)>0:
-                        prev_board = self._snapshots[-1]
-                except Exception:
-                    prev_board = None
-                try:
-                    if prev_board and dx is not None and hasattr(engine, "xy_to_square"):
-                        df, dr = engine.xy_to_square(dx, dy)
-                        prev_occ = prev_board.get(df, {}).get(dr, [None])[0]
+                    if prev_board and dx is not None:
+                        prev_occ = CODE_TO_NAME[prev_board[dy * 8 + dx]]
                         if prev_occ and prev_occ.endswith("king") and not prev_occ.startswith(piece.split("_",1)[0]):
                             power = "phase_shift"
                 except Exception:
@@ -770,9 +763,6 @@ class ModernHUD:
         # build SAN-like notation
         san = self._build_san(piece, src_xy, dst_xy, captures_happened, engine)
 
-        # store fortress zones snapshot if available
-        fortress_zones = copy.deepcopy(getattr(engine, "fortress_zones", []) or [])
-
         entry = {
             'idx': len(self._history),
             'san': san,
@@ -781,16 +771,23 @@ class ModernHUD:
             'dst_y': dy,
             'piece': piece,
             'power': power,
-            'snapshot': snap,
-            'captured_snapshot': list(curr_captured),
-            'fortress_zones': fortress_zones
+            'captured_count': curr_count,
+            'fortress_count': len(getattr(engine, "fortress_zones", []) or [])
         }
 
-        # append
+        # the position goes to our own journal unless the controller records one
+        try:
+            if getattr(self.controller, "journal", None) is None:
+                self._journal.record(engine)
+            self._prev_board = bytes(engine.board)
+        except Exception:
+            # engines without a board (e.g. the demo stub) have no journal to preview
+            self._prev_board = None
+        self._append_history(entry)
+
+    def _append_history(self, entry):
         self._history.append(entry)
-        self._snapshots.append(snap if snap is not None else {})
-        self._capt_snapshots.append(entry['captured_snapshot'])
-        # add to listbox
+        power = entry['power']
         display = f"{entry['idx']+1:3d}. {entry['san']}" + (f" [{power}]" if power else "")
         self.history_list.insert(tk.END, display)
 
@@ -833,7 +830,89 @@ class ModernHUD:
         except Exception:
             return f"{piece}→{dst_xy}"
 
-    # ---------- HUD update loop ----------
+    # ---------- State feed ----------
+    def _wake(self):
+        """Called on the game thread after each publish: drain once the Tk loop is idle."""
+        with self._wake_lock:
+            if self._wake_pending or not self._running:
+                return
+            self._wake_pending = True
+        self.root.after_idle(self._drain_events)
+
+    def _drain_events(self):
+        while True:
+            # the flag is only cleared once the queue is seen empty, under the lock,
+            # so a publish racing this drain is either picked up here or wakes us again
+            with self._wake_lock:
+                pending = events.drain(self._queue)
+                if not pending:
+                    self._wake_pending = False
+                    return
+            for event in pending:
+                try:
+                    handler = self._handlers.get(event.kind)
+                    if handler:
+                        handler(self, event.data)
+                except Exception:
+                    traceback.print_exc()
+
+    def _on_reset(self, data):
+        self.variant_label.config(text=f"Mode: {'Super' if data['variant'] == 'super' else 'Classic'}")
+        self._set_names()
+        self._clear_game()
+
+    def _on_move(self, data):
+        last = data["last_move"]
+        src_file_row = dx = dy = None
+        if last:
+            (sx, sy), (dx, dy) = last[0], last[1]
+            engine = getattr(self.controller, "chess", None) or self.engine
+            if hasattr(engine, "xy_to_square"):
+                src_file_row = engine.xy_to_square(sx, sy)
+        entry = {
+            'idx': len(self._history),
+            'san': data["san"],
+            'src': src_file_row,
+            'dst_x': dx,
+            'dst_y': dy,
+            'piece': data["piece"],
+            'power': data["power"],
+            'captured_count': len(data["captured"]),
+            'fortress_count': data["fortress_count"],
+        }
+        self._last_seen_move = last
+        self._prev_board = data["board"]
+        self._append_history(entry)
+        self._set_turn(data["turn"])
+
+    def _on_capture(self, data):
+        self._show_captured(data["captured"])
+
+    def _on_charges(self, data):
+        self._set_charges(data["white"], data["black"])
+
+    def _on_timer(self, data):
+        self.white_card._timer_lbl.config(text=self._fmt_time(data["white"]))
+        self.black_card._timer_lbl.config(text=self._fmt_time(data["black"]))
+        self._set_turn(data["turn"])
+
+    def _on_preview_event(self, data):
+        self._set_preview(data["active"])
+
+    def _on_toast(self, data):
+        self._set_toast(data["text"], sticky=False)
+
+    _handlers = {
+        events.RESET: _on_reset,
+        events.MOVE: _on_move,
+        events.CAPTURE: _on_capture,
+        events.CHARGES: _on_charges,
+        events.TIMER: _on_timer,
+        events.PREVIEW: _on_preview_event,
+        events.TOAST: _on_toast,
+    }
+
+    # ---------- HUD update loop (controllers without a state feed) ----------
     def update_loop(self):
         if not self._running:
             return
@@ -845,27 +924,30 @@ class ModernHUD:
             self.variant_label.config(text=f"Mode: {variant}")
 
             # update player cards
-            self._update_player_card(self.white_card, "white")
-            self._update_player_card(self.black_card, "black")
+            self._set_names()
+            for card in (self.white_card, self.black_card):
+                timer_text = "--:--"
+                try:
+                    rem = getattr(self.controller, "remaining", {}).get(card._color_name)
+                    if rem is not None:
+                        timer_text = self._fmt_time(int(rem))
+                except Exception:
+                    pass
+                card._timer_lbl.config(text=timer_text)
+            turn = getattr(self.controller, "current_turn_color", None)
+            if turn is None and engine and hasattr(engine, "turn"):
+                turn = "black" if engine.turn.get("black") else "white"
+            self._set_turn(turn)
 
             # charges
-            w_ch = b_ch = 0
             if engine and hasattr(engine, "charges"):
                 try:
-                    w_ch = engine.charges.get("white", 0)
-                    b_ch = engine.charges.get("black", 0)
+                    self._set_charges(engine.charges.get("white", 0), engine.charges.get("black", 0))
                 except Exception:
                     pass
-            self.w_charge_label.config(text=f"White: {w_ch}")
-            self.b_charge_label.config(text=f"Black: {b_ch}")
 
             # preview status toggles
-            preview_active = bool(getattr(engine, "power_preview_active", False))
-            self.preview_status.config(text=f"Preview: {'active' if preview_active else 'inactive'}")
-            if preview_active:
-                self.preview_btn.state(["disabled"]); self.cancel_btn.state(["!disabled"])
-            else:
-                self.preview_btn.state(["!disabled"]); self.cancel_btn.state(["disabled"])
+            self._set_preview(bool(getattr(engine, "power_preview_active", False)))
 
             # maybe record last_move (and snapshot)
             try:
@@ -881,17 +963,7 @@ class ModernHUD:
                         captured.append(str(p[0]))
                     else:
                         captured.append(str(p))
-            self.captured_count_label.config(text=f"Total: {len(captured)}")
-            if self.atlas.available:
-                white_lost = [p for p in captured if p.startswith("white")]
-                black_lost = [p for p in captured if p.startswith("black")]
-                self._populate_strip_with_images(self.white_strip, white_lost)
-                self._populate_strip_with_images(self.black_strip, black_lost)
-            else:
-                if self._captured_fallback is not None:
-                    self._captured_fallback.delete(0, tk.END)
-                    for c in captured:
-                        self._captured_fallback.insert(tk.END, c)
+            self._show_captured(tuple(captured))
 
             # engine toast -> HUD toast
             if engine and hasattr(engine, "toast_message"):
@@ -905,63 +977,70 @@ class ModernHUD:
         self.root.after(REFRESH_MS, self.update_loop)
 
     # ---------- helper UI updates ----------
-    def _populate_strip_with_images(self, strip_frame, piece_list):
-        for w in strip_frame.winfo_children():
-            w.destroy()
-        refs = []
-        for piece in piece_list:
-            img = self.atlas.get(piece) if self.atlas else None
+    def _clear_game(self):
+        self._history.clear()
+        self._journal.clear()
+        self._last_seen_move = None
+        self._prev_board = None
+        self.history_list.delete(0, tk.END)
+        self._show_captured(())
+
+    def _show_captured(self, captured):
+        """Bring the captured strips to `captured`, adding only the new pieces when it grew."""
+        shown = self._shown_captured
+        if captured == shown:
+            return
+        if captured[:len(shown)] == shown:
+            new = captured[len(shown):]
+        else:
+            new = captured
+            for strip in (self.white_strip, self.black_strip):
+                for w in strip.winfo_children():
+                    w.destroy()
+            self._image_refs = []
+            if self._captured_fallback is not None:
+                self._captured_fallback.delete(0, tk.END)
+        self._shown_captured = captured
+        self.captured_count_label.config(text=f"Total: {len(captured)}")
+        for piece in new:
+            if not self.atlas.available:
+                if self._captured_fallback is not None:
+                    self._captured_fallback.insert(tk.END, piece)
+                continue
+            strip = self.white_strip if piece.startswith("white") else self.black_strip
+            img = self.atlas.get(piece)
             if img:
-                lbl = tk.Label(strip_frame, image=img, bg=_PANEL)
-                lbl.pack(side="left", padx=4, pady=2)
-                refs.append(img)
+                tk.Label(strip, image=img, bg=_PANEL).pack(side="left", padx=4, pady=2)
+                self._image_refs.append(img)
             else:
-                lbl = ttk.Label(strip_frame, text=piece, style="Small.TLabel")
-                lbl.pack(side="left", padx=6, pady=6)
-        self._image_refs.append(refs)
-        if len(self._image_refs) > 60:
-            self._image_refs = self._image_refs[-30:]
-
-    def _update_player_card(self, card, player):
-        name = getattr(self.controller, f"name_{player}", None) or player.capitalize()
-        card._name_lbl.config(text=name)
-        timer_text = "--:--"
-        try:
-            if hasattr(self.controller, "remaining"):
-                rem = getattr(self.controller, "remaining", {}).get(player)
-                if rem is not None:
-                    timer_text = self._fmt_time(int(rem))
-        except Exception:
-            pass
-        card._timer_lbl.config(text=timer_text)
-
-        is_turn = False
-        try:
-            if hasattr(self.controller, "current_turn_color"):
-                is_turn = (self.controller.current_turn_color == player)
+                ttk.Label(strip, text=piece, style="Small.TLabel").pack(side="left", padx=6, pady=6)
+
+    def _set_names(self):
+        for card in (self.white_card, self.black_card):
+            player = card._color_name
+            card._name_lbl.config(text=getattr(self.controller, f"name_{player}", None) or player.capitalize())
+
+    def _set_turn(self, turn):
+        for card in (self.white_card, self.black_card):
+            dot = card._turn_dot
+            dot.delete("all")
+            if card._color_name == turn:
+                dot.create_oval(2,2,12,12, fill=_GOOD, outline=_GOOD)
             else:
-                engine = getattr(self.controller, "chess", None) or self.engine
-                if engine and hasattr(engine, "turn"):
-                    is_turn = bool(engine.turn.get(player))
-        except Exception:
-            is_turn = False
-
-        dot = card._turn_dot
-        dot.delete("all")
-        if is_turn:
-            dot.create_oval(2,2,12,12, fill=_GOOD, outline=_GOOD)
+                dot.create_oval(2,2,12,12, fill="#00000000", outline="#00000000")
+
+    def _set_charges(self, white, black):
+        self.w_charge_label.config(text=f"White: {white}")
+        self.b_charge_label.config(text=f"Black: {black}")
+        self.white_card._charge_badge.config(text=f"{white} ⚡")
+        self.black_card._charge_badge.config(text=f"{black} ⚡")
+
+    def _set_preview(self, active):
+        self.preview_status.config(text=f"Preview: {'active' if active else 'inactive'}")
+        if active:
+            self.preview_btn.state(["disabled"]); self.cancel_btn.state(["!disabled"])
         else:
-            dot.create_oval(2,2,12,12, fill="#00000000", outline="#00000000")
-
-        badge_text = ""
-        try:
-            engine = getattr(self.controller, "chess", None) or self.engine
-            if engine and hasattr(engine, "charges"):
-                val = engine.charges.get(player, 0)
-                badge_text = f"{val} ⚡"
-        except Exception:
-            badge_text = ""
-        card._charge_badge.config(text=badge_text)
+            self.preview_btn.state(["!disabled"]); self.cancel_btn.state(["disabled"])
 
     def _fmt_time(self, seconds):
         if seconds is None:
@@ -0,0 +1,79 @@
+# journal.py
+# Move history for replay and the HUDs: a keyframe Snapshot every few half-moves
+# and a small delta for each half-move in between (changed squares, new
+# captures, flag and charge changes). Any index is one keyframe plus at most
+# KEYFRAME_EVERY - 1 deltas away, so scrubbing long games stays instant.
+
+from snapshot import Snapshot
+
+KEYFRAME_EVERY = 16
+
+
+class MoveJournal(object):
+    """
+    journal[i] is the Snapshot of the position after recorded half-move i.
+    record(engine) appends the engine's current state.
+    """
+
+    def __init__(self, keyframe_every=KEYFRAME_EVERY):
+        self.keyframe_every = keyframe_every
+        self.keyframes = []     # Snapshot at indices 0, N, 2N, ...
+        self.deltas = []        # per index: None at a keyframe, else a delta tuple (see _delta)
+        self._head = None       # Snapshot of the last recorded index
+
+    def __len__(self):
+        return len(self.deltas)
+
+    def clear(self):
+        self.keyframes = []
+        self.deltas = []
+        self._head = None
+
+    def record(self, engine):
+        """Append the engine's state; returns its Snapshot."""
+        snap = Snapshot(engine)
+        if len(self.deltas) % self.keyframe_every == 0:
+            self.keyframes.append(snap)
+            self.deltas.append(None)
+        else:
+            self.deltas.append(self._delta(self._head, snap))
+        self._head = snap
+        return snap
+
+    def __getitem__(self, idx):
+        n = len(self.deltas)
+        if idx < 0:
+            idx += n
+        if not 0 <= idx < n:
+            raise IndexError("journal index out of range")
+        if idx == n - 1:
+            return self._head
+
+        start = idx - idx % self.keyframe_every
+        key = self.keyframes[start // self.keyframe_every]
+        if start == idx:
+            return key
+        board = bytearray(key.board)
+        captured = key.captured
+        for i in range(start + 1, idx + 1):
+            changes, flags, moved_keys, moved, kept, added, last_move, last_move_meta, powers = self.deltas[i]
+            for j in range(0, len(changes), 2):
+                board[changes[j]] = changes[j + 1]
+            captured = captured[:kept] + added
+        return Snapshot.from_fields(bytes(board), flags, moved_keys, moved, captured, last_move, last_move_meta, powers)
+
+    @staticmethod
+    def _delta(prev, snap):
+        """
+        (changes, flags, moved_keys, moved, kept, added, last_move, last_move_meta, powers):
+        changes is bytes of (square, new code) pairs and the captures are
+        prev.captured[:kept] + added. Unchanged powers share prev's tuple.
+        """
+        a, b = prev.board, snap.board
+        changes = bytes(v for sq in range(64) if a[sq] != b[sq] for v in (sq, b[sq]))
+        kept = len(prev.captured)
+        if snap.captured[:kept] != prev.captured:
+            kept = 0
+        powers = prev.powers if snap.powers == prev.powers else snap.powers
+        return (changes, snap.flags, snap.moved_keys, snap.moved, kept, snap.captured[kept:],
+                snap.last_move, snap.last_move_meta, powers)
@@ -0,0 +1,325 @@
+# opening_book.py
+# Opening book for the AI. A book file is a sorted array of fixed-width
+# (position hash, move, weight) entries; it is memory-mapped and looked up by
+# binary search, so nothing is loaded up front and a probe costs a few page
+# reads. Classic and SuperChess keep separate books (the SuperChess position
+# hash includes charges and fortress zones). The builder replays PGN games or
+# self-play JSONL (selfplay.py) and weights each move by how the mover fared.
+#
+# Run from the project root:
+#   python opening_book.py build --variant classic games.pgn
+#   python opening_book.py build --variant super --plies 16 games.jsonl --out books/super.book
+#   python opening_book.py probe --variant classic --fen "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1"
+
+import argparse, json, mmap, os, random, re, struct, sys
+
+from board import CODE_TO_NAME, SQ_FILE_ROW, SQ_XY, square_of
+
+BOOK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "books")
+BOOK_PLIES = 20         # the builder keeps the first 10 moves of each game
+
+MAGIC = b"SCBOOK1\n"
+ENTRY = struct.Struct("<QHH")   # position_hash(), move, weight; sorted by hash then move
+KEY = struct.Struct("<Q")
+
+POWER_FLAG = 1 << 12    # move = src | dst << 6 | POWER_FLAG for a power activation
+
+
+def book_path(variant):
+    """Default book file of a variant ("classic" or "super")."""
+    return os.path.join(BOOK_DIR, f"{variant}.book")
+
+
+def encode_move(src, dst, power=False):
+    return src | dst << 6 | (POWER_FLAG if power else 0)
+
+
+def decode_move(move):
+    """(src, dst, power) of an encoded move."""
+    return move & 63, (move >> 6) & 63, bool(move & POWER_FLAG)
+
+
+# -------------------- Lookup --------------------
+
+class OpeningBook(object):
+    """
+    Read-only view of a book file. entries(key) lists ((src, dst, power), weight)
+    for a position hash; choose(engine, color) picks a legal book move.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.mtime = os.stat(path).st_mtime_ns
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path}: not an opening book")
+            size = os.fstat(f.fileno()).st_size
+            # an empty book is just the header, which mmap cannot map past
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size > len(MAGIC) else b""
+        self.count = max(0, size - len(MAGIC)) // ENTRY.size
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+    def entries(self, key):
+        data = self.data
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if KEY.unpack_from(data, len(MAGIC) + mid * ENTRY.size)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        found = []
+        while lo < self.count:
+            k, move, weight = ENTRY.unpack_from(data, len(MAGIC) + lo * ENTRY.size)
+            if k != key:
+                break
+            found.append((decode_move(move), weight))
+            lo += 1
+        return found
+
+    def choose(self, engine, color, rng=random):
+        """
+        A weighted random book move for `color` in the engine's position, shaped like
+        Search.best_move: ((file, row), (x, y)), ((file, row), (x, y), "power"), or
+        None when the position is not in the book. Moves are checked against the
+        legal tables, so a hash collision never plays an illegal move.
+        """
+        found = self.entries(engine.position_hash())
+        if not found:
+            return None
+        moves = engine.legal_move_table(color)
+        powers = engine.legal_power_table(color) if hasattr(engine, "legal_power_table") else {}
+        candidates, weights = [], []
+        for (src, dst, power), weight in found:
+            table = powers if power else moves
+            if list(SQ_XY[dst]) in table.get(src, ()):
+                candidates.append((src, dst, power))
+                weights.append(weight)
+        if not candidates:
+            return None
+        src, dst, power = rng.choices(candidates, weights)[0]
+        if power:
+            return SQ_FILE_ROW[src], SQ_XY[dst], "power"
+        return SQ_FILE_ROW[src], SQ_XY[dst]
+
+
+_books = {}
+
+
+def open_book(path):
+    """The shared OpeningBook for `path` (reopened if the file changed), or None if there is none."""
+    if not path:
+        return None
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    current = _books.get(path)
+    if current is None or current.mtime != mtime:
+        try:
+            current = OpeningBook(path)
+        except (OSError, ValueError):
+            return None
+        _books[path] = current
+    return current
+
+
+# -------------------- Reading games --------------------
+
+SAN_RE = re.compile(r"^([NBRQK])?([a-h])?([1-8])?x?([a-h])([1-8])(?:=?([NBRQ]))?$")
+PIECE_LETTERS = {"N": "knight", "B": "bishop", "R": "rook", "Q": "queen", "K": "king"}
+RESULTS = {"1-0": "White", "0-1": "Black", "1/2-1/2": "Draw", "*": None}
+
+
+def pgn_games(text):
+    """Yield (san list, result) for every game of a PGN text (comments and variations skipped)."""
+    text = re.sub(r"\{[^}]*\}|;[^\n]*", " ", text)
+    sans = []
+    depth = 0
+    for line in text.splitlines():
+        if line.startswith("[") or line.startswith("%"):
+            if sans:
+                # tags of the next game: the previous one had no result token
+                yield sans, None
+                sans = []
+            continue
+        for token in re.findall(r"[()]|[^\s()]+", line):
+            if token == "(":
+                depth += 1
+            elif token == ")":
+                depth -= 1
+            elif depth:
+                continue
+            elif token in RESULTS:
+                yield sans, RESULTS[token]
+                sans = []
+            else:
+                token = re.sub(r"^\d+\.+", "", token)
+                if token and not token.startswith("$"):
+                    sans.append(token)
+    if sans:
+        yield sans, None
+
+
+def san_move(engine, color, san):
+    """((file, row), (x, y)) of the legal move `san` for `color`, or None."""
+    san = san.rstrip("+#!?").replace("0", "O")
+    legal = engine.get_all_legal_moves(color)
+    if san in ("O-O", "O-O-O"):
+        side = 1 if san == "O-O" else -1
+        for src, dst in legal:
+            x, _ = engine.square_to_xy(*src)
+            if engine.piece_at(x, dst[1]).endswith("king") and dst[0] - x == 2 * side:
+                return src, dst
+        return None
+    m = SAN_RE.match(san)
+    if not m:
+        return None
+    letter, from_file, from_rank, to_file, to_rank, promo = m.groups()
+    if promo and promo != "Q":
+        return None     # the engine promotes book moves to a queen
+    kind = PIECE_LETTERS[letter] if letter else "pawn"
+    dst = ("abcdefgh".index(to_file), 8 - int(to_rank))
+    found = [
+        (src, d) for src, d in legal
+        if d == dst and CODE_TO_NAME[engine.board[square_of(*src)]].endswith(kind)
+        and (not from_file or src[0] == from_file) and (not from_rank or src[1] == int(from_rank))
+    ]
+    return found[0] if len(found) == 1 else None
+
+
+def jsonl_games(lines, variant):
+    """Yield (move texts, outcome) of the self-play records of `variant`."""
+    for line in lines:
+        if line.strip():
+            record = json.loads(line)
+            if record.get("variant") == variant:
+                yield record["moves"], record["outcome"]
+
+
+def _text_move(text):
+    # selfplay.move_text: "e2e4" or "<power>@e2e4"
+    power, _, squares = text.rpartition("@")
+    src = (squares[0], int(squares[1]))
+    dst = ("abcdefgh".index(squares[2]), 8 - int(squares[3]))
+    return src, dst, bool(power)
+
+
+# -------------------- Building --------------------
+
+def _new_engine(variant):
+    from chess_core import ChessCore
+    from superchess_core import SuperChessCore
+    engine = SuperChessCore() if variant == "super" else ChessCore()
+    engine.ai_auto_promote = True
+    return engine
+
+
+def _play(engine, color, src, dst, power):
+    if power:
+        legal = engine.legal_super_moves(*src)
+        return list(dst) in legal and engine.use_power(src, list(dst), legal)
+    if (src, tuple(dst)) not in engine.get_all_legal_moves(color):
+        return False
+    return engine.validate_move(dst, source=src)
+
+
+def add_game(weights, variant, moves, outcome, plies=BOOK_PLIES):
+    """
+    Replay one game (an iterable of (src, dst, power) or SAN strings) and add its first
+    `plies` moves to `weights` {(hash, move): weight}: 2 when the mover won, 1 for a
+    draw, 0 for a loss. Stops at the first move that does not replay.
+    """
+    engine = _new_engine(variant)
+    for ply, move in enumerate(moves):
+        if ply >= plies:
+            break
+        color = "white" if engine.turn["white"] else "black"
+        if isinstance(move, str):
+            move = san_move(engine, color, move)
+            if move is None:
+                break
+            move = move + (False,)
+        src, dst, power = move
+        key = engine.position_hash()
+        if not _play(engine, color, src, dst, power):
+            break
+        entry = (key, encode_move(square_of(*src), dst[1] * 8 + dst[0], power))
+        score = 2 if outcome == color.capitalize() else 0 if outcome in ("White", "Black") else 1
+        weights[entry] = weights.get(entry, 0) + score
+
+
+def write_book(path, weights):
+    """Write {(hash, move): weight} as a sorted book file (zero-weight moves dropped)."""
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as out:
+        out.write(MAGIC)
+        for (key, move), weight in sorted(weights.items()):
+            if weight > 0:
+                out.write(ENTRY.pack(key, move, min(weight, 0xFFFF)))
+    os.replace(tmp, path)     # readers keep their old mapping until they reopen
+
+
+def build(paths, variant, plies=BOOK_PLIES):
+    """{(hash, move): weight} from PGN (.pgn) and self-play JSONL files."""
+    weights = {}
+    games = 0
+    for path in paths:
+        with open(path) as f:
+            if path.endswith(".pgn"):
+                source = pgn_games(f.read())
+            else:
+                source = ((map(_text_move, moves), outcome) for moves, outcome in jsonl_games(f, variant))
+            for moves, outcome in source:
+                add_game(weights, variant, moves, outcome, plies)
+                games += 1
+    return weights, games
+
+
+# -------------------- CLI --------------------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or probe an opening book.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    b = sub.add_parser("build", help="build a book from PGN / self-play JSONL files")
+    b.add_argument("files", nargs="+")
+    b.add_argument("--variant", choices=("classic", "super"), default="classic")
+    b.add_argument("--plies", type=int, default=BOOK_PLIES, help="book depth in half-moves")
+    b.add_argument("--out", help="book file (default books/<variant>.book)")
+    p = sub.add_parser("probe", help="list the book moves of a position")
+    p.add_argument("--variant", choices=("classic", "super"), default="classic")
+    p.add_argument("--fen", help="position (default: the start position)")
+    p.add_argument("--book", help="book file (default books/<variant>.book)")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        out = args.out or book_path(args.variant)
+        weights, games = build(args.files, args.variant, args.plies)
+        write_book(out, weights)
+        print(f"{out}: {games} games, {sum(1 for w in weights.values() if w > 0)} entries")
+        return 0
+
+    book = open_book(args.book or book_path(args.variant))
+    if book is None:
+        parser.error("no book file")
+    engine = _new_engine(args.variant)
+    if args.fen:
+        engine.set_fen(args.fen)
+    for (src, dst, power), weight in sorted(book.entries(engine.position_hash()), key=lambda e: -e[1]):
+        f, r = SQ_FILE_ROW[src]
+        x, y = SQ_XY[dst]
+        print(f"  {'power ' if power else ''}{f}{r}{'abcdefgh'[x]}{8 - y}  {weight}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,303 @@
+# perft.py
+# Perft: count the leaf nodes of the legal move tree. The counts for the
+# standard test positions are well known, so a mismatch points straight at a
+# move generator bug; the timing gives a nodes/sec figure for the engine core.
+#
+# Run from the project root (uses the headless engine core, no pygame):
+#   python perft.py                              # standard suite, depth 3
+#   python perft.py --position kiwipete --depth 4 --divide
+#   python perft.py --fen "8/8/8/8/8/8/8/K6k w - - 0 1" --depth 5
+#   python perft.py --super --charges 3 --depth 2   # SuperChess, powers counted
+#   python perft.py --check                      # also verify the incremental hash/material
+#   python perft.py --super --check              # ... and the move journal's replay of a random game
+
+import argparse, copy, random, sys, time
+
+from board import PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KIND_MASK, WHITE, square_of
+from chess_core import ChessCore
+from evaluation import material
+from journal import MoveJournal, KEYFRAME_EVERY
+from zobrist import position_hash
+
+# name -> (FEN, node counts for depth 1, 2, ...)
+POSITIONS = {
+    "start": ("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+              [20, 400, 8902, 197281]),
+    "kiwipete": ("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+                 [48, 2039, 97862, 4085603]),
+    "pos3": ("8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+             [14, 191, 2812, 43238]),
+    "pos4": ("r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+             [6, 264, 9467, 422333]),
+    "pos5": ("rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+             [44, 1486, 62379, 2103487]),
+}
+
+PROMOTION_KINDS = (QUEEN, ROOK, BISHOP, KNIGHT)
+PROMOTION_LETTERS = {QUEEN: "q", ROOK: "r", BISHOP: "b", KNIGHT: "n"}
+
+# everything a real SuperChess move may change; snapshot before, restore after
+SUPER_STATE = ("board", "turn", "has_moved", "last_move", "captured", "position_counts",
+               "winner", "moves", "selected_sq", "last_move_meta", "charges",
+               "fortress_zones", "king_recently_checked", "previewing",
+               "power_preview_active", "preview_moves", "preview_source",
+               "preview_selected", "power_preview_name", "power_was_used_this_turn", "zobrist",
+               "material")
+
+
+def make_engine(cls=ChessCore, fen=None):
+    """Fresh headless engine, optionally set up from a FEN."""
+    engine = cls()
+    engine.ai_auto_promote = True
+    if fen:
+        engine.set_fen(fen)
+    return engine
+
+
+def side_to_move(engine):
+    return "black" if engine.turn["black"] else "white"
+
+
+def expand(engine, moves):
+    """((f,r),(x,y)) legal moves -> make_move tuples, one per promotion piece."""
+    board = engine.board
+    out = []
+    for (f, r), (x, y) in moves:
+        src, dst = square_of(f, r), y * 8 + x
+        if board[src] & KIND_MASK == PAWN and y in (0, 7):
+            for kind in PROMOTION_KINDS:
+                out.append((src, dst, kind))
+        else:
+            out.append((src, dst))
+    return out
+
+
+def check_incremental(engine, where):
+    """Raise AssertionError if the incremental hash or material score drifted from a full recount."""
+    full = position_hash(engine.board, engine.turn["black"], engine.has_moved, engine.last_move)
+    if engine.zobrist != full:
+        raise AssertionError(f"zobrist drift {where}: {engine.zobrist:#x} != {full:#x}")
+    score = material(engine.board, WHITE)
+    if engine.material != score:
+        raise AssertionError(f"material drift {where}: {engine.material} != {score}")
+
+
+def perft(engine, depth, check=False):
+    """
+    Number of leaf nodes `depth` plies below the current position. With `check`,
+    every make/unmake is followed by check_incremental.
+    """
+    moves = expand(engine, engine.get_all_legal_moves(side_to_move(engine)))
+    if depth <= 1 and not check:
+        return len(moves) if depth == 1 else 1
+    if depth <= 0:
+        return 1
+    nodes = 0
+    for move in moves:
+        undo = engine.make_move(move)
+        if check:
+            check_incremental(engine, f"after {move_name(move)}")
+        nodes += perft(engine, depth - 1, check)
+        engine.unmake_move(undo)
+        if check:
+            check_incremental(engine, f"undoing {move_name(move)}")
+    return nodes
+
+
+def move_name(move):
+    src, dst = move[0], move[1]
+    name = "%s%d%s%d" % ("abcdefgh"[src & 7], 8 - (src >> 3), "abcdefgh"[dst & 7], 8 - (dst >> 3))
+    return name + PROMOTION_LETTERS[move[2]] if len(move) > 2 else name
+
+
+def divide(engine, depth):
+    """perft split by root move: list of (move_name, nodes)."""
+    result = []
+    for move in expand(engine, engine.get_all_legal_moves(side_to_move(engine))):
+        undo = engine.make_move(move)
+        result.append((move_name(move), perft(engine, depth - 1)))
+        engine.unmake_move(undo)
+    return result
+
+
+# -------------------- SuperChess --------------------
+
+def save_state(engine):
+    return {k: copy.deepcopy(getattr(engine, k)) for k in SUPER_STATE if hasattr(engine, k)}
+
+
+def restore_state(engine, state):
+    for k, v in state.items():
+        setattr(engine, k, copy.deepcopy(v) if k != "board" else bytearray(v))
+
+
+def power_activations(engine, color):
+    """(source, target, legal) for every legal power use of `color` in file order."""
+    if engine.charges.get(color, 0) <= 0:
+        return []
+    acts = []
+    for f in "abcdefgh":
+        for r in range(1, 9):
+            name = engine.piece_at(*engine.square_to_xy(f, r))
+            if not name.startswith(color):
+                continue
+            legal = engine.legal_super_moves(f, r)
+            for target in legal:
+                acts.append(((f, r), target, legal))
+    return acts
+
+
+def check_make_unmake(engine):
+    """check_incremental around make/unmake of every pseudo move and power of the side to move."""
+    c = 1 if engine.turn["black"] else 0
+    check_incremental(engine, "at node")
+    for move in engine._pseudo_moves(c) + engine._pseudo_powers(c):
+        undo = engine.make_move(move)
+        check_incremental(engine, f"after {move}")
+        engine.unmake_move(undo)
+        check_incremental(engine, f"undoing {move}")
+
+
+def super_perft(engine, depth, check=False):
+    """
+    SuperChess perft through the real validate_move path (fortress zones, charges).
+    Returns (nodes, power_nodes); power_nodes counts leaves reached by a power
+    activation at the last ply. Promotions count once (the engine auto-queens).
+    With `check`, every node also runs check_make_unmake.
+    """
+    if check:
+        check_make_unmake(engine)
+    color = side_to_move(engine)
+    moves = engine.get_all_legal_moves(color)
+    acts = power_activations(engine, color)
+    if depth <= 1:
+        return (len(moves) + len(acts), len(acts)) if depth == 1 else (1, 0)
+    nodes = powers = 0
+    state = save_state(engine)
+    for src, dst in moves:
+        engine.validate_move(dst, source=src)
+        n, p = super_perft(engine, depth - 1, check)
+        nodes += n
+        powers += p
+        restore_state(engine, state)
+    for src, target, legal in acts:
+        engine.use_power(src, tuple(target), legal)
+        n, p = super_perft(engine, depth - 1, check)
+        nodes += n
+        powers += p
+        restore_state(engine, state)
+    return nodes, powers
+
+
+def check_journal(plies=3 * KEYFRAME_EVERY, charges=6, power_rate=0.5, seed=0):
+    """
+    Play a random SuperChess game, recording every half-move in a MoveJournal, and
+    raise AssertionError unless journal[i].restore() gives back the live
+    position_hash() of ply i on a second engine. The game must cross a keyframe and
+    include power moves that change the charges and the fortress zones.
+    Returns (half-moves, power moves).
+    """
+    from superchess_core import SuperChessCore
+    rng = random.Random(seed)
+    engine = make_engine(SuperChessCore)
+    engine.charges = {"white": charges, "black": charges}
+    journal = MoveJournal()
+    journal.record(engine)
+    live = [engine.position_hash()]
+    powers = zone_plies = 0
+    while len(journal) <= plies and not engine.winner:
+        color = side_to_move(engine)
+        acts = power_activations(engine, color)
+        moves = engine.get_all_legal_moves(color)
+        if acts and (not moves or rng.random() < power_rate):
+            src, target, legal = rng.choice(acts)
+            before = (dict(engine.charges), len(engine.fortress_zones))
+            if not engine.use_power(src, tuple(target), legal):
+                raise AssertionError(f"legal power {src}->{target} refused at ply {len(journal)}")
+            powers += 1
+            if before[0] == engine.charges:
+                raise AssertionError(f"power at ply {len(journal)} left the charges unchanged")
+        elif moves:
+            src, dst = rng.choice(moves)
+            engine.validate_move(dst, source=src)
+        else:
+            break
+        if len(engine.fortress_zones):
+            zone_plies += 1
+        journal.record(engine)
+        live.append(engine.position_hash())
+
+    if len(journal) <= KEYFRAME_EVERY or not powers or not zone_plies:
+        raise AssertionError(f"journal check too short: {len(journal)} plies, {powers} powers, "
+                             f"{zone_plies} plies with fortress zones (try another seed)")
+    replay = make_engine(SuperChessCore)
+    for i, key in enumerate(live):
+        journal[i].restore(replay)
+        if replay.position_hash() != key:
+            raise AssertionError(f"journal replay drift at ply {i}: {replay.position_hash():#x} != {key:#x}")
+    return len(journal), powers
+
+
+# -------------------- CLI --------------------
+
+def run(name, fen, depth, expected=None, show_divide=False, check=False):
+    engine = make_engine(fen=fen)
+    if show_divide:
+        for move, nodes in sorted(divide(engine, depth)):
+            print(f"  {move:6s} {nodes}")
+    start = time.perf_counter()
+    nodes = perft(engine, depth, check)
+    elapsed = time.perf_counter() - start
+    status = ""
+    if expected is not None:
+        status = "ok" if nodes == expected else f"FAIL (expected {expected})"
+    print(f"{name:10s} depth {depth}  {nodes:10d} nodes  {elapsed:7.2f} s  "
+          f"{nodes / max(elapsed, 1e-9):9.0f} nps  {status}")
+    return expected is None or nodes == expected
+
+
+def run_super(fen, depth, charges, check=False):
+    from superchess_core import SuperChessCore
+    engine = make_engine(SuperChessCore, fen)
+    engine.charges = {"white": charges, "black": charges}
+    start = time.perf_counter()
+    nodes, powers = super_perft(engine, depth, check)
+    elapsed = time.perf_counter() - start
+    print(f"super      depth {depth}  {nodes:10d} nodes  ({powers} by powers)  {elapsed:7.2f} s  "
+          f"{nodes / max(elapsed, 1e-9):9.0f} nps")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Perft move-generator check and benchmark.")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--position", choices=sorted(POSITIONS), help="one standard position")
+    parser.add_argument("--fen", help="custom position")
+    parser.add_argument("--divide", action="store_true", help="print node counts per root move")
+    parser.add_argument("--super", action="store_true", help="SuperChess rules, powers included")
+    parser.add_argument("--charges", type=int, default=0, help="starting charges per side (--super)")
+    parser.add_argument("--check", action="store_true",
+                        help="verify the incremental hash and material score against a recount at every node")
+    args = parser.parse_args(argv)
+
+    if args.super:
+        fen = args.fen or (POSITIONS[args.position][0] if args.position else None)
+        run_super(fen, args.depth, args.charges, args.check)
+        if args.check:
+            n, powers = check_journal()
+            print(f"journal    {n} half-moves ({powers} powers) replayed, hashes ok")
+        return 0
+
+    if args.fen:
+        run("fen", args.fen, args.depth, show_divide=args.divide, check=args.check)
+        return 0
+
+    ok = True
+    for name in ([args.position] if args.position else list(POSITIONS)):
+        fen, counts = POSITIONS[name]
+        expected = counts[args.depth - 1] if args.depth <= len(counts) else None
+        ok = run(name, fen, args.depth, expected, args.divide, args.check) and ok
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
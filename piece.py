@@ -1,36 +1,24 @@
-import os
 import pygame
 
+import sprites
+
+
 class Piece(pygame.sprite.Sprite):
-    def __init__(self, filename, cols, rows):
+    def __init__(self, filename, cols, rows, size=None):
         pygame.sprite.Sprite.__init__(self)
-        self.pieces = {
-            "white_pawn":   5,
-            "white_knight": 3,
-            "white_bishop": 2,
-            "white_rook":   4,
-            "white_king":   0,
-            "white_queen":  1,
-            "black_pawn":   11,
-            "black_knight": 9,
-            "black_bishop": 8,
-            "black_rook":   10,
-            "black_king":   6,
-            "black_queen":  7
-        }
-        self.spritesheet = pygame.image.load(filename).convert_alpha()
+        self.pieces = sprites.PIECE_INDEX
+        self.atlas = sprites.atlas(filename, cols, rows)
+        self.spritesheet = self.atlas.sheet
 
         self.cols = cols
         self.rows = rows
         self.cell_count = cols * rows
 
         self.rect = self.spritesheet.get_rect()
-        w = self.cell_width = self.rect.width // self.cols
-        h = self.cell_height = self.rect.height // self.rows
-
-        self.cells = list([(i % cols * w, i // cols * h, w, h) for i in range(self.cell_count)])
-
-    def draw(self, surface, piece_name, coords):
-        piece_index = self.pieces[piece_name]
-        surface.blit(self.spritesheet, coords, self.cells[piece_index])
+        self.cell_width = self.atlas.cell_width
+        self.cell_height = self.atlas.cell_height
+        # pieces are drawn at `size` (the board square); the sheet's own cell size if not given
+        self.size = int(size) if size else self.cell_width
 
+    def draw(self, surface, piece_name, coords, size=None):
+        self.atlas.draw(surface, piece_name, coords, size or self.size)
@@ -0,0 +1,142 @@
+# render.py
+# Dirty-rectangle drawing for the pygame frame loop. Each frame the game
+# describes its screen as layers of regions, each region a (key, rect, state)
+# triple. Only regions whose state changed since the last frame are redrawn
+# and pushed with pygame.display.update(rects), so an idle position draws and
+# uploads nothing. The resource cache below keeps fonts, rendered text and
+# translucent overlays between frames so a steady frame allocates nothing.
+
+from collections import OrderedDict
+
+import pygame
+
+
+class DirtyRenderer(object):
+    """
+    frame(layers) redraws what changed; present() pushes it to the display.
+    `layers` is a bottom-to-top list of (draw, regions): draw() paints the whole
+    layer and regions is a list of (key, rect, state). State must compare by value
+    (tuples, bytes, numbers). Drawing is clipped to the changed area and every
+    layer that overlaps it is repainted in order, so overlapping layers stay
+    consistent.
+    """
+
+    def __init__(self, screen, background=(28, 28, 28)):
+        self.screen = screen
+        self.background = background
+        self._last = {}         # key -> (rect, state) of the last frame
+        self._full = True       # next frame repaints the whole screen
+        self.dirty = []         # rects changed this frame, for present()
+
+    def invalidate(self):
+        """Repaint everything next frame (new layout, after a modal drew over the screen)."""
+        self._full = True
+
+    def frame(self, layers):
+        """Redraw the changed regions. Returns the list of dirty rects (empty when idle)."""
+        last = self._last
+        current = {}
+        dirty = []
+        bounds = []
+        for draw, regions in layers:
+            rects = []
+            for key, rect, state in regions:
+                entry = (tuple(rect), state)
+                current[key] = entry
+                rects.append(rect)
+                if last.get(key) != entry:
+                    dirty.append(pygame.Rect(rect))
+            bounds.append(rects[0].unionall(rects[1:]) if rects else None)
+        for key, (rect, _) in last.items():
+            if key not in current:
+                dirty.append(pygame.Rect(rect))   # region went away: repaint what it covered
+        self._last = current
+
+        if self._full:
+            self._full = False
+            dirty = [self.screen.get_rect()]
+        self.dirty = dirty
+        if not dirty:
+            return dirty
+
+        clip = dirty[0].unionall(dirty[1:])
+        self.screen.set_clip(clip)
+        self.screen.fill(self.background)
+        for (draw, _), bound in zip(layers, bounds):
+            if bound is not None and bound.colliderect(clip):
+                draw()
+        return dirty
+
+    def present(self):
+        """Push this frame's dirty rects to the display."""
+        self.screen.set_clip(None)
+        if self.dirty:
+            pygame.display.update(self.dirty)
+        self.dirty = []
+
+
+# -------------------- Resource cache --------------------
+
+class ResourceCache(object):
+    """LRU map of render resources; get() builds a missing entry and evicts the oldest."""
+
+    def __init__(self, max_items=1024):
+        self.max_items = max_items
+        self.items = OrderedDict()
+
+    def get(self, key, build):
+        items = self.items
+        value = items.get(key)
+        if value is not None:
+            items.move_to_end(key)
+            return value
+        value = items[key] = build()
+        if len(items) > self.max_items:
+            items.popitem(last=False)
+        return value
+
+    def clear(self):
+        self.items.clear()
+
+
+_cache = ResourceCache()
+
+
+def cached(key, build):
+    """Shared LRU lookup for anything else worth keeping between frames."""
+    return _cache.get(key, build)
+
+
+def clear_cache():
+    """Drop every cached resource (square size changed, new variant)."""
+    _cache.clear()
+
+
+def font(name, size, bold=False):
+    """pygame.font.SysFont(name, size, bold), created once."""
+    return _cache.get(("font", name, size, bold), lambda: pygame.font.SysFont(name, size, bold=bold))
+
+
+def text(fnt, string, color, antialias=True):
+    """fnt.render(string, antialias, color), rendered once. Shared: blit it, do not draw on it."""
+    return _cache.get(("text", fnt, string, tuple(color), antialias), lambda: fnt.render(string, antialias, color))
+
+
+def overlay(size, rgba):
+    """Translucent surface of `size` filled with `rgba`. Shared: blit it, do not draw on it."""
+    def build():
+        surf = pygame.Surface(size, pygame.SRCALPHA)
+        surf.fill(rgba)
+        return surf
+    return _cache.get(("overlay", tuple(size), tuple(rgba)), build)
+
+
+def image(path, size=None):
+    """Image file converted for blitting (scaled to `size` if given), or None if it cannot be loaded."""
+    def build():
+        try:
+            img = pygame.image.load(path).convert_alpha()
+            return pygame.transform.smoothscale(img, size) if size else img
+        except Exception:
+            return False
+    return _cache.get(("image", path, size), build) or None
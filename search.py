@@ -0,0 +1,276 @@
+# search.py
+# Alpha-beta search for the AI side. Runs on the engine's make_move/unmake_move
+# path: iterative deepening negamax with quiescence on captures, a Zobrist
+# transposition table, MVV-LVA, killer and history move ordering, bounded by a
+# time budget per move. Leaves are scored by evaluation.py. On a SuperChess core the power activations are searched
+# as moves too ((src, dst, POWER), see SuperChessCore.make_move), so spending a
+# charge competes with every normal move.
+
+import time
+
+from board import KIND_MASK, WHITE, COLOR_INDEX, SQ_FILE_ROW, SQ_XY, square_of
+from evaluation import LAZY_MARGIN, PIECE_VALUES, evaluate, material, positional, power_score
+from zobrist import TranspositionTable, EXACT, LOWER, UPPER
+
+MATE = 100000
+INF = 1000000
+MAX_PLY = 64
+
+
+def _score_to_tt(score, ply):
+    # mate scores are stored relative to the node, not the root
+    if score >= MATE - MAX_PLY:
+        return score + ply
+    if score <= -MATE + MAX_PLY:
+        return score - ply
+    return score
+
+
+def _score_from_tt(score, ply):
+    if score >= MATE - MAX_PLY:
+        return score - ply
+    if score <= -MATE + MAX_PLY:
+        return score + ply
+    return score
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class Search(object):
+    """
+    One search per AI move over a ChessCore engine. The engine is modified while
+    searching (make/unmake) and is left exactly as it was found.
+    """
+
+    def __init__(self, engine, time_limit=0.5, max_depth=MAX_PLY, tt=None):
+        self.engine = engine
+        self.tt = tt if tt is not None else TranspositionTable()
+        self.time_limit = time_limit
+        self.max_depth = max_depth
+        self.nodes = 0
+        self.depth = 0              # last completed iteration
+        self.score = 0
+        self.deadline = 0.0
+        self.stopped = False        # set from another thread by stop()
+        self.killers = [[None, None] for _ in range(MAX_PLY + 1)]
+        self.history = [0] * 4096   # src*64 + dst
+        self.charged = getattr(engine, "charges", None) is not None
+
+    # -------------------- Root --------------------
+
+    def best_move(self, color):
+        """
+        Best ((file, row), (x, y)) for `color` ('white'/'black') found within the time
+        budget, ((file, row), (x, y), "power") when a power activation is best, or None
+        when there is no legal move. Root moves come from get_all_legal_moves, so variant
+        rules (e.g. fortress zones) are respected.
+        """
+        engine = self.engine
+        c = COLOR_INDEX[color]
+        # leaves read the incremental material score; a copied or hand-edited board may have left it stale
+        engine.material = material(engine.board, WHITE)
+        root = [(square_of(*src), dst[1] * 8 + dst[0]) for src, dst in engine.get_all_legal_moves(color)]
+        for move in engine._pseudo_powers(c):
+            undo = engine.make_move(move)
+            if not engine._in_check(c):
+                root.append(move)
+            engine.unmake_move(undo)
+        if not root:
+            return None
+        root = self._static_order(root, c)
+        self.deadline = time.perf_counter() + self.time_limit
+        self.nodes = 0
+        self.tt.new_search()
+        best = root[0]
+
+        # charges and zones are replaced by make_move, never edited: the references are enough
+        saved = (bytes(engine.board), dict(engine.has_moved), engine.last_move, dict(engine.turn), engine.zobrist,
+                 engine.material, getattr(engine, "charges", None), getattr(engine, "fortress_zones", None))
+        try:
+            for depth in range(1, self.max_depth + 1):
+                # previous best first, then the usual ordering
+                root = [best] + [m for m in self._order(root, 0) if m != best]
+                alpha, iter_best = -INF, None
+                for move in root:
+                    undo = engine.make_move(move)
+                    score = -self._negamax(depth - 1, -INF, -alpha, 1, c ^ 1)
+                    engine.unmake_move(undo)
+                    if score > alpha:
+                        alpha, iter_best = score, move
+                best, self.score, self.depth = iter_best, alpha, depth
+                if alpha >= MATE - MAX_PLY or self.stopped or time.perf_counter() >= self.deadline:
+                    break
+        except SearchTimeout:
+            # unwinding skipped the inner unmake_move calls; put the position back
+            board, has_moved, last_move, turn, zobrist, score, charges, zones = saved
+            engine.board[:] = board
+            engine.has_moved.clear()
+            engine.has_moved.update(has_moved)
+            engine.last_move = last_move
+            engine.turn.update(turn)
+            engine.zobrist = zobrist
+            engine.material = score
+            if self.charged:
+                engine.charges, engine.fortress_zones = charges, zones
+
+        if len(best) > 2:
+            return SQ_FILE_ROW[best[0]], SQ_XY[best[1]], "power"
+        return SQ_FILE_ROW[best[0]], SQ_XY[best[1]]
+
+    def _static_order(self, moves, c):
+        """
+        Root moves sorted by the static score of the position after each; the first
+        iteration searches them in this order (the ordering sort is stable), later ones
+        start from the previous best.
+        """
+        engine = self.engine
+        scores = []
+        for move in moves:
+            undo = engine.make_move(move)
+            score = evaluate(engine.board, c)
+            if self.charged:
+                score += power_score(engine.charges, engine.fortress_zones, c)
+            scores.append(score)
+            engine.unmake_move(undo)
+        ranked = sorted(range(len(moves)), key=lambda i: scores[i], reverse=True)
+        return [moves[i] for i in ranked]
+
+    def stop(self):
+        """Ask a running best_move() to return its best move so far (thread-safe)."""
+        self.stopped = True
+
+    # -------------------- Tree --------------------
+
+    def _negamax(self, depth, alpha, beta, ply, c):
+        self.nodes += 1
+        if not self.nodes & 1023 and (self.stopped or time.perf_counter() >= self.deadline):
+            raise SearchTimeout()
+        engine = self.engine
+        if engine._king_square(c) < 0:
+            # a power took the king
+            return -MATE + ply
+        if depth <= 0 or ply >= MAX_PLY:
+            return self._quiesce(alpha, beta, c)
+
+        key = engine.position_hash()
+        entry = self.tt.probe(key)
+        tt_move = None
+        if entry is not None:
+            tt_move = entry[4]
+            if entry[1] >= depth:
+                score = _score_from_tt(entry[3], ply)
+                flag = entry[2]
+                if flag == EXACT or (flag == LOWER and score >= beta) or (flag == UPPER and score <= alpha):
+                    return score
+
+        alpha_orig = alpha
+        in_check = engine._in_check(c)
+        legal = 0
+        best = -INF
+        best_move = None
+        board = engine.board
+        moves = engine._pseudo_moves(c) + engine._pseudo_powers(c)
+        for move in self._order(moves, ply, tt_move):
+            quiet = not board[move[1]] and len(move) == 2
+            undo = engine.make_move(move)
+            if engine._in_check(c):
+                engine.unmake_move(undo)
+                continue
+            legal += 1
+            score = -self._negamax(depth - 1, -beta, -alpha, ply + 1, c ^ 1)
+            engine.unmake_move(undo)
+            if score > best:
+                best = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        if quiet:
+                            killers = self.killers[ply]
+                            if killers[0] != move:
+                                killers[1] = killers[0]
+                                killers[0] = move
+                            self.history[move[0] * 64 + move[1]] += depth * depth
+                        break
+
+        if not legal:
+            # checkmate (prefer the shortest) or stalemate
+            return -MATE + ply if in_check else 0
+
+        if best <= alpha_orig:
+            flag = UPPER
+        elif best >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.tt.store(key, depth, flag, _score_to_tt(best, ply), best_move)
+        return best
+
+    def _quiesce(self, alpha, beta, c):
+        """Captures only, standing pat on the static evaluation."""
+        self.nodes += 1
+        if not self.nodes & 1023 and (self.stopped or time.perf_counter() >= self.deadline):
+            raise SearchTimeout()
+        engine = self.engine
+        board = engine.board
+        # material and piece-square terms are kept up to date by make/unmake
+        stand = engine.material if c == WHITE else -engine.material
+        if self.charged:
+            stand += power_score(engine.charges, engine.fortress_zones, c)
+        if alpha - LAZY_MARGIN < stand < beta + LAZY_MARGIN:
+            # lazy evaluation: the positional terms only matter near the window
+            stand += positional(board, c)
+        if stand >= beta:
+            return stand
+        if stand > alpha:
+            alpha = stand
+
+        captures = []
+        for src, dst in engine._pseudo_moves(c):
+            victim = board[dst]
+            if victim:
+                captures.append((PIECE_VALUES[victim & KIND_MASK] * 10 - (board[src] & KIND_MASK), (src, dst)))
+        captures.sort(reverse=True)
+
+        for _, move in captures:
+            undo = engine.make_move(move)
+            if engine._in_check(c):
+                engine.unmake_move(undo)
+                continue
+            score = -self._quiesce(-beta, -alpha, c ^ 1)
+            engine.unmake_move(undo)
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+        return alpha
+
+    # -------------------- Ordering --------------------
+
+    def _order(self, moves, ply, tt_move=None):
+        """
+        Table move first, captures by MVV-LVA, then killer moves, then quiet moves by
+        history. A power counts as a capture when it lands on an enemy piece.
+        """
+        board = self.engine.board
+        killers = self.killers[ply]
+        history = self.history
+        keyed = []
+        for move in moves:
+            src, dst = move[0], move[1]
+            victim = board[dst]
+            if move == tt_move:
+                key = 2000000
+            elif victim and victim >> 3 != board[src] >> 3:
+                key = 1000000 + PIECE_VALUES[victim & KIND_MASK] * 10 - (board[src] & KIND_MASK)
+            elif move == killers[0]:
+                key = 900000
+            elif move == killers[1]:
+                key = 800000
+            else:
+                key = history[src * 64 + dst]
+            keyed.append((key, move))
+        keyed.sort(key=lambda km: km[0], reverse=True)
+        return [move for _, move in keyed]
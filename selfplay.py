@@ -0,0 +1,274 @@
+# selfplay.py
+# Headless self-play: many games of Chess or SuperChess between configurable AI
+# players, spread over a process pool, with one result record per game streamed
+# to JSONL or to a compact binary file. No pygame; runs on the engine core.
+#
+# Run from the project root:
+#   python selfplay.py --games 1000 --super --out games.jsonl
+#   python selfplay.py --games 100000 --super --white random --black random --format bin --out games.bin
+#   python selfplay.py --games 200 --super --white random --black search:0.05:3 --power-rate 0.5
+#
+# Player specs: "random" (uniform over legal moves) or "search[:seconds[:depth]]"
+# (the alpha-beta AI of search.py). In SuperChess a random player with charges uses
+# a power with probability --power-rate before it looks at normal moves; a search
+# player weighs powers against moves in its search.
+
+import argparse, json, os, random, struct, sys, time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from board import KIND_MASK, KING, square_of
+from chess_core import ChessCore
+from perft import power_activations, side_to_move
+from search import Search
+from superchess_core import POWER_NAMES, SuperChessCore
+from zobrist import TranspositionTable
+
+MAX_PLIES = 400
+
+OUTCOMES = ("White", "Black", "Stalemate", "Threefold", "InsufficientMaterial", "MaxPlies")
+POWERS = tuple(POWER_NAMES.values())    # binary power ids are 1 + index here; 0 is a normal move
+
+# binary format: MAGIC, then per game a header and `plies` 3-byte moves (src, dst, power id)
+MAGIC = b"SCSELF1\n"
+HEADER = struct.Struct("<IBBHBBBB")     # game, super, outcome, plies, charges used w/b, captures w/b
+
+
+# -------------------- Players --------------------
+
+def parse_player(spec):
+    """"random" or "search[:seconds[:depth]]" -> (kind, seconds, depth)."""
+    parts = spec.split(":")
+    if parts[0] == "random" and len(parts) == 1:
+        return ("random", 0.0, 0)
+    if parts[0] == "search" and len(parts) <= 3:
+        seconds = float(parts[1]) if len(parts) > 1 else 0.05
+        depth = int(parts[2]) if len(parts) > 2 else 64
+        return ("search", seconds, depth)
+    raise ValueError(f"bad player spec {spec!r} (random | search[:seconds[:depth]])")
+
+
+_tt = None      # one transposition table per worker process
+
+
+def choose_move(engine, color, player, power_rate, rng):
+    """("power", src, target, legal) or ("move", src, dst), or None when `color` has no move."""
+    kind, seconds, depth = player
+    if kind == "random":
+        if isinstance(engine, SuperChessCore) and engine.charges.get(color, 0) > 0 and rng.random() < power_rate:
+            acts = power_activations(engine, color)
+            if acts:
+                src, target, legal = rng.choice(acts)
+                return ("power", src, tuple(target), legal)
+        moves = engine.get_all_legal_moves(color)
+        return ("move",) + rng.choice(moves) if moves else None
+
+    global _tt
+    if _tt is None:
+        _tt = TranspositionTable(16)
+    chosen = Search(engine, seconds, max_depth=depth, tt=_tt).best_move(color)
+    if chosen is None:
+        return None
+    if len(chosen) > 2:
+        # the search weighs powers itself
+        src, target, _ = chosen
+        return ("power", src, target, engine.legal_super_moves(*src))
+    return ("move",) + chosen
+
+
+# -------------------- One game --------------------
+
+def _only_kings(board):
+    return all(not code or code & KIND_MASK == KING for code in board)
+
+
+def play_game(index, super_rules, white, black, power_rate, seed, max_plies=MAX_PLIES):
+    """Play one game; returns its result record (a dict, see write_json / write_binary)."""
+    rng = random.Random(seed)
+    random.seed(seed)       # the engine core draws from the module RNG
+    engine = SuperChessCore() if super_rules else ChessCore()
+    engine.ai_auto_promote = True
+    players = {"white": white, "black": black}
+
+    moves = []              # (src sq, dst sq, power id)
+    charges_used = {"white": 0, "black": 0}
+    powers_used = {"white": {}, "black": {}}
+    captures = {"white": 0, "black": 0}
+    outcome = None
+    while outcome is None:
+        color = side_to_move(engine)
+        opponent = "black" if color == "white" else "white"
+        if len(moves) >= max_plies:
+            outcome = "MaxPlies"
+            break
+        chosen = choose_move(engine, color, players[color], power_rate, rng)
+        if chosen is None:
+            # no move at all: mate or stalemate (the previous move's checks normally catch it)
+            outcome = opponent.capitalize() if engine.is_in_check(color) else "Stalemate"
+            break
+
+        before = len(engine.captured)
+        if chosen[0] == "power":
+            _, src, target, legal = chosen
+            power = POWER_NAMES[engine.piece_at(*engine.square_to_xy(*src)).split("_", 1)[1]]
+            if not engine.use_power(src, target, legal) or side_to_move(engine) == color:
+                # an activation that failed (or did not pass the turn) would loop forever:
+                # play a random legal move instead
+                engine.cancel_power_preview()
+                engine._clear_preview(full=True)
+                chosen = choose_move(engine, color, ("random", 0.0, 0), 0.0, rng)
+                if chosen is None:
+                    outcome = opponent.capitalize() if engine.is_in_check(color) else "Stalemate"
+                    break
+            else:
+                charges_used[color] += 1
+                powers_used[color][power] = powers_used[color].get(power, 0) + 1
+                moves.append((square_of(*src), target[1] * 8 + target[0], 1 + POWERS.index(power)))
+        if chosen[0] == "move":
+            _, src, dst = chosen
+            engine.validate_move(dst, source=src)
+            moves.append((square_of(*src), dst[1] * 8 + dst[0], 0))
+        captures[color] += len(engine.captured) - before
+
+        engine._after_move_checks(color)
+        if engine.winner:
+            outcome = engine.winner
+        elif engine.find_king(opponent) is None:
+            outcome = color.capitalize()
+        elif _only_kings(engine.board):
+            outcome = "InsufficientMaterial"
+
+    return {
+        "game": index,
+        "variant": "super" if super_rules else "classic",
+        "seed": seed,
+        "outcome": outcome,
+        "plies": len(moves),
+        "moves": moves,
+        "charges_used": charges_used,
+        "powers_used": powers_used,
+        "captures": captures,
+    }
+
+
+def play_batch(indices, super_rules, white, black, power_rate, seed, max_plies):
+    return [play_game(i, super_rules, white, black, power_rate, seed + i, max_plies) for i in indices]
+
+
+# -------------------- Output --------------------
+
+def move_text(move):
+    src, dst, power = move
+    name = "%s%d%s%d" % ("abcdefgh"[src & 7], 8 - (src >> 3), "abcdefgh"[dst & 7], 8 - (dst >> 3))
+    return f"{POWERS[power - 1]}@{name}" if power else name
+
+
+def write_json(out, record):
+    record = dict(record, moves=[move_text(m) for m in record["moves"]])
+    out.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+
+def write_binary(out, record):
+    out.write(HEADER.pack(
+        record["game"], record["variant"] == "super", OUTCOMES.index(record["outcome"]),
+        record["plies"], record["charges_used"]["white"], record["charges_used"]["black"],
+        min(255, record["captures"]["white"]), min(255, record["captures"]["black"])))
+    out.write(bytes(v for move in record["moves"] for v in move))
+
+
+def read_binary(path):
+    """Yield the games of a --format bin file as dicts (moves as (src, dst, power id))."""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path}: not a self-play file")
+        while True:
+            head = f.read(HEADER.size)
+            if len(head) < HEADER.size:
+                return
+            game, is_super, outcome, plies, cw, cb, xw, xb = HEADER.unpack(head)
+            raw = f.read(3 * plies)
+            moves = [tuple(raw[i:i + 3]) for i in range(0, len(raw), 3)]
+            powers_used = {"white": {}, "black": {}}
+            for ply, (_, _, power) in enumerate(moves):
+                if power:
+                    side = powers_used["white" if ply % 2 == 0 else "black"]
+                    side[POWERS[power - 1]] = side.get(POWERS[power - 1], 0) + 1
+            yield {"game": game, "variant": "super" if is_super else "classic",
+                   "outcome": OUTCOMES[outcome], "plies": plies, "moves": moves,
+                   "charges_used": {"white": cw, "black": cb}, "powers_used": powers_used,
+                   "captures": {"white": xw, "black": xb}}
+
+
+# -------------------- CLI --------------------
+
+def run(args, out, write):
+    white, black = parse_player(args.white), parse_player(args.black)
+    batches = [range(i, min(i + args.batch, args.games)) for i in range(0, args.games, args.batch)]
+    workers = args.workers or os.cpu_count() or 1
+    tally = {}
+    done = 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        todo = iter(batches)
+        while True:
+            # keep a few batches per worker in flight; results stream out as they finish
+            for indices in todo:
+                pending.add(pool.submit(play_batch, indices, args.super, white, black,
+                                        args.power_rate, args.seed, args.max_plies))
+                if len(pending) >= workers * 4:
+                    break
+            if not pending:
+                break
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                for record in future.result():
+                    write(out, record)
+                    tally[record["outcome"]] = tally.get(record["outcome"], 0) + 1
+                    done += 1
+            if not args.quiet:
+                rate = done / max(time.perf_counter() - start, 1e-9)
+                print(f"\r{done}/{args.games} games  {rate:.1f} games/s", end="", file=sys.stderr)
+    if not args.quiet:
+        print(file=sys.stderr)
+    return tally
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless parallel self-play.")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--super", action="store_true", help="SuperChess rules (powers and charges)")
+    parser.add_argument("--white", default="search:0.05", help="random | search[:seconds[:depth]]")
+    parser.add_argument("--black", default="search:0.05", help="random | search[:seconds[:depth]]")
+    parser.add_argument("--power-rate", type=float, default=0.35, help="chance a charged random player uses a power")
+    parser.add_argument("--max-plies", type=int, default=MAX_PLIES, help="adjudicate longer games as MaxPlies")
+    parser.add_argument("--seed", type=int, default=0, help="game i is played with seed + i")
+    parser.add_argument("--workers", type=int, default=0, help="processes (default: all cores)")
+    parser.add_argument("--batch", type=int, default=16, help="games per task")
+    parser.add_argument("--format", choices=("jsonl", "bin"), default="jsonl")
+    parser.add_argument("--out", default="-", help="output file ('-' for stdout, jsonl only)")
+    parser.add_argument("--quiet", action="store_true")
+    args = parser.parse_args(argv)
+    try:
+        parse_player(args.white), parse_player(args.black)
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    if args.format == "bin":
+        if args.out == "-":
+            parser.error("--format bin needs --out FILE")
+        with open(args.out, "wb") as out:
+            out.write(MAGIC)
+            tally = run(args, out, write_binary)
+    elif args.out == "-":
+        tally = run(args, sys.stdout, write_json)
+    else:
+        with open(args.out, "w") as out:
+            tally = run(args, out, write_json)
+
+    if not args.quiet:
+        print("  ".join(f"{k}: {v}" for k, v in sorted(tally.items())), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,416 @@
+# server.py
+# Multi-game server: one asyncio process holding many headless Chess/SuperChess
+# games (ChessCore / SuperChessCore, no pygame). Clients speak a compact binary
+# protocol over TCP, or over an in-process socket pair (connect_local) for tests
+# and the load test (bench_server.py). Every accepted move or power activation
+# is broadcast to both players and the spectators of its game as a state delta:
+# the move, the changed squares, side to move, charges and fortress masks. AI
+# moves are searched in a process pool so the event loop never blocks on them.
+#
+# Run from the project root:
+#   python server.py --port 8765
+#   python server.py --port 8765 --ai-workers 4 --ai-time 0.2 --max-games 20000
+#
+# Frames are HEAD (payload length, message type) followed by the payload; all
+# integers are little-endian. Squares are board indices (y * 8 + x, a8 = 0).
+#   client -> server
+#     NEW    variant (0 classic, 1 super), seat (0 white, 1 black, 2 spectator), ai (1: AI plays black)
+#     JOIN   game, seat (0 white, 1 black, 2 spectator)
+#     MOVE   game, src, dst, power (1: activate the power of the piece on src toward dst)
+#     LEAVE  game
+#   server -> client
+#     JOINED game, seat
+#     STATE  game, ply, flags, white/black charges, outcome, white/black fortress masks + 64 board bytes
+#     DELTA  game, ply, src, dst, power, flags, white/black charges, outcome, fortress masks
+#            + (square, new piece code) pairs
+#     ERROR  game, error code
+# flags: bit 0 black to move, bit 1 SuperChess. Promotions are always to a queen.
+
+import argparse, asyncio, socket, struct, sys
+from concurrent.futures import ProcessPoolExecutor
+
+from ai_worker import ENGINE_STATE
+from board import COLORS, KIND_MASK, KING, SQ_FILE_ROW, SQ_XY, square_of
+from chess_core import ChessCore
+import opening_book
+from search import Search
+from superchess_core import SuperChessCore
+from zobrist import TranspositionTable
+
+HEAD = struct.Struct("<HB")     # payload length, message type
+
+NEW, JOIN, MOVE, LEAVE = 1, 2, 3, 4
+JOINED, STATE, DELTA, ERROR = 16, 17, 18, 19
+
+MESSAGES = {
+    NEW: struct.Struct("<BBB"),
+    JOIN: struct.Struct("<IB"),
+    MOVE: struct.Struct("<IBBB"),
+    LEAVE: struct.Struct("<I"),
+    JOINED: struct.Struct("<IB"),
+    STATE: struct.Struct("<IHBBBBQQ"),      # + 64 board bytes
+    DELTA: struct.Struct("<IHBBBBBBBQQ"),   # + changed (square, code) pairs
+    ERROR: struct.Struct("<IB"),
+}
+
+WHITE_SEAT, BLACK_SEAT, SPECTATOR = 0, 1, 2
+
+# ERROR codes
+NO_GAME, BAD_SEAT, NOT_YOUR_TURN, ILLEGAL, GAME_OVER, FULL, BAD_MESSAGE, NO_AI = range(1, 9)
+
+OUTCOMES = ("", "White", "Black", "Stalemate", "Threefold", "InsufficientMaterial")
+
+WRITE_BUFFER_LIMIT = 1 << 20    # a spectator this far behind is dropped instead of buffering more
+
+
+def encode(kind, *fields, tail=b""):
+    """One frame of message `kind`."""
+    payload = MESSAGES[kind].pack(*fields) + tail
+    return HEAD.pack(len(payload), kind) + payload
+
+
+def decode(kind, payload):
+    """Fields of a frame payload, with the variable-length tail (bytes) last."""
+    fmt = MESSAGES[kind]
+    return fmt.unpack_from(payload) + (payload[fmt.size:],)
+
+
+async def read_frame(reader):
+    """(kind, fields) of the next frame, or None at end of stream."""
+    try:
+        size, kind = HEAD.unpack(await reader.readexactly(HEAD.size))
+        payload = await reader.readexactly(size)
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return None
+    if kind not in MESSAGES or size < MESSAGES[kind].size:
+        return kind, None
+    return kind, decode(kind, payload)
+
+
+# -------------------- Games --------------------
+
+def new_engine(super_rules):
+    engine = SuperChessCore() if super_rules else ChessCore()
+    engine.ai_auto_promote = True
+    return engine
+
+
+def apply_move(engine, c, src, dst, power):
+    """
+    Play a move (or power activation) of colour index `c` given as board squares, as
+    the UI would: checked against the legal tables, then validate_move / use_power and
+    the end-of-game checks. Returns False, leaving the position alone, if it is illegal.
+    """
+    color = COLORS[c]
+    code = engine.board[src]
+    if not code or code >> 3 != c:
+        return False
+    source, dest = SQ_FILE_ROW[src], SQ_XY[dst]
+    if power:
+        if not isinstance(engine, SuperChessCore):
+            return False
+        legal = engine.legal_super_moves(*source)
+        if list(dest) not in legal:
+            return False
+        if not engine.use_power(source, dest, legal):
+            engine.cancel_power_preview()
+            engine._clear_preview(full=True)
+            return False
+    else:
+        if list(dest) not in engine.legal_move_table(color).get(src, ()):
+            return False
+        if not engine.validate_move(dest, source=source):
+            return False
+    engine._after_move_checks(color)
+    if not engine.winner:
+        # a SuperChess power can take a king outright
+        if engine.find_king(COLORS[c ^ 1]) is None:
+            engine.winner = color.capitalize()
+        elif all(not p or p & KIND_MASK == KING for p in engine.board):
+            engine.winner = "InsufficientMaterial"
+    return True
+
+
+class GameRoom(object):
+    """One hosted game: its engine, the seated players and the spectators."""
+
+    def __init__(self, game_id, super_rules, ai):
+        self.id = game_id
+        self.engine = new_engine(super_rules)
+        self.super = super_rules
+        self.ai = ai                    # the AI plays black
+        self.ai_busy = False
+        self.ply = 0
+        self.seats = [None, None]       # Client per seat
+        self.spectators = set()
+
+    def clients(self):
+        members = set(self.spectators)
+        members.update(seat for seat in self.seats if seat is not None)
+        return members
+
+    def side_to_move(self):
+        return 1 if self.engine.turn["black"] else 0
+
+    def outcome(self):
+        winner = self.engine.winner
+        return OUTCOMES.index(winner) if winner in OUTCOMES else 0
+
+    def header(self):
+        """flags, charges, outcome, fortress masks: the fields STATE and DELTA share."""
+        engine = self.engine
+        flags = self.side_to_move() | (2 if self.super else 0)
+        if self.super:
+            charges = engine.charges
+            owned = engine.fortress_zones.owned
+            return (flags, charges.get("white", 0), charges.get("black", 0), self.outcome(), owned[0], owned[1])
+        return (flags, 0, 0, self.outcome(), 0, 0)
+
+    def state_frame(self):
+        return encode(STATE, self.id, self.ply & 0xFFFF, *self.header(), tail=bytes(self.engine.board))
+
+
+class Client(object):
+    """A connection: its writer and the games it has a seat in or watches."""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.rooms = set()
+
+    def send(self, frame):
+        writer = self.writer
+        if writer.is_closing():
+            return False
+        if writer.transport.get_write_buffer_size() > WRITE_BUFFER_LIMIT:
+            writer.close()
+            return False
+        writer.write(frame)
+        return True
+
+
+# -------------------- AI (process pool) --------------------
+
+_tt = None      # one transposition table per worker process
+
+
+def ai_choose(super_rules, state, color, time_limit):
+    """
+    Runs in a pool process: the AI move of `color` in the position given by `state`
+    (ENGINE_STATE attributes). Returns (src, dst, power) squares or None.
+    """
+    global _tt
+    engine = new_engine(super_rules)
+    for name, value in state.items():
+        setattr(engine, name, value)
+    engine.refresh_hash()
+    book = opening_book.open_book(engine.ai_book)
+    chosen = book.choose(engine, color) if book is not None else None
+    if chosen is None:
+        if _tt is None:
+            _tt = TranspositionTable(16)
+        chosen = Search(engine, time_limit, tt=_tt).best_move(color)
+    if chosen is None:
+        return None
+    x, y = chosen[1]
+    return square_of(*chosen[0]), y * 8 + x, len(chosen) > 2
+
+
+# -------------------- Server --------------------
+
+class GameServer(object):
+    """
+    Hosts up to max_games games. handle(reader, writer) serves one connection; a
+    connection may play or watch any number of games (every message names its game).
+    """
+
+    def __init__(self, max_games=10000, ai_workers=1, ai_time=0.2):
+        self.max_games = max_games
+        self.ai_time = ai_time
+        self.pool = ProcessPoolExecutor(max_workers=ai_workers) if ai_workers > 0 else None
+        self.rooms = {}
+        self.next_id = 1
+        self.moves = 0                  # accepted moves, AI moves included
+        self.ai_moves = 0
+        self._server = None
+        self._tasks = set()             # the loop only keeps weak references to running tasks
+
+    async def start(self, host="127.0.0.1", port=8765):
+        self._server = await asyncio.start_server(self.handle, host, port)
+        return self._server
+
+    async def connect_local(self):
+        """(reader, writer) of a client connected through an in-process socket pair."""
+        ours, theirs = socket.socketpair()
+        reader, writer = await asyncio.open_connection(sock=ours)
+        server_reader, server_writer = await asyncio.open_connection(sock=theirs)
+        self._spawn(self.handle(server_reader, server_writer))
+        return reader, writer
+
+    def _spawn(self, coro):
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def close(self):
+        if self._server is not None:
+            self._server.close()
+        for task in self._tasks:
+            task.cancel()
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+
+    async def handle(self, reader, writer):
+        client = Client(writer)
+        handlers = {NEW: self._new, JOIN: self._join, MOVE: self._move, LEAVE: self._leave}
+        try:
+            while True:
+                frame = await read_frame(reader)
+                if frame is None:
+                    break
+                kind, fields = frame
+                if fields is None or kind not in handlers:
+                    client.send(encode(ERROR, 0, BAD_MESSAGE))
+                    continue
+                handlers[kind](client, *fields[:-1])
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            for room in list(client.rooms):
+                self._detach(client, room)
+            writer.close()
+
+    # -------------------- Messages --------------------
+
+    def _new(self, client, variant, seat, ai):
+        if len(self.rooms) >= self.max_games:
+            client.send(encode(ERROR, 0, FULL))
+            return
+        if ai and self.pool is None:
+            client.send(encode(ERROR, 0, NO_AI))
+            return
+        if seat > SPECTATOR or (ai and seat == BLACK_SEAT):
+            client.send(encode(ERROR, 0, BAD_SEAT))
+            return
+        room = GameRoom(self.next_id, bool(variant), bool(ai))
+        self.next_id += 1
+        self.rooms[room.id] = room
+        self._seat(client, room, seat)
+
+    def _join(self, client, game_id, seat):
+        room = self.rooms.get(game_id)
+        if room is None:
+            client.send(encode(ERROR, game_id, NO_GAME))
+            return
+        if seat > SPECTATOR or (seat < SPECTATOR and (room.seats[seat] is not None or (room.ai and seat == BLACK_SEAT))):
+            client.send(encode(ERROR, game_id, BAD_SEAT))
+            return
+        self._seat(client, room, seat)
+
+    def _seat(self, client, room, seat):
+        if seat == SPECTATOR:
+            room.spectators.add(client)
+        else:
+            room.seats[seat] = client
+        client.rooms.add(room)
+        client.send(encode(JOINED, room.id, seat))
+        client.send(room.state_frame())
+        self._maybe_ai(room)
+
+    def _move(self, client, game_id, src, dst, power):
+        room = self.rooms.get(game_id)
+        if room is None:
+            client.send(encode(ERROR, game_id, NO_GAME))
+            return
+        if room.engine.winner:
+            client.send(encode(ERROR, game_id, GAME_OVER))
+            return
+        c = room.side_to_move()
+        if room.seats[c] is not client:
+            client.send(encode(ERROR, game_id, NOT_YOUR_TURN))
+            return
+        if src > 63 or dst > 63 or not self._play(room, c, src, dst, power):
+            client.send(encode(ERROR, game_id, ILLEGAL))
+
+    def _leave(self, client, game_id):
+        room = self.rooms.get(game_id)
+        if room is not None and room in client.rooms:
+            self._detach(client, room)
+
+    def _detach(self, client, room):
+        client.rooms.discard(room)
+        room.spectators.discard(client)
+        room.seats = [None if seat is client else seat for seat in room.seats]
+        if not room.clients():
+            self.rooms.pop(room.id, None)
+
+    # -------------------- Playing --------------------
+
+    def _play(self, room, c, src, dst, power):
+        """Apply a move to the room and broadcast its delta; False if it was illegal."""
+        engine = room.engine
+        before = bytes(engine.board)
+        if not apply_move(engine, c, src, dst, power):
+            return False
+        room.ply += 1
+        self.moves += 1
+        board = engine.board
+        changes = bytes(v for sq in range(64) if before[sq] != board[sq] for v in (sq, board[sq]))
+        frame = encode(DELTA, room.id, room.ply & 0xFFFF, src, dst, 1 if power else 0, *room.header(), tail=changes)
+        for member in room.clients():
+            if not member.send(frame):
+                self._detach(member, room)
+        self._maybe_ai(room)
+        return True
+
+    def _maybe_ai(self, room):
+        if (room.ai and not room.ai_busy and not room.engine.winner and room.side_to_move() == BLACK_SEAT
+                and room.id in self.rooms):
+            room.ai_busy = True
+            self._spawn(self._ai_turn(room))
+
+    async def _ai_turn(self, room):
+        engine = room.engine
+        state = {name: getattr(engine, name) for name in ENGINE_STATE if hasattr(engine, name)}
+        ply = room.ply
+        loop = asyncio.get_running_loop()
+        try:
+            chosen = await loop.run_in_executor(self.pool, ai_choose, room.super, state, "black", self.ai_time)
+        finally:
+            room.ai_busy = False
+        if chosen is None or room.id not in self.rooms or room.ply != ply:
+            return
+        if self._play(room, BLACK_SEAT, *chosen):
+            self.ai_moves += 1
+
+
+# -------------------- CLI --------------------
+
+async def serve(args):
+    server = GameServer(args.max_games, args.ai_workers, args.ai_time)
+    listener = await server.start(args.host, args.port)
+    print(f"serving on {args.host}:{args.port}", file=sys.stderr)
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Host many Chess/SuperChess games over TCP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--max-games", type=int, default=10000)
+    parser.add_argument("--ai-workers", type=int, default=1, help="AI search processes (0: no AI games)")
+    parser.add_argument("--ai-time", type=float, default=0.2, help="seconds per AI move")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+# snapshot.py
+# Compact, immutable copies of the engine state for the move journal (history,
+# replay and preview). A snapshot is the 64-byte board plus packed flags;
+# taking one or restoring it is a handful of slice copies instead of
+# deep-copying the nested piece_location map.
+
+from board import CODE_TO_NAME, NAME_TO_CODE, SQ_NAME, PieceLocationView
+
+NAME_TO_SQ = {name: sq for sq, name in enumerate(SQ_NAME)}
+
+NO_SELECTION = 64
+
+FIELDS = ("board", "flags", "moved_keys", "moved", "captured", "last_move", "last_move_meta", "powers")
+
+
+def pack_powers(engine):
+    """SuperChess state as (white charges, black charges, zones), or None for classic chess."""
+    charges = getattr(engine, "charges", None)
+    if charges is None:
+        return None
+    zones = tuple(
+        (zone["owner"], zone.get("ttl", 0), tuple(tuple(s) for s in zone.get("squares", ())), zone.get("committed"))
+        for zone in engine.fortress_zones
+    )
+    return charges.get("white", 0), charges.get("black", 0), zones
+
+
+def unpack_zones(zones):
+    """fortress_zones list of dicts from the packed form."""
+    out = []
+    for owner, ttl, squares, committed in zones:
+        zone = {"owner": owner, "squares": [tuple(s) for s in squares], "ttl": ttl}
+        if committed is not None:
+            zone["committed"] = committed
+        out.append(zone)
+    return out
+
+
+class Snapshot(object):
+    """
+    Engine state after one half-move:
+      board       bytes(64) of piece codes (see board.py)
+      flags       bit 0: black to move; bits 1-7: selected square (64 = none)
+      moved_keys  bitmask of squares present in has_moved
+      moved       bitmask of those squares whose has_moved value is True
+      captured    bytes of captured piece codes, in capture order
+      last_move, last_move_meta
+      powers      pack_powers() (charges and fortress zones), None for classic chess
+    """
+
+    __slots__ = FIELDS
+
+    def __init__(self, engine):
+        self.board = bytes(engine.board)
+        selected = engine.selected_sq
+        self.flags = (1 if engine.turn["black"] else 0) | ((NO_SELECTION if selected is None else selected) << 1)
+        keys = moved = 0
+        for name, value in engine.has_moved.items():
+            bit = 1 << NAME_TO_SQ[name]
+            keys |= bit
+            if value:
+                moved |= bit
+        self.moved_keys = keys
+        self.moved = moved
+        self.captured = bytes(NAME_TO_CODE[name] for name in engine.captured)
+        # last_move is a tuple and last_move_meta is replaced (not edited) on every move
+        self.last_move = engine.last_move
+        self.last_move_meta = getattr(engine, "last_move_meta", None)
+        self.powers = pack_powers(engine)
+
+    @classmethod
+    def from_fields(cls, *values):
+        """Snapshot from its field values in FIELDS order (used by the journal)."""
+        snap = object.__new__(cls)
+        for name, value in zip(FIELDS, values):
+            object.__setattr__(snap, name, value)
+        return snap
+
+    def __setattr__(self, name, value):
+        if hasattr(self, name):
+            raise AttributeError("Snapshot is immutable")
+        object.__setattr__(self, name, value)
+
+    @property
+    def black_to_move(self):
+        return bool(self.flags & 1)
+
+    @property
+    def selected_sq(self):
+        selected = self.flags >> 1
+        return None if selected == NO_SELECTION else selected
+
+    @property
+    def piece_location(self):
+        """Legacy nested piece_location dict of this position."""
+        return PieceLocationView(self).to_dict()
+
+    @property
+    def captured_names(self):
+        return [CODE_TO_NAME[code] for code in self.captured]
+
+    def has_moved(self):
+        """The has_moved dict this snapshot was taken from."""
+        keys, moved = self.moved_keys, self.moved
+        return {SQ_NAME[sq]: bool(moved >> sq & 1) for sq in range(64) if keys >> sq & 1}
+
+    def restore(self, engine):
+        """Put this state back on `engine` (board, side to move, flags, captures, last move, powers)."""
+        engine.board[:] = self.board
+        engine.selected_sq = self.selected_sq
+        black = self.flags & 1
+        engine.turn = {"black": black, "white": 1 - black}
+        engine.has_moved = self.has_moved()
+        engine.captured = self.captured_names
+        engine.last_move = self.last_move
+        engine.last_move_meta = self.last_move_meta
+        if self.powers is not None and hasattr(engine, "charges"):
+            white, black_charges, zones = self.powers
+            engine.charges = {"white": white, "black": black_charges}
+            engine.fortress_zones = unpack_zones(zones)
+            engine._update_king_recently_checked()
+        engine.refresh_hash()
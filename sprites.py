@@ -0,0 +1,138 @@
+# sprites.py
+# Shared piece sprite atlas. pieces.png is loaded once per path and every size
+# the UI asks for (board squares, captured thumbnails, promotion icons, Tk
+# thumbnails) is resampled once into a sheet of 12 ready-made sprites, so
+# drawing a piece is a plain 1:1 blit. Scaled sheets are also written next to
+# the source (in .sprites/, keyed by source mtime and size) so later runs load
+# them instead of resampling.
+
+import os
+
+import pygame
+
+# cell index of each piece in pieces.png (6 columns x 2 rows)
+PIECE_INDEX = {
+    "white_king":   0,
+    "white_queen":  1,
+    "white_bishop": 2,
+    "white_knight": 3,
+    "white_rook":   4,
+    "white_pawn":   5,
+    "black_king":   6,
+    "black_queen":  7,
+    "black_bishop": 8,
+    "black_knight": 9,
+    "black_rook":   10,
+    "black_pawn":   11,
+}
+
+CACHE_DIR = ".sprites"
+
+
+class SpriteAtlas(object):
+    """
+    sprite(name, size) -> Surface of piece `name` scaled to size x size.
+    draw(surface, name, coords, size) blits it. Sheets are built on first use
+    of a size and kept for the life of the atlas.
+    """
+
+    def __init__(self, filename, cols=6, rows=2):
+        self.filename = filename
+        self.cols = cols
+        self.rows = rows
+        try:
+            self.mtime = os.stat(filename).st_mtime_ns
+        except OSError:
+            self.mtime = 0
+        self.sheet = _convert(pygame.image.load(filename))
+        self.cell_width = self.sheet.get_width() // cols
+        self.cell_height = self.sheet.get_height() // rows
+        self.sizes = {}         # size -> {piece name: Surface}
+
+    def sprites(self, size):
+        """{piece name: Surface} at `size` pixels."""
+        size = int(size)
+        table = self.sizes.get(size)
+        if table is None:
+            sheet = self._scaled_sheet(size)
+            table = self.sizes[size] = {
+                name: sheet.subsurface(((i % self.cols) * size, (i // self.cols) * size, size, size))
+                for name, i in PIECE_INDEX.items()
+            }
+        return table
+
+    def sprite(self, name, size):
+        return self.sprites(size)[name]
+
+    def draw(self, surface, name, coords, size):
+        surface.blit(self.sprites(size)[name], coords)
+
+    def cache_path(self, size):
+        """Where the scaled sheet for `size` is stored on disk."""
+        base = os.path.splitext(os.path.basename(self.filename))[0]
+        return os.path.join(os.path.dirname(self.filename), CACHE_DIR, f"{base}-{self.mtime}-{int(size)}.png")
+
+    def sheet_file(self, size):
+        """Path of the scaled sheet for `size` (built and saved if needed), or None if it cannot be written."""
+        self.sprites(size)
+        path = self.cache_path(size)
+        return path if os.path.exists(path) else None
+
+    def _scaled_sheet(self, size):
+        path = self.cache_path(size)
+        expected = (self.cols * size, self.rows * size)
+        if self.mtime and os.path.exists(path):
+            try:
+                sheet = pygame.image.load(path)
+                if sheet.get_size() == expected:
+                    return _convert(sheet)
+            except Exception:
+                pass
+
+        sheet = pygame.Surface(expected, pygame.SRCALPHA)
+        cw, ch = self.cell_width, self.cell_height
+        for i in range(self.cols * self.rows):
+            cell = self.sheet.subsurface(((i % self.cols) * cw, (i // self.cols) * ch, cw, ch))
+            if (cw, ch) != (size, size):
+                cell = pygame.transform.smoothscale(cell, (size, size))
+            sheet.blit(cell, ((i % self.cols) * size, (i // self.cols) * size))
+        if self.mtime:
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                pygame.image.save(sheet, path)
+                self._prune(os.path.dirname(path))
+            except Exception:
+                pass    # read-only install: keep the in-memory sheet only
+        return _convert(sheet)
+
+    def _prune(self, folder):
+        """Delete sheets cached for older versions of the source file."""
+        base = os.path.splitext(os.path.basename(self.filename))[0] + "-"
+        current = f"{base}{self.mtime}-"
+        for name in os.listdir(folder):
+            if name.startswith(base) and not name.startswith(current):
+                os.remove(os.path.join(folder, name))
+
+
+def _convert(surface):
+    """convert_alpha() once a display exists (faster blits); as-is before that (e.g. the Tk HUD)."""
+    if pygame.display.get_init() and pygame.display.get_surface() is not None:
+        return surface.convert_alpha()
+    return surface
+
+
+_atlases = {}
+
+
+def atlas(filename, cols=6, rows=2):
+    """The shared SpriteAtlas for `filename` (reloaded if the file changed)."""
+    key = os.path.abspath(filename)
+    current = _atlases.get(key)
+    if current is not None:
+        try:
+            if os.stat(filename).st_mtime_ns == current.mtime:
+                return current
+        except OSError:
+            return current
+    current = _atlases[key] = SpriteAtlas(filename, cols, rows)
+    return current
@@ -0,0 +1,1155 @@
+# superchess_core.py
+# SuperChess rules (charges, powers, fortress zones) on top of ChessCore; no display.
+from board import (
+    EMPTY, PAWN, BISHOP, ROOK, KING, KIND_MASK, POWER, COLORS, COLOR_INDEX, CODE_TO_NAME,
+    NAME_TO_CODE, SQ_XY, SQ_FILE_ROW, SQ_NAME, KNIGHT_OFFSETS, square_of,
+)
+from chess_core import ChessCore
+from evaluation import SQUARE_SCORE
+from fortress import FIELD_MASK, FortressZones
+import opening_book
+from zobrist import CASTLE_KEYS, EP_KEYS, PIECE_KEYS, SIDE_KEY, castle_rights, ep_file, power_hash
+
+# power granted to each piece kind when a charge is spent
+POWER_NAMES = {
+    "king": "royal_teleport",
+    "queen": "dark_empress",
+    "rook": "fortress_field",
+    "bishop": "phase_shift",
+    "knight": "shadow_jump",
+    "pawn": "sacrifice"
+}
+
+class SuperChessCore(ChessCore):
+    """
+    SuperChess rules on top of ChessCore:
+      - per-side charges (max 3)
+      - previewing and activation of superpowers (press S to toggle preview)
+      - fortress zones with TTL (no enemy may move into those squares while active)
+      - phase shift, shadow jump, royal teleport, dark empress, fortress, sacrifice
+      - AI uses superpowers sometimes
+    """
+
+    def __init__(self):
+        # --- super-state initialised BEFORE calling ChessCore.__init__ ---
+        self.charges = {"white": 0, "black": 0}
+
+        # preview state (used by Game)
+        self.previewing = False                # True while preview mode active
+        self.power_preview_active = False      # alias used in some game.py versions/UI
+        self.preview_moves = []                # list of [x,y] allowed preview targets
+        self.preview_source = None             # ('a',2) selected square for preview
+        self.preview_selected = None           # hovered preview square (x,y) or None
+        self.power_preview_name = None         # e.g. 'phase_shift'
+
+        # fortress zones (fortress.FortressZones); reads as a list of {'owner': color, 'squares':[ (x,y) ... ], 'ttl': int}
+        self.fortress_zones = []
+
+        # used to signal that a power was used this turn (if you want per-turn restrictions)
+        self.power_was_used_this_turn = False
+
+        # track if a king was placed in check by opponent's last move (blocks castling until that side moves)
+        self.king_recently_checked = {"white": False, "black": False}
+
+        # last_move_meta: structured metadata describing the most recent half-move (power or normal)
+        # Example:
+        # self.last_move_meta = {
+        #   'type':'phase_shift', 'src':('c',4), 'dst':(5,2), 'piece':'white_bishop',
+        #   'captured':['black_pawn'], 'consumed_charge': True, 'redirected': True, 'redirect_square':('d',5)
+        # }
+        self.last_move_meta = None
+
+        # Call base constructor (calls reset)
+        super().__init__()
+        # powers change the position hash: SuperChess keeps its own book
+        self.ai_book = opening_book.book_path("super")
+
+    @property
+    def fortress_zones(self):
+        return self._fortress_zones
+
+    @fortress_zones.setter
+    def fortress_zones(self, zones):
+        # snapshots, perft and older callers assign plain lists of zone dicts
+        self._fortress_zones = FortressZones.from_dicts(zones)
+
+    def reset(self):
+        super().reset()
+        self.charges = {"white": 0, "black": 0}
+        self.previewing = False
+        self.power_preview_active = False
+        self.preview_moves = []
+        self.preview_source = None
+        self.preview_selected = None
+        self.power_preview_name = None
+        self.fortress_zones = []
+        self.power_was_used_this_turn = False
+        self.king_recently_checked = {"white": False, "black": False}
+        self.last_move_meta = None
+        # the base reset counted the start position with the previous game's charges
+        self.position_counts = {self.position_hash(): 1}
+
+    # ---------------- Preview helpers ----------------
+
+    def toggle_preview(self, color):
+        """
+        Toggle preview on/off for the currently selected piece (must belong to color).
+        Builds preview_moves from legal_super_moves (targets that leave the own king safe).
+        """
+        # If currently previewing -> cancel
+        if self.previewing:
+            self._clear_preview(full=True)
+            # restore legal moves for selected piece if selection still present
+            sel = self.selected_sq
+            if sel is not None:
+                pname = CODE_TO_NAME[self.board[sel]]
+                if pname and pname.startswith(color):
+                    self.moves = self.legal_moves_for(pname, list(SQ_XY[sel]))
+                    return
+            self.moves = []
+            return
+
+        # find selected piece
+        sel = self.selected_source()
+        if not sel:
+            return
+        sf, sr = sel
+        pname = CODE_TO_NAME[self.board[square_of(sf, sr)]]
+        if not pname or not pname.startswith(color):
+            return
+
+        # require at least one charge
+        if self.charges.get(color, 0) <= 0:
+            return
+
+        legal = self.legal_super_moves(sf, sr)
+        if not legal:
+            return
+
+        # set preview state
+        self.previewing = True
+        self.power_preview_active = True
+        self.preview_moves = legal
+        self.preview_source = sel
+        self.preview_selected = None
+        self.moves = legal[:]  # highlights on board
+
+        self.power_preview_name = POWER_NAMES.get(pname.split("_", 1)[1])
+
+    def legal_super_moves(self, src_file, src_row):
+        """
+        Super targets ([x,y] lists) for the piece on (src_file, src_row) that do not
+        leave its own king in check; empty while its side has no charge.
+        """
+        src = square_of(src_file, src_row)
+        code = self.board[src]
+        if not code:
+            return []
+        return [dest[:] for dest in self.legal_power_table(COLORS[code >> 3]).get(src, ())]
+
+    def legal_power_table(self, color):
+        """
+        {square index: [[x, y], ...]} with the legal power targets of every piece of
+        `color`. Each activation is tried with make_move / unmake_move, once per
+        position (cached next to legal_move_table).
+        """
+        tables = self._position_tables()
+        table = tables.get((color, POWER))
+        if table is None:
+            table = {}
+            c = COLOR_INDEX[color]
+            for move in self._pseudo_powers(c):
+                undo = self.make_move(move)
+                if not self._in_check(c):
+                    table.setdefault(move[0], []).append(list(SQ_XY[move[1]]))
+                self.unmake_move(undo)
+            tables[(color, POWER)] = table
+        return table
+
+    def use_power(self, source, dest, legal):
+        """
+        Spend a charge: activate the power of the piece on source toward dest.
+        legal is the target list from legal_super_moves; the commit goes through
+        validate_move like a preview click does.
+        """
+        self.previewing = True
+        self.power_preview_active = True
+        self.preview_moves = legal
+        self.preview_source = source
+        kind = CODE_TO_NAME[self.board[square_of(*source)]].split("_", 1)[1]
+        self.power_preview_name = POWER_NAMES.get(kind)
+        return self.validate_move(dest, simulate=False, source=source)
+
+    def cancel_power_preview(self):
+        """Called by Game to cancel preview (mouse left board / ESC)."""
+        self.previewing = False
+        self.power_preview_active = False
+
+    def _clear_preview(self, full=False):
+        """Clear preview-related flags and optionally remove selection highlights."""
+        self.preview_moves = []
+        self.preview_source = None
+        self.preview_selected = None
+        self.power_preview_name = None
+        self.power_preview_active = False
+        if full:
+            self.previewing = False
+            self.moves = []
+
+    # ---------------- Super-move generation ----------------
+
+    def super_moves_for(self, piece_name, piece_coord):
+        """
+        Return raw list of [x,y] targets representing the superpower landing squares for preview.
+        Each piece's superpower preview matches its actual ability:
+        - King: can swap with any allied piece (except itself)
+        - Queen: knight-like jumps (cannot land on friendly)
+        - Rook: fortress activation (own square only)
+        - Bishop: phase shift (any diagonal, ignoring friendly blockers, with king+shield redirect)
+        - Knight: jump to any square in 3x3 around (cannot land on friendly)
+        - Pawn: sacrifice (own square only)
+        """
+        board = self.board
+        code = NAME_TO_CODE[piece_name]
+        c = code >> 3
+        kind = piece_name.split("_", 1)[1]
+        x, y = piece_coord
+        res = []
+
+        def friendly(px, py):
+            p = board[py * 8 + px]
+            return p and p >> 3 == c
+
+        if kind == "king":
+            # file-major scan (a1..a8, b1..b8, ...) keeps the original target order
+            for tx in range(8):
+                for ty in range(7, -1, -1):
+                    p = board[ty * 8 + tx]
+                    if p and p >> 3 == c and p != code:
+                        res.append([tx, ty])
+
+        elif kind == "queen":
+            for dx, dy in KNIGHT_OFFSETS:
+                nx, ny = x+dx, y+dy
+                if 0 <= nx < 8 and 0 <= ny < 8:
+                    if friendly(nx, ny):
+                        continue
+                    res.append([nx, ny])
+
+        elif kind == "rook":
+            res.append([x, y])
+
+        elif kind == "bishop":
+            for dx, dy in [(-1,-1),(1,1),(-1,1),(1,-1)]:
+                cx, cy = x, y
+                while True:
+                    cx += dx; cy += dy
+                    if cx < 0 or cy < 0 or cx > 7 or cy > 7:
+                        break
+                    occupant = board[cy * 8 + cx]
+                    if occupant and occupant & KIND_MASK == KING and occupant >> 3 != c:
+                        sx_shield = cx - dx
+                        sy_shield = cy - dy
+                        if 0 <= sx_shield < 8 and 0 <= sy_shield < 8:
+                            shield_piece = board[sy_shield * 8 + sx_shield]
+                            if shield_piece and shield_piece >> 3 == occupant >> 3:
+                                res.append([sx_shield, sy_shield])
+                                continue
+                        res.append([cx, cy])
+                        continue
+                    res.append([cx, cy])
+
+        elif kind == "knight":
+            for nx in range(x-1, x+2):
+                for ny in range(y-1, y+2):
+                    if 0 <= nx < 8 and 0 <= ny < 8 and not (nx==x and ny==y):
+                        if friendly(nx, ny):
+                            continue
+                        res.append([nx, ny])
+
+        elif kind == "pawn":
+            res.append([x, y])
+
+        return res
+
+    # ---------------- Apply super move (simulation or real) ----------------
+
+    def apply_super_move_simulate(self, src_file, src_row, dest):
+        """
+        Mutates the board to apply the super effect (used for simulation).
+        It mirrors side-effects of real activation but does not toggle turns or alter charges.
+        Returns True if applied.
+        """
+        board = self.board
+        src = square_of(src_file, src_row)
+        code = board[src]
+        if not code:
+            return False
+        c = code >> 3
+        kind = CODE_TO_NAME[code].split("_", 1)[1]
+        sx, sy = SQ_XY[src]
+        dx, dy = dest
+        dst = dy * 8 + dx
+        tgt = board[dst]
+
+        # KING: swap with allied piece at dest
+        if kind == "king":
+            if tgt and tgt >> 3 == c and tgt != code:
+                board[dst] = code
+                # put the other piece on the king's square
+                board[src] = tgt
+                return True
+            return False
+
+        # ROOK: fortress zone centered on rook pos (rook does not move)
+        if kind == "rook":
+            # for simulation we just record zone (caller should restore)
+            self.fortress_zones = self.fortress_zones.add(c, FIELD_MASK[src])
+            return True
+
+        # BISHOP/QUEEN/KNIGHT: special movement to dest (capture allowed), but do not allow landing on friendly
+        if kind in ("bishop", "queen", "knight"):
+            if tgt and tgt >> 3 == c:
+                return False
+            board[dst] = code
+            board[src] = EMPTY
+            return True
+
+        # PAWN: sacrifice simulation: remove pawn and capture left/right if enemy
+        if kind == "pawn":
+            board[src] = EMPTY
+            for ox in (-1, 1):
+                nx = sx + ox
+                if 0 <= nx < 8:
+                    t = board[sy * 8 + nx]
+                    if t and t >> 3 != c:
+                        # record captured piece name in captured list (simulation)
+                        self.captured.append(CODE_TO_NAME[t])
+                        board[sy * 8 + nx] = EMPTY
+            return True
+
+        return False
+
+    # ---------------- small helper: check activation validity without mutating ----------------
+
+    def _can_activate_power(self, src_file, src_row, pname, dx=None, dy=None):
+        """
+        Return True if activating `pname` from src_file,src_row to (dx,dy) would succeed.
+        This performs only checks (no state changes).
+        dx/dy may be None for powers that don't need a target (sacrifice uses source).
+        """
+        src = square_of(src_file, src_row)
+        code = self.board[src]
+        if not code:
+            return False
+        c = code >> 3
+
+        def lands_on_friendly():
+            tgt = self.board[dy * 8 + dx]
+            return tgt and tgt >> 3 == c
+
+        # For powers that land on a square, check friendly occupancy rules
+        if pname in ("dark_empress", "phase_shift", "shadow_jump"):
+            # queen knight-jump / bishop phase shift / knight shadow jump: cannot land on a friendly piece.
+            # (the phase-shift king+shield redirect lands on the opponent's shield, which is fine)
+            if dx is None or dy is None:
+                return False
+            return not lands_on_friendly()
+
+        if pname == "royal_teleport":
+            # king swap: must swap with allied piece (not itself)
+            if dx is None or dy is None:
+                return False
+            tgt = self.board[dy * 8 + dx]
+            if not tgt or tgt >> 3 != c:
+                return False
+            # cannot swap with itself (same coords)
+            return dy * 8 + dx != src
+
+        if pname == "fortress_field":
+            # always allowed (rook's own square or center), no occupancy checks needed
+            return True
+
+        if pname == "sacrifice":
+            # sacrifice always valid as preview target is pawn's own square
+            return True
+
+        # default conservative: require dx/dy and not landing on friendly
+        if dx is None or dy is None:
+            return False
+        return not lands_on_friendly()
+
+    # ---------------- Override validate_move to integrate preview activation & charge awarding ----------------
+
+    def validate_move(self, destination, simulate=False, source=None):
+        """
+        Handles:
+         - normal moves (delegates to Chess.validate_move) and awards charges for captures
+         - fortress TTL expiration after real moves
+         - when previewing: if destination is one of preview_moves, verify activation validity,
+           consume a charge only after verifying, and apply the super move
+         - track recent checks to disallow castling if king was put in check by opponent
+        """
+        # If previewing => handled later in preview branch
+        if self.previewing and self.power_preview_active:
+            # determine source (either preview_source or currently selected)
+            if self.preview_source is None:
+                sel = self.selected_source()
+                if not sel:
+                    self._clear_preview(full=True)
+                    return False
+                sf, sr = sel
+            else:
+                sf, sr = self.preview_source
+
+            # Accept either list or tuple membership in preview_moves
+            bx, by = destination if isinstance(destination, (list,tuple)) else (destination[0], destination[1])
+            if [bx, by] not in self.preview_moves and (bx, by) not in self.preview_moves:
+                self._clear_preview(full=True)
+                return False
+
+            piece_name = CODE_TO_NAME[self.board[square_of(sf, sr)]]
+            if not piece_name:
+                self._clear_preview(full=True)
+                return False
+            color = piece_name.split("_", 1)[0]
+            if self.charges.get(color, 0) <= 0:
+                self._clear_preview(full=True)
+                return False
+
+            # BEFORE consuming charge: check whether activation would be valid
+            pname = self.power_preview_name
+            if not self._can_activate_power(sf, sr, pname, bx, by):
+                # invalid activation (e.g. queen clicked friendly square) -> cancel preview, do not consume
+                self._clear_preview(full=True)
+                return False
+
+            # consume one charge (only after validation)
+            if not self._consume_charge(color):
+                self._clear_preview(full=True)
+                return False
+
+            # apply the power concretely
+            applied = False
+            dx, dy = bx, by
+
+            if pname == "royal_teleport":
+                applied = self._activate_royal_teleport(sf, sr, dx, dy)
+            elif pname == "dark_empress":
+                applied = self._activate_dark_empress(sf, sr, dx, dy)
+            elif pname == "fortress_field":
+                applied = self._activate_fortress_field(sf, sr, dx, dy)
+            elif pname == "phase_shift":
+                applied = self._activate_phase_shift(sf, sr, dx, dy)
+            elif pname == "shadow_jump":
+                applied = self._activate_shadow_jump(sf, sr, dx, dy)
+            elif pname == "sacrifice":
+                applied = self._activate_sacrifice(sf, sr)
+            else:
+                applied = False
+
+            # if applied, mark used, expire fortress TTLs (consistent with real moves), clear preview
+            if applied:
+                # powers write the board directly; rebuild the incremental hash
+                self.refresh_hash()
+                self.power_was_used_this_turn = True
+                # update king check tracking after the activation (activation toggles turn)
+                self._update_king_recently_checked()
+                self.expire_fortress_zones()
+                # clear preview and selection highlights
+                self._clear_preview(full=True)
+                # ensure no stale selection/moves remain
+                self.selected_sq = None
+                self.moves = []
+                return True
+
+            # if not applied (unexpected), clear preview and fail
+            self._clear_preview(full=True)
+            return False
+
+        # If not previewing => normal move path
+        if not self.previewing:
+            # determine mover color (the side that currently has the turn)
+            mover = "white" if self.turn.get("white") else "black"
+
+            # Determine source square (use provided source if present, else find selected)
+            src = source if source else self.selected_source()
+
+            # If the mover was recently checked, disallow castling attempt
+            if src:
+                piece = CODE_TO_NAME[self.board[square_of(src[0], src[1])]]
+                if piece and piece.endswith("king") and self.king_recently_checked.get(mover, False):
+                    # attempt to castle is a king moving two squares horizontally
+                    # get source coords and dest coords
+                    sx, sy = self.square_to_xy(src[0], src[1])
+                    dx, dy = destination
+                    try:
+                        # destination may be list or tuple
+                        dx = int(dx); dy = int(dy)
+                    except Exception:
+                        pass
+                    if abs(dx - sx) == 2 and dy == sy:
+                        # block castling while recently checked
+                        return False
+
+            # normal delegate to base validate_move
+            before_captured = len(self.captured)
+            # keep piece_name for meta
+            piece_name = None
+            if src:
+                piece_name = CODE_TO_NAME[self.board[square_of(src[0], src[1])]]
+            # make_move awards the capture charge and ticks fortress TTLs
+            charges, zones = self.charges, self.fortress_zones
+            ok = super().validate_move(destination, simulate=simulate, source=source)
+            if simulate:
+                # like the turn and last_move, a simulated move keeps charges and zones
+                self.charges, self.fortress_zones = charges, zones
+            if ok and (not simulate):
+                newly_captured = self.captured[before_captured:]
+
+                # update king_recently_checked flags after the move
+                self._update_king_recently_checked()
+
+                # record last_move_meta for a normal move
+                # destination normalized to tuple
+                try:
+                    dx, dy = int(destination[0]), int(destination[1])
+                except Exception:
+                    dx = dy = None
+                self.last_move_meta = {
+                    'type': 'move',
+                    'src': (src[0], src[1]) if src else None,
+                    'dst': (dx, dy),
+                    'piece': piece_name,
+                    'captured': newly_captured,
+                    'consumed_charge': False
+                }
+
+            return ok
+
+        # fallback
+        return super().validate_move(destination, simulate=simulate, source=source)
+
+    def position_hash(self):
+        """Zobrist key including charges and live fortress zones."""
+        return self.zobrist ^ power_hash(self.charges, self.fortress_zones)
+
+    def _update_king_recently_checked(self):
+        """
+        After a real move/power activation, update the king_recently_checked flags.
+        A side whose king is currently in check will have the flag True.
+        """
+        self._legal_cache = None  # the flags filter castling but are not part of the position key
+        for color in ("white", "black"):
+            try:
+                self.king_recently_checked[color] = bool(self.is_in_check(color))
+            except Exception:
+                # if any failure, be conservative and set False
+                self.king_recently_checked[color] = False
+
+    # ---------------- legal move filtering to respect fortress zones ----------------
+
+    def _legal_moves(self, piece_name, piece_coord):
+        base = super()._legal_moves(piece_name, piece_coord)
+        color = piece_name.split("_")[0]
+        # Block moves into fortress zones owned by the opponent
+        blocked = self.fortress_zones.blocked(COLOR_INDEX[color])
+        if blocked:
+            base = [dest for dest in base if not blocked >> (dest[1] * 8 + dest[0]) & 1]
+
+        # Additionally, if piece is king and our king_recently_checked[color] is True, remove castling moves
+        kind = piece_name.split("_", 1)[1]
+        if kind == "king" and self.king_recently_checked.get(color, False):
+            no_castle = []
+            for dest in base:
+                # castling encoded as king moving two files horizontally — remove those
+                sx, sy = piece_coord
+                dx, dy = dest
+                if abs(dx - sx) == 2 and dy == sy:
+                    continue
+                no_castle.append(dest)
+            return no_castle
+
+        return base
+
+    # ---------------- Powers as moves (search) ----------------
+
+    def _pseudo_moves(self, color):
+        """Base pseudo-legal moves without the ones entering an opponent's fortress zone."""
+        moves = super()._pseudo_moves(color)
+        blocked = self.fortress_zones.blocked(color)
+        if blocked:
+            moves = [move for move in moves if not blocked >> move[1] & 1]
+        return moves
+
+    def _pseudo_powers(self, color):
+        """
+        (src, dst, POWER) for every power activation of colour index `color` that
+        use_power would accept, own king safety not yet checked (as _pseudo_moves).
+        """
+        if self.charges.get(COLORS[color], 0) <= 0:
+            return []
+        board = self.board
+        moves = []
+        for sq, code in enumerate(board):
+            if not code or code >> 3 != color:
+                continue
+            kind = code & KIND_MASK
+            if kind == ROOK or kind == PAWN:
+                # fortress and sacrifice target the piece's own square
+                moves.append((sq, sq, POWER))
+                continue
+            for x, y in self.super_moves_for(CODE_TO_NAME[code], SQ_XY[sq]):
+                t = y * 8 + x
+                if kind == BISHOP and ((board[t] and board[t] >> 3 == color) or (sq, t, POWER) in moves):
+                    # phase shift passes friendly pieces but cannot land on one; a shield square comes twice
+                    continue
+                moves.append((sq, t, POWER))
+        return moves
+
+    def make_move(self, move):
+        """
+        ChessCore.make_move plus the SuperChess side of a half-move: a capture earns
+        the mover a charge (max 3) and fortress TTLs tick down. (src, dst, POWER)
+        spends a charge on the power of the piece on src instead (_make_power).
+        Charges and zones are replaced, not edited, so the token just keeps the old ones.
+        """
+        if len(move) > 2 and move[2] == POWER:
+            return self._make_power(move[0], move[1])
+        charges, zones = self.charges, self.fortress_zones
+        undo = super().make_move(move)
+        if undo[3]:
+            mover = COLORS[undo[2] >> 3]
+            if charges.get(mover, 0) < 3:
+                self.charges = dict(charges)
+                self.charges[mover] = charges.get(mover, 0) + 1
+        if zones:
+            self.fortress_zones = zones.tick()
+        return undo + (charges, zones)
+
+    def unmake_move(self, undo):
+        if undo[0] is None:
+            self._unmake_power(undo)
+            return
+        super().unmake_move(undo[:10])
+        self.charges, self.fortress_zones = undo[10], undo[11]
+
+    def _make_power(self, src, dst):
+        """
+        Board effect of a power activation (same result as use_power, without the
+        preview, captured list and meta bookkeeping). The hash and the material score
+        are updated from the touched squares. Token: (None, board, has_moved_prev,
+        last_move_prev, hash_prev, material_prev, king_squares_prev, charges_prev, zones_prev).
+        """
+        board = self.board
+        has_moved = self.has_moved
+        code = board[src]
+        c = code >> 3
+        kind = code & KIND_MASK
+        sx, sy = SQ_XY[src]
+        prev = bytes(board)
+        moved_prev = []
+        last_prev = self.last_move
+        hash_prev = h = self.zobrist
+        material_prev = score = self.material
+        kings_prev = self.king_squares[:]
+        charges, zones = self.charges, self.fortress_zones
+        new_zones = zones
+
+        h ^= CASTLE_KEYS[castle_rights(board, has_moved)]
+        ep = ep_file(last_prev)
+        if ep >= 0:
+            h ^= EP_KEYS[ep]
+
+        touched = [src, dst]
+        if kind == KING:
+            # royal teleport: swap with the allied piece on dst
+            board[src], board[dst] = board[dst], code
+            self.king_squares[c] = dst
+            moved = (src, dst)
+            self.last_move = ((sx, sy), SQ_XY[dst], CODE_TO_NAME[code])
+        elif kind == ROOK:
+            # fortress field: 3x3 zone around the rook; last_move is left alone
+            new_zones = zones.add(c, FIELD_MASK[dst])
+            moved = ()
+        elif kind == PAWN:
+            # sacrifice: the pawn and the enemies beside it leave the board
+            for nx in (sx - 1, sx + 1):
+                if 0 <= nx < 8:
+                    t = sy * 8 + nx
+                    if board[t] and board[t] >> 3 != c:
+                        board[t] = EMPTY
+                        touched.append(t)
+            board[src] = EMPTY
+            moved = ()
+        else:
+            # dark empress, shadow jump, phase shift: land on dst (capturing)
+            land = dst
+            victim = board[dst]
+            if kind == BISHOP and victim and victim & KIND_MASK == KING and victim >> 3 != c:
+                # phase shift into a king takes the king's shield on the approach square instead
+                dx, dy = SQ_XY[dst]
+                stepx = (dx > sx) - (dx < sx)
+                stepy = (dy > sy) - (dy < sy)
+                if stepx and stepy and abs(dx - sx) == abs(dy - sy):
+                    shield = (dy - stepy) * 8 + dx - stepx
+                    if board[shield] and board[shield] >> 3 == victim >> 3:
+                        land = shield
+                        touched.append(shield)
+            board[land] = code
+            board[src] = EMPTY
+            moved = (src,)
+            self.last_move = ((sx, sy), SQ_XY[land], CODE_TO_NAME[code])
+
+        for sq in moved:
+            key = SQ_NAME[sq]
+            moved_prev.append((key, has_moved.get(key)))
+            has_moved[key] = True
+        for sq in set(touched):
+            h ^= PIECE_KEYS[prev[sq]][sq] ^ PIECE_KEYS[board[sq]][sq]
+            score += SQUARE_SCORE[board[sq]][sq] - SQUARE_SCORE[prev[sq]][sq]
+        h ^= SIDE_KEY ^ CASTLE_KEYS[castle_rights(board, has_moved)]
+        ep = ep_file(self.last_move)
+        if ep >= 0:
+            h ^= EP_KEYS[ep]
+        self.zobrist = h
+        self.material = score
+
+        self.charges = dict(charges)
+        self.charges[COLORS[c]] = charges.get(COLORS[c], 0) - 1
+        self.fortress_zones = new_zones.tick()
+        turn = self.turn
+        turn["white"], turn["black"] = turn["black"], turn["white"]
+        return (None, prev, moved_prev, last_prev, hash_prev, material_prev, kings_prev, charges, zones)
+
+    def _unmake_power(self, undo):
+        _, prev, moved_prev, last_prev, hash_prev, material_prev, kings_prev, charges, zones = undo
+        self.board[:] = prev
+        has_moved = self.has_moved
+        for key, value in reversed(moved_prev):
+            if value is None:
+                del has_moved[key]
+            else:
+                has_moved[key] = value
+        self.last_move = last_prev
+        self.zobrist = hash_prev
+        self.material = material_prev
+        self.king_squares[:] = kings_prev
+        self.charges, self.fortress_zones = charges, zones
+        turn = self.turn
+        turn["white"], turn["black"] = turn["black"], turn["white"]
+
+    # ---------------- AI ----------------
+
+    def choose_ai_move(self, search=None):
+        """
+        AI for Black. The search weighs power activations against normal moves
+        (see _pseudo_powers); a chosen power comes back as ("power", source, dest, legal).
+        """
+        chosen = super().choose_ai_move(search)
+        if chosen is not None and len(chosen) > 3:
+            _, source, dest, _ = chosen
+            return ("power", source, list(dest), self.legal_super_moves(*source))
+        return chosen
+
+    def play_ai_move(self, chosen):
+        if chosen[0] == "power":
+            _, source, dest, legal = chosen
+            # commit via validate_move (consumes the charge)
+            self.use_power(source, dest, legal)
+            return True
+        return super().play_ai_move(chosen)
+
+    # ---------------- Commit power preview ----------------
+
+    def commit_power_preview(self, board_xy):
+        """
+        Called by Game when the user clicks a preview square (or AI/hotkey).
+        board_xy is (x,y) indices (0..7).
+        Returns True if activation succeeded.
+        """
+        if not self.previewing:
+            return False
+
+        bx, by = board_xy
+        # Accept either list or tuple representation in preview_moves
+        if [bx, by] not in self.preview_moves and (bx, by) not in self.preview_moves:
+            return False
+
+        # source known in preview_source, else find it
+        source = self.preview_source
+        if source is None:
+            source = self.selected_source()
+            if not source:
+                self._clear_preview(full=True)
+                return False
+
+        return self.validate_move([bx, by], simulate=False, source=source)
+
+    # ---------------- Individual power activations (real; should toggle turn / update captured as needed) ----------------
+
+    def _consume_charge(self, color):
+        if getattr(self, "charges", None) is None:
+            return False
+        if self.charges.get(color, 0) <= 0:
+            return False
+        self.charges[color] -= 1
+        return True
+
+    def _apply_move_without_checks(self, src_file, src_row, dst_x, dst_y, simulate=False):
+        """
+        Move piece from src to dst (dst given as board x,y). Handles captures and promotion,
+        sets last_move and toggles turn (unless simulate=True). Returns True if moved.
+        Also sets a conservative last_move_meta for the motion.
+        """
+        board = self.board
+        src = square_of(src_file, src_row)
+        dst = dst_y * 8 + dst_x
+        code = board[src]
+        if not code:
+            return False
+        piece_name = CODE_TO_NAME[code]
+
+        # capture bookkeeping
+        before = len(self.captured)
+        if board[dst] and not simulate:
+            self.captured.append(CODE_TO_NAME[board[dst]])
+
+        # move piece
+        board[dst] = code
+        board[src] = EMPTY
+        if self.selected_sq == src:
+            self.selected_sq = None
+        self.has_moved[src_file + str(src_row)] = True
+
+        # promotion auto-queen for simplicity
+        color, kind = piece_name.split("_", 1)
+        if kind == "pawn":
+            if (color == "white" and dst_y == 0) or (color == "black" and dst_y == 7):
+                board[dst] = NAME_TO_CODE[f"{color}_queen"]
+
+        # set last_move and toggle turn if real
+        sx, sy = SQ_XY[src]
+        if not simulate:
+            self.last_move = ((sx, sy), (dst_x, dst_y), piece_name)
+            # toggle whose turn it is
+            self.turn["white"], self.turn["black"] = self.turn["black"], self.turn["white"]
+
+            # populate a conservative last_move_meta (activations can overwrite with richer meta)
+            after = len(self.captured)
+            newly_captured = self.captured[before:after] if after > before else []
+            self.last_move_meta = {
+                'type': 'move',
+                'src': (src_file, src_row),
+                'dst': (dst_x, dst_y),
+                'piece': piece_name,
+                'captured': newly_captured,
+                'consumed_charge': False
+            }
+
+        return True
+
+    def _activate_royal_teleport(self, src_file, src_row, dst_x, dst_y):
+        """
+        King: swap with allied piece at dest. Must remain legal (we assume preview done).
+        Swap and toggle turn; consume charge.
+        """
+        board = self.board
+        src = square_of(src_file, src_row)
+        dst = dst_y * 8 + dst_x
+        src_piece = CODE_TO_NAME[board[src]]
+        if not src_piece or not src_piece.endswith("king"):
+            return False
+        target = board[dst]
+        if not target or target >> 3 != board[src] >> 3:
+            return False
+        # perform swap
+        board[dst], board[src] = board[src], board[dst]
+        if self.selected_sq in (src, dst):
+            self.selected_sq = None
+        dst_file, dst_row = SQ_FILE_ROW[dst]
+        self.has_moved[src_file + str(src_row)] = True
+        self.has_moved[dst_file + str(dst_row)] = True
+        sx, sy = SQ_XY[src]
+        self.last_move = ((sx, sy), (dst_x, dst_y), src_piece)
+        self.turn["white"], self.turn["black"] = self.turn["black"], self.turn["white"]
+        self.last_move_meta = {
+            'type': 'royal_teleport',
+            'src': (src_file, src_row),
+            'dst': (dst_x, dst_y),
+            'piece': src_piece,
+            'captured': [],
+            'consumed_charge': True
+        }
+        return True
+
+    def _activate_dark_empress(self, src_file, src_row, dst_x, dst_y):
+        """
+        Queen moves like a knight to dst. Use _apply_move_without_checks to handle capture/turn toggling.
+        """
+        src_code = self.board[square_of(src_file, src_row)]
+        src_piece = CODE_TO_NAME[src_code]
+        if not src_piece or not src_piece.endswith("queen"):
+            return False
+        # do not land on friendly piece
+        tgt = self.board[dst_y * 8 + dst_x]
+        if tgt and tgt >> 3 == src_code >> 3:
+            return False
+
+        before = len(self.captured)
+        ok = self._apply_move_without_checks(src_file, src_row, dst_x, dst_y)
+        if not ok:
+            return False
+        after = len(self.captured)
+        newly = self.captured[before:after] if after > before else []
+
+        # overwrite last_move_meta to include power data
+        self.last_move_meta = {
+            'type': 'dark_empress',
+            'src': (src_file, src_row),
+            'dst': (dst_x, dst_y),
+            'piece': src_piece,
+            'captured': newly,
+            'consumed_charge': True
+        }
+        return True
+
+    def _activate_phase_shift(self, src_file, src_row, dst_x, dst_y):
+        """
+        Bishop superpower: Phase Shift.
+        Move diagonally to any previewed square, ignoring friendly blockers.
+        Special rule: if the chosen target corresponds to an opponent king square,
+        and the square immediately before the king along the approach diagonal contains
+        a friendly piece of that king (a shield), capture the shield instead (bishop lands
+        on the shield square). Otherwise capture normally (king square).
+        """
+        board = self.board
+        src = square_of(src_file, src_row)
+        src_code = board[src]
+        src_piece = CODE_TO_NAME[src_code]
+        if not src_piece or not src_piece.endswith("bishop"):
+            return False
+        c = src_code >> 3
+
+        # source coords
+        sx, sy = SQ_XY[src]
+
+        # Normalize destination values
+        dx, dy = int(dst_x), int(dst_y)
+
+        # capture bookkeeping
+        before = len(self.captured)
+
+        # If destination square contains an opponent king, check for shield redirect
+        dst_code = board[dy * 8 + dx]
+
+        if dst_code and dst_code & KIND_MASK == KING and dst_code >> 3 != c:
+            # compute approach diagonal direction from source to king square
+            kx, ky = dx, dy
+            ddx = kx - sx
+            ddy = ky - sy
+            # must be diagonal approach (phase shift only built diagonal moves), but be safe
+            sx_sign = 0 if ddx == 0 else (1 if ddx > 0 else -1)
+            sy_sign = 0 if ddy == 0 else (1 if ddy > 0 else -1)
+
+            # ensure diagonal (both signs non-zero and abs equal)
+            if sx_sign != 0 and sy_sign != 0 and abs(ddx) == abs(ddy):
+                shield_x = kx - sx_sign
+                shield_y = ky - sy_sign
+                if 0 <= shield_x < 8 and 0 <= shield_y < 8:
+                    shield = shield_y * 8 + shield_x
+                    shield_code = board[shield]
+                    if shield_code and shield_code >> 3 == dst_code >> 3:
+                        # redirect capture to shield square
+                        # remove shield piece, move bishop to shield square
+                        shield_piece = CODE_TO_NAME[shield_code]
+                        self.captured.append(shield_piece)
+                        board[shield] = src_code
+                        # clear source
+                        board[src] = EMPTY
+                        if self.selected_sq == src:
+                            self.selected_sq = None
+                        self.has_moved[src_file + str(src_row)] = True
+                        # update last_move and toggle turn
+                        self.last_move = ((sx, sy), (shield_x, shield_y), src_piece)
+                        self.turn["white"], self.turn["black"] = self.turn["black"], self.turn["white"]
+                        redirect_square = SQ_FILE_ROW[shield]
+                        # populate last_move_meta
+                        self.last_move_meta = {
+                            'type': 'phase_shift',
+                            'src': (src_file, src_row),
+                            'dst': (shield_x, shield_y),
+                            'piece': src_piece,
+                            'captured': [shield_piece],
+                            'consumed_charge': True,
+                            'redirected': True,
+                            'redirect_square': redirect_square
+                        }
+                        return True
+
+        # Not redirected: proceed with normal bishop landing/capture, but prevent landing on friendly
+        dst = dy * 8 + dx
+        tgt = board[dst]
+        if tgt and tgt >> 3 == c:
+            return False
+        if tgt:
+            self.captured.append(CODE_TO_NAME[tgt])
+
+        # move bishop
+        board[dst] = src_code
+        board[src] = EMPTY
+        if self.selected_sq == src:
+            self.selected_sq = None
+        self.has_moved[src_file + str(src_row)] = True
+
+        # set last move and toggle turn
+        self.last_move = ((sx, sy), (dx, dy), src_piece)
+        self.turn["white"], self.turn["black"] = self.turn["black"], self.turn["white"]
+
+        after = len(self.captured)
+        newly = self.captured[before:after] if after > before else []
+        self.last_move_meta = {
+            'type': 'phase_shift',
+            'src': (src_file, src_row),
+            'dst': (dx, dy),
+            'piece': src_piece,
+            'captured': newly,
+            'consumed_charge': True,
+            'redirected': False
+        }
+        return True
+
+
+    def _activate_shadow_jump(self, src_file, src_row, dst_x, dst_y):
+        """
+        Knight variant: jump to any square within 3x3. Perform move.
+        Do NOT allow landing on friendly pieces.
+        """
+        src_code = self.board[square_of(src_file, src_row)]
+        src_piece = CODE_TO_NAME[src_code]
+        if not src_piece or not src_piece.endswith("knight"):
+            return False
+
+        tgt = self.board[dst_y * 8 + dst_x]
+        if tgt and tgt >> 3 == src_code >> 3:
+            return False
+
+        before = len(self.captured)
+        ok = self._apply_move_without_checks(src_file, src_row, dst_x, dst_y)
+        if not ok:
+            return False
+        after = len(self.captured)
+        newly = self.captured[before:after] if after > before else []
+        # overwrite meta
+        self.last_move_meta = {
+            'type': 'shadow_jump',
+            'src': (src_file, src_row),
+            'dst': (dst_x, dst_y),
+            'piece': src_piece,
+            'captured': newly,
+            'consumed_charge': True
+        }
+        return True
+
+    def _activate_fortress_field(self, src_file, src_row, dst_x, dst_y):
+        """
+        Build a fortress zone (3x3) centered at dst_x,dst_y (or rook square). Enemies cannot enter those squares
+        for a short time (we implement as ttl=2 half-moves).
+        """
+        src_piece = CODE_TO_NAME[self.board[square_of(src_file, src_row)]]
+        if not src_piece or not src_piece.endswith("rook"):
+            return False
+        color = src_piece.split("_")[0]
+        cx, cy = dst_x, dst_y
+
+        # add zone with TTL = 2 half-moves
+        self.fortress_zones = self.fortress_zones.add(COLOR_INDEX[color], FIELD_MASK[cy * 8 + cx])
+
+        # toggling turn (activation counts as move)
+        self.turn["white"], self.turn["black"] = self.turn["black"], self.turn["white"]
+
+        # record last_move_meta for fortress activation (no captures)
+        self.last_move_meta = {
+            'type': 'fortress_field',
+            'src': (src_file, src_row),
+            'dst': (cx, cy),
+            'piece': src_piece,
+            'captured': [],
+            'consumed_charge': True
+        }
+        return True
+
+    def _activate_sacrifice(self, src_file, src_row):
+        """
+        Pawn sacrifice: pawn destroys itself and takes enemy pieces directly left and right of the pawn.
+        Remove pawn, capture adjacent enemies, toggle turn (sacrifice counts as a move), even if no enemy is present.
+        """
+        board = self.board
+        src = square_of(src_file, src_row)
+        src_code = board[src]
+        src_piece = CODE_TO_NAME[src_code]
+        if not src_piece or not src_piece.endswith("pawn"):
+            return False
+        sx, sy = SQ_XY[src]
+        captured_names = []
+        for ox in (-1, 1):
+            nx = sx + ox
+            if 0 <= nx < 8:
+                tgt = board[sy * 8 + nx]
+                if tgt and tgt >> 3 != src_code >> 3:
+                    board[sy * 8 + nx] = EMPTY  # Remove enemy piece from board
+                    self.captured.append(CODE_TO_NAME[tgt])
+                    captured_names.append(CODE_TO_NAME[tgt])
+        # remove pawn itself (always removed)
+        board[src] = EMPTY
+        if self.selected_sq == src:
+            self.selected_sq = None
+        self.turn["white"], self.turn["black"] = self.turn["black"], self.turn["white"]
+        self.last_move_meta = {
+            'type': 'sacrifice',
+            'src': (src_file, src_row),
+            'dst': None,
+            'piece': src_piece,
+            'captured': captured_names,
+            'consumed_charge': True
+        }
+        return True
+
+    # ---------------- Utilities ----------------
+
+    def expire_fortress_zones(self):
+        """Decrease TTLs and remove expired fortress zones."""
+        if not self.fortress_zones:
+            return
+        # a new value: undo tokens of make_move may still hold the old one
+        self.fortress_zones = self.fortress_zones.tick()
+
+    def activate_power(self, power_name, color, src, dst):
+        if self.charges[color] > 0:
+            # ...power logic...
+            self.charges[color] -= 1
+            # ...update board...
+            return True
+        return False
+
+    def activate_pawn_sacrifice(self, pawn_pos, color):
+        # Remove adjacent enemy pieces
+        x, y = pawn_pos
+        enemy = COLOR_INDEX["black" if color == "white" else "white"]
+        captured = []
+        for dx in [-1, 0, 1]:
+            for dy in [-1, 0, 1]:
+                if dx == 0 and dy == 0:
+                    continue
+                nx, ny = x + dx, y + dy
+                if 0 <= nx < 8 and 0 <= ny < 8:
+                    piece = self.board[ny * 8 + nx]
+                    if piece and piece >> 3 == enemy:
+                        captured.append(CODE_TO_NAME[piece])
+                        self.board[ny * 8 + nx] = EMPTY
+                        self.captured.append(CODE_TO_NAME[piece])
+        # Remove the pawn itself
+        self.board[y * 8 + x] = EMPTY
+        self.captured.append(f"{color}_pawn")
+        # Update game state as needed
+        return captured
@@ -0,0 +1,128 @@
+# zobrist.py
+# 64-bit Zobrist keys. A position hash is the XOR of one random key per
+# (piece, square), the side to move, the castling rights and the en-passant file,
+# so make_move/unmake_move can update it with a handful of XORs instead of
+# rebuilding get_position_key(). SuperChess folds charges and fortress zones in
+# on top (power_hash). TranspositionTable stores search results by hash.
+
+import random
+
+from board import WHITE, BLACK, ROOK, make_code
+
+_rng = random.Random(0x5C4E55)  # fixed seed: hashes are stable between runs
+
+
+def _keys(n):
+    return [_rng.getrandbits(64) for _ in range(n)]
+
+
+# PIECE_KEYS[code][sq]; code 0 (empty square) hashes to 0
+PIECE_KEYS = [[0] * 64 for _ in range(16)]
+for _color in (WHITE, BLACK):
+    for _kind in range(1, 7):
+        PIECE_KEYS[make_code(_color, _kind)] = _keys(64)
+
+SIDE_KEY = _rng.getrandbits(64)             # XORed in when black is to move
+CASTLE_KEYS = [0] + _keys(15)               # by rights mask (K=1, Q=2, k=4, q=8)
+EP_KEYS = _keys(8)                          # by en-passant file
+CHARGE_KEYS = [_keys(8), _keys(8)]          # [color][charges & 7]
+FORTRESS_KEYS = [_keys(64), _keys(64)]      # [owner][square]
+FORTRESS_TTL_KEYS = [_keys(8), _keys(8)]    # [owner][ttl & 7]
+
+# corner square -> (rights bit, has_moved key, rook code); matches get_position_key
+CASTLE_CORNERS = (
+    (63, 1, "h1", make_code(WHITE, ROOK)),
+    (56, 2, "a1", make_code(WHITE, ROOK)),
+    (7, 4, "h8", make_code(BLACK, ROOK)),
+    (0, 8, "a8", make_code(BLACK, ROOK)),
+)
+CORNER_SQUARES = frozenset(sq for sq, _, _, _ in CASTLE_CORNERS)
+
+
+def castle_rights(board, has_moved):
+    """Rights mask: unmoved rook still on its corner (same rule as get_position_key)."""
+    rights = 0
+    for sq, bit, key, rook in CASTLE_CORNERS:
+        if board[sq] == rook and not has_moved.get(key, True):
+            rights |= bit
+    return rights
+
+
+def ep_file(last_move):
+    """File (0..7) of a pawn double step in last_move, or -1."""
+    if last_move:
+        (sx, sy), (dx, dy), piece = last_move
+        if piece.endswith("pawn") and abs(sy - dy) == 2:
+            return dx
+    return -1
+
+
+def position_hash(board, black_to_move, has_moved, last_move):
+    """Full hash of a position; make_move keeps the same value incrementally."""
+    h = 0
+    for sq, code in enumerate(board):
+        if code:
+            h ^= PIECE_KEYS[code][sq]
+    if black_to_move:
+        h ^= SIDE_KEY
+    h ^= CASTLE_KEYS[castle_rights(board, has_moved)]
+    ep = ep_file(last_move)
+    if ep >= 0:
+        h ^= EP_KEYS[ep]
+    return h
+
+
+def power_hash(charges, fortress_zones):
+    """SuperChess state on top of position_hash: charges per side and live fortress zones."""
+    h = CHARGE_KEYS[WHITE][charges.get("white", 0) & 7] ^ CHARGE_KEYS[BLACK][charges.get("black", 0) & 7]
+    if fortress_zones:
+        # fortress.FortressZones hashes its masks once per value
+        h ^= fortress_zones.hash_key(FORTRESS_KEYS, FORTRESS_TTL_KEYS)
+    return h
+
+
+# -------------------- Transposition table --------------------
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+class TranspositionTable(object):
+    """
+    Search results keyed by position hash, in a fixed number of slots derived from
+    size_mb. Each slot holds (key, depth, flag, score, move, age). A new result
+    replaces the slot when it is empty, holds the same position, was written by an
+    older search, or was searched no deeper than the new result.
+    """
+
+    ENTRY_BYTES = 128   # approximate CPython cost of one filled slot
+
+    def __init__(self, size_mb=16):
+        slots = max(1, int(size_mb * 1024 * 1024) // self.ENTRY_BYTES)
+        self.size = 1 << (slots.bit_length() - 1)
+        self.mask = self.size - 1
+        self.slots = [None] * self.size
+        self.age = 0
+
+    def new_search(self):
+        """Entries from earlier searches become first in line for replacement."""
+        self.age = (self.age + 1) & 0xFF
+
+    def clear(self):
+        self.slots = [None] * self.size
+
+    def probe(self, key):
+        entry = self.slots[key & self.mask]
+        if entry is not None and entry[0] == key:
+            return entry
+        return None
+
+    def store(self, key, depth, flag, score, move):
+        i = key & self.mask
+        old = self.slots[i]
+        if old is None or old[0] == key or old[5] != self.age or depth >= old[1]:
+            self.slots[i] = (key, depth, flag, score, move, self.age)
+
+    def usage(self):
+        """Fraction of slots in use (sampled over the first 1000)."""
+        sample = self.slots[:1000]
+        return sum(1 for e in sample if e is not None) / float(len(sample))